@@ -0,0 +1,610 @@
+import datetime
+import heapq
+import itertools
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+from forecast import RunRateForecaster
+from geocoding import get_geo_index
+from ledger import LedgerEntry, ShippingAddress
+from products import ProductCatalog
+from utils import STATE_NAMES, get_state_id
+
+# Orders outside these bounds are treated as bad coordinates (lat_min, lat_max, lon_min, lon_max)
+INDIA_BOUNDS = (6.0, 37.0, 68.0, 97.0)
+
+DEFAULT_MAP_ZOOM = 5
+
+
+def grid_cell_size(zoom: int) -> float:
+    """Get the grid cell size in degrees for a map zoom level"""
+    # A map tile spans 360 / 2**zoom degrees; 32 cells per tile keeps bins distinct without merging cities
+    return 360.0 / (2 ** zoom) / 32
+
+
+def in_india_bounds(lat: float, lon: float) -> bool:
+    """Check whether a coordinate falls inside the India bounding box"""
+    lat_min, lat_max, lon_min, lon_max = INDIA_BOUNDS
+    return lat_min <= lat <= lat_max and lon_min <= lon <= lon_max
+
+
+class GeoGrid:
+    """Bins order locations into a lat/lon grid weighted by order count and revenue"""
+
+    def __init__(self, zoom: int = DEFAULT_MAP_ZOOM):
+        self.zoom = zoom
+        self.cell_size = grid_cell_size(zoom)
+        # (row, col) -> [lat_sum, lon_sum, orders, revenue, quantity]
+        self._bins: Dict[Tuple[int, int], List[float]] = {}
+        self._cities: Dict[str, int] = {}  # city -> orders
+        self.mapped_orders = 0
+        self.mapped_revenue = 0.0
+        self.geocoded_orders = 0  # Orders placed from the offline index rather than Shopify coordinates
+
+    def add(self, lat: float, lon: float, city: str, revenue: float, quantity: int, approximate: bool = False,
+            orders: int = 1):
+        """Add one order location to its grid bin (orders=-1, with negated revenue and quantity, takes one back)"""
+        key = (int(lat // self.cell_size), int(lon // self.cell_size))
+        cell = self._bins.get(key)
+        if cell is None:
+            cell = self._bins[key] = [0.0, 0.0, 0, 0.0, 0]
+
+        cell[0] += lat * orders
+        cell[1] += lon * orders
+        cell[2] += orders
+        cell[3] += revenue
+        cell[4] += quantity
+        if not cell[2]:
+            del self._bins[key]
+
+        city = city or "Unknown"
+        city_orders = self._cities[city] = self._cities.get(city, 0) + orders
+        if not city_orders:
+            del self._cities[city]
+        self.mapped_orders += orders
+        self.mapped_revenue += revenue
+        if approximate:
+            self.geocoded_orders += orders
+
+    def merge(self, other: "GeoGrid"):
+        """Add another grid's bins (at the same zoom) into this one"""
+        for key, other_cell in other._bins.items():
+            cell = self._bins.get(key)
+            if cell is None:
+                self._bins[key] = list(other_cell)
+            else:
+                for index, value in enumerate(other_cell):
+                    cell[index] += value
+        for city, orders in other._cities.items():
+            self._cities[city] = self._cities.get(city, 0) + orders
+        self.mapped_orders += other.mapped_orders
+        self.mapped_revenue += other.mapped_revenue
+        self.geocoded_orders += other.geocoded_orders
+
+    @property
+    def unique_cities(self) -> int:
+        return len(self._cities)
+
+    def to_bins(self) -> List[Dict[str, Any]]:
+        """Get one record per occupied bin, positioned at the mean of its orders"""
+        return [
+            {
+                "lat": lat_sum / orders,
+                "lon": lon_sum / orders,
+                "orders": orders,
+                "revenue": revenue,
+                "quantity": quantity
+            }
+            for lat_sum, lon_sum, orders, revenue, quantity in self._bins.values()
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        """Get the running map totals"""
+        return {
+            "unique_cities": self.unique_cities,
+            "mapped_orders": self.mapped_orders,
+            "mapped_revenue": self.mapped_revenue,
+            "geocoded_orders": self.geocoded_orders,
+            "bin_count": len(self._bins),
+            "zoom": self.zoom
+        }
+
+
+class StateTotals:
+    """Per-state revenue, quantity and order counts keyed by compact state ID"""
+
+    def __init__(self):
+        self.names = list(STATE_NAMES)
+        self.revenue = [0.0] * len(self.names)
+        self.quantity = [0] * len(self.names)
+        self.orders = [0] * len(self.names)
+        self._extra_ids: Dict[str, int] = {}  # Provinces outside the normalization table, and outside India
+        self.total_revenue = 0.0
+        self.total_quantity = 0
+
+    def state_id(self, province: Optional[str], province_code: Optional[str] = None,
+                 country_code: Optional[str] = None) -> Optional[int]:
+        """Resolve a province to its state ID, registering unrecognized names so they are not dropped"""
+        state_id = get_state_id(province, province_code, country_code)
+        if state_id is not None or not province:
+            return state_id
+        return self._extra_id(province)
+
+    def _extra_id(self, province: str) -> int:
+        state_id = self._extra_ids.get(province)
+        if state_id is None:
+            state_id = self._extra_ids[province] = len(self.names)
+            self.names.append(province)
+            self.revenue.append(0.0)
+            self.quantity.append(0)
+            self.orders.append(0)
+        return state_id
+
+    def add(self, state_id: int, revenue: float, quantity: int, orders: int = 1):
+        """Add one order to a state (orders=-1, with negated revenue and quantity, takes one back)"""
+        self.revenue[state_id] += revenue
+        self.quantity[state_id] += quantity
+        self.orders[state_id] += orders
+        self.total_revenue += revenue
+        self.total_quantity += quantity
+
+    def merge(self, other: "StateTotals"):
+        """Add another set of state totals into this one, matching states by name"""
+        for other_id, orders in enumerate(other.orders):
+            if not orders:
+                continue
+            name = other.names[other_id]
+            state_id = other_id if other_id < len(STATE_NAMES) else self._extra_id(name)
+            self.revenue[state_id] += other.revenue[other_id]
+            self.quantity[state_id] += other.quantity[other_id]
+            self.orders[state_id] += orders
+        self.total_revenue += other.total_revenue
+        self.total_quantity += other.total_quantity
+
+    def revenue_by_state(self) -> Dict[str, float]:
+        """Get revenue keyed by canonical state name, for states with orders"""
+        return {self.names[state_id]: self.revenue[state_id] for state_id, orders in enumerate(self.orders) if orders}
+
+    def to_state_data(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-state totals and shares keyed by canonical state name, for states with orders"""
+        total_revenue = self.total_revenue
+        total_quantity = self.total_quantity
+        return {
+            self.names[state_id]: {
+                "revenue": self.revenue[state_id],
+                "quantity": self.quantity[state_id],
+                "orders": orders,
+                "revenue_percentage": (self.revenue[state_id] / total_revenue * 100) if total_revenue > 0 else 0,
+                "quantity_percentage": (self.quantity[state_id] / total_quantity * 100) if total_quantity > 0 else 0
+            }
+            for state_id, orders in enumerate(self.orders) if orders
+        }
+
+
+# Category for line items whose product has no product type; shown in shares but not in category rankings
+UNCATEGORIZED = "Uncategorized"
+
+# SKUs ranked per category for the category drill-down
+CATEGORY_TOP_SKUS = 10
+
+# Traffic source for tagged orders whose customer journey has no source
+DIRECT_SOURCE = "direct / none"
+
+
+class RankedTotals:
+    """Exact orders and revenue per key (a discount code or traffic source), ranked when read"""
+
+    __slots__ = ("_totals",)
+
+    def __init__(self):
+        self._totals: Dict[str, List[float]] = {}  # key -> [orders, revenue]
+
+    def __len__(self) -> int:
+        return len(self._totals)
+
+    def add(self, key: str, revenue: float, orders: int = 1):
+        totals = self._totals.get(key)
+        if totals is None:
+            totals = self._totals[key] = [0, 0.0]
+        totals[0] += orders
+        totals[1] += revenue
+        if not totals[0]:
+            del self._totals[key]
+
+    def merge(self, other: "RankedTotals"):
+        """Add another shop's totals into this one"""
+        for key, (orders, revenue) in other._totals.items():
+            self.add(key, revenue, orders)
+
+    def top(self, limit: int) -> List[Tuple[str, int, float]]:
+        """Get the top keys as (key, orders, revenue), sorted by revenue"""
+        ranked = heapq.nlargest(limit, self._totals.items(), key=lambda item: item[1][1])
+        return [(key, orders, revenue) for key, (orders, revenue) in ranked]
+
+
+# A customer's order counts packed into one int: all orders, orders placed as a new customer, and orders whose
+# new vs returning status is known, CUSTOMER_BITS bits each
+CUSTOMER_BITS = 20
+CUSTOMER_COUNT_MASK = (1 << CUSTOMER_BITS) - 1
+CUSTOMER_NEW_ORDER = 1 << CUSTOMER_BITS
+CUSTOMER_KNOWN_ORDER = 1 << (2 * CUSTOMER_BITS)
+
+
+def _customer_order(entry: LedgerEntry) -> int:
+    """Get an order's contribution to its customer's packed counts"""
+    if entry.customer_is_new is None:
+        return 1
+    return 1 + CUSTOMER_KNOWN_ORDER + (CUSTOMER_NEW_ORDER if entry.customer_is_new else 0)
+
+
+class MinuteRollup:
+    """Tagged orders and revenue, and all orders, per minute of a sale window"""
+
+    __slots__ = ("start_utc", "orders", "revenue", "all_orders")
+
+    def __init__(self, start_dt: datetime.datetime, end_dt: datetime.datetime):
+        self.start_utc = start_dt.astimezone(datetime.timezone.utc)
+        minutes = max(math.ceil((end_dt - start_dt).total_seconds() / 60), 1)
+        self.orders = [0] * minutes
+        self.revenue = [0.0] * minutes
+        self.all_orders = [0] * minutes
+
+    def minute_index(self, moment: datetime.datetime) -> int:
+        """Get the minute of the window a moment falls in, clamped to the window"""
+        index = int((moment - self.start_utc).total_seconds() // 60)
+        return min(max(index, 0), len(self.orders) - 1)
+
+    def add(self, created_at: datetime.datetime, amount: float, tagged: bool = True, orders: int = 1):
+        """Add an order to its minute (orders=-1 takes one back)"""
+        index = self.minute_index(created_at)
+        self.all_orders[index] += orders
+        if tagged:
+            self.orders[index] += orders
+            self.revenue[index] += amount
+
+    def merge(self, other: "MinuteRollup"):
+        """Add another rollup of the same window into this one"""
+        for index, orders in enumerate(other.orders):
+            self.orders[index] += orders
+            self.revenue[index] += other.revenue[index]
+            self.all_orders[index] += other.all_orders[index]
+
+    def cumulative_revenue(self, until: Optional[datetime.datetime] = None) -> List[float]:
+        """Get running revenue at the end of each minute, up to the minute containing until"""
+        last = len(self.revenue) if until is None else self.minute_index(until) + 1
+        return list(itertools.accumulate(self.revenue[:last]))
+
+
+class CampaignCounters:
+    """Order and revenue counters plus new vs returning customers for one campaign's orders
+
+    Orders are added as they are first seen and taken back when a later version supersedes them, so the
+    counters follow the ledger in time proportional to the orders that changed.
+    """
+
+    def __init__(self, basis: str = "net", forecaster: Optional[RunRateForecaster] = None,
+                 minutes: Optional[MinuteRollup] = None):
+        self.basis = basis
+        # Tagged-revenue run-rate and projection, and per-minute series, fed alongside tag_sales
+        self.forecaster = forecaster
+        self.minutes = minutes
+        self.total_orders = 0
+        self.total_sales = 0.0
+        self.tag_orders = 0
+        self.tag_sales = 0.0
+        # numeric customer id -> packed order counts (see _customer_order)
+        self._customers: Dict[Any, int] = {}
+        # Shop label -> that shop's counters, when these were merged from several shops
+        self.shops: Dict[str, "CampaignCounters"] = {}
+
+    def add_entry(self, entry: LedgerEntry, tagged: bool):
+        """Add one order from the overall order ledger"""
+        if entry.cancelled:
+            return
+
+        amount = entry.revenue(self.basis)
+        self.total_orders += 1
+        self.total_sales += amount
+        if tagged:
+            self.tag_orders += 1
+            self.tag_sales += amount
+            if self.forecaster is not None:
+                self.forecaster.add(entry.created_at, amount)
+        if self.minutes is not None:
+            self.minutes.add(entry.created_at, amount, tagged)
+
+        if entry.customer_id is not None:
+            self._customers[entry.customer_id] = self._customers.get(entry.customer_id, 0) + _customer_order(entry)
+
+    def remove_entry(self, entry: LedgerEntry, tagged: bool):
+        """Take back an order added earlier, when the ledger replaces it with a newer version"""
+        if entry.cancelled:
+            return
+
+        amount = entry.revenue(self.basis)
+        self.total_orders -= 1
+        self.total_sales -= amount
+        if tagged:
+            self.tag_orders -= 1
+            self.tag_sales -= amount
+            if self.forecaster is not None:
+                self.forecaster.remove(entry.created_at, amount)
+        if self.minutes is not None:
+            self.minutes.add(entry.created_at, -amount, tagged, orders=-1)
+
+        if entry.customer_id is not None:
+            packed = self._customers[entry.customer_id] - _customer_order(entry)
+            if packed & CUSTOMER_COUNT_MASK:
+                self._customers[entry.customer_id] = packed
+            else:
+                del self._customers[entry.customer_id]
+
+    def merge(self, other: "CampaignCounters"):
+        """Add another shop's counters for the same campaign into this one"""
+        self.total_orders += other.total_orders
+        self.total_sales += other.total_sales
+        self.tag_orders += other.tag_orders
+        self.tag_sales += other.tag_sales
+        if self.forecaster is not None and other.forecaster is not None:
+            self.forecaster.merge(other.forecaster)
+        if self.minutes is not None and other.minutes is not None:
+            self.minutes.merge(other.minutes)
+        customers = self._customers
+        for customer_id, packed in other._customers.items():
+            customers[customer_id] = customers.get(customer_id, 0) + packed
+
+    @property
+    def unique_customers(self) -> int:
+        return len(self._customers)
+
+    def customer_segmentation(self) -> Dict[str, int]:
+        """Get new vs returning customer and order counts"""
+        new_customers = returning_customers = new_customer_orders = returning_customer_orders = 0
+        for packed in self._customers.values():
+            orders = packed & CUSTOMER_COUNT_MASK
+            # New if any of their orders came within an hour of the customer's creation, i.e. their first
+            if packed & (CUSTOMER_COUNT_MASK << CUSTOMER_BITS):
+                new_customers += 1
+                new_customer_orders += orders
+            elif packed >> (2 * CUSTOMER_BITS):
+                returning_customers += 1
+                returning_customer_orders += orders
+
+        return {
+            "new_customers": new_customers,
+            "returning_customers": returning_customers,
+            "new_customer_orders": new_customer_orders,
+            "returning_customer_orders": returning_customer_orders,
+            "total_customers": new_customers + returning_customers
+        }
+
+
+class CampaignAggregates:
+    """SKU, category and geographic totals for one campaign's tagged orders
+
+    Like CampaignCounters, orders are taken back with remove_entry when the ledger supersedes them. Removal
+    reads categories from the product catalog, so the aggregates are rebuilt whenever an existing product's
+    type or vendor changes (ProductCatalog.version).
+    """
+
+    def __init__(self, zoom: int = DEFAULT_MAP_ZOOM, basis: str = "net", products: Optional[ProductCatalog] = None):
+        self.basis = basis
+        self.products = products or ProductCatalog()  # Product type (category) and vendor by product ID
+        self.skus: Dict[str, List[float]] = {}  # sku -> [quantity, revenue]
+        self.categories: Dict[str, Dict[str, float]] = {}
+        self.skus_by_category: Dict[str, Dict[str, List[float]]] = {}  # category -> sku -> [quantity, revenue]
+        self.sku_titles: Dict[str, str] = {}  # One title per SKU rather than one per category row
+        self.sku_vendors: Dict[str, Optional[str]] = {}
+        self.line_revenue = 0.0
+        self.states = StateTotals()  # Keyed by normalized state ID, not raw province text
+        self.geo_grid = GeoGrid(zoom=zoom)  # Binned order locations for map plotting
+        self._geo_index = get_geo_index()  # Offline fallback for orders without coordinates
+        self.shops: Dict[str, "CampaignAggregates"] = {}  # Per-shop parts, when merged from several shops
+        self.orders = 0
+        self.revenue = 0.0
+        self.discount_codes = RankedTotals()
+        self.sources = RankedTotals()
+        self.coded_orders = 0  # Orders using at least one discount code
+        self.coded_revenue = 0.0
+
+    def add_entry(self, entry: LedgerEntry):
+        """Add one tagged order from the campaign order ledger"""
+        self._apply(entry, 1)
+
+    def remove_entry(self, entry: LedgerEntry):
+        """Take back a tagged order added earlier, when the ledger replaces it with a newer version"""
+        self._apply(entry, -1)
+
+    def _apply(self, entry: LedgerEntry, sign: int):
+        if entry.cancelled:
+            return
+
+        order_revenue = entry.revenue(self.basis) * sign
+        self._add_attribution(entry, order_revenue, sign)
+
+        factor = entry.line_revenue_factor(self.basis) * sign
+        order_quantity = 0
+        for sku, title, quantity, line_gross, product_id in entry.line_items:
+            product_type, vendor = self.products.get(product_id)
+            revenue = line_gross * factor
+            quantity *= sign
+            category = product_type or UNCATEGORIZED
+
+            order_quantity += quantity
+            self.line_revenue += revenue
+
+            sku_totals = self.skus.get(sku)
+            if sku_totals is None:
+                sku_totals = self.skus[sku] = [0, 0.0]
+            sku_totals[0] += quantity
+            sku_totals[1] += revenue
+
+            if category not in self.categories:
+                self.categories[category] = {"quantity": 0, "revenue": 0.0}
+                self.skus_by_category[category] = {}
+            self.categories[category]["quantity"] += quantity
+            self.categories[category]["revenue"] += revenue
+
+            category_sku = self.skus_by_category[category].get(sku)
+            if category_sku is None:
+                category_sku = self.skus_by_category[category][sku] = [0, 0.0]
+                self.sku_titles.setdefault(sku, title)
+                self.sku_vendors.setdefault(sku, vendor)
+            category_sku[0] += quantity
+            category_sku[1] += revenue
+
+            # Line quantities are positive, so a total back at zero has no lines left
+            if sign < 0:
+                if not sku_totals[0]:
+                    del self.skus[sku]
+                if not category_sku[0]:
+                    del self.skus_by_category[category][sku]
+                if not self.categories[category]["quantity"]:
+                    del self.categories[category]
+                    del self.skus_by_category[category]
+
+        shipping_addr = entry.shipping_address
+        if shipping_addr:
+            self._add_location(shipping_addr, order_revenue, order_quantity, sign)
+
+    def _add_attribution(self, entry: LedgerEntry, revenue: float, orders: int):
+        self.orders += orders
+        self.revenue += revenue
+        self.sources.add(entry.source or DIRECT_SOURCE, revenue, orders)
+        if entry.discount_codes:
+            self.coded_orders += orders
+            self.coded_revenue += revenue
+            # An order using two codes credits its full revenue to each
+            for code in entry.discount_codes:
+                self.discount_codes.add(code, revenue, orders)
+
+    def _add_location(self, shipping_addr: ShippingAddress, revenue: float, order_quantity: int, orders: int):
+        state_id = self.states.state_id(shipping_addr.province, shipping_addr.province_code,
+                                        shipping_addr.country_code)
+        state = self.states.names[state_id] if state_id is not None else None
+        city = shipping_addr.city
+
+        coords = None
+        approximate = False
+        if shipping_addr.latitude is not None and shipping_addr.longitude is not None:
+            coords = (shipping_addr.latitude, shipping_addr.longitude)
+        elif (shipping_addr.country_code or "IN").upper() == "IN":
+            # Fall back to the offline index of Indian places for missing (or unparseable) coordinates
+            coords = self._geo_index.lookup(shipping_addr.zip, city, state)
+            approximate = True
+
+        # Validate coordinates are within India bounds
+        if coords and in_india_bounds(*coords):
+            self.geo_grid.add(coords[0], coords[1], city, revenue, order_quantity, approximate=approximate,
+                              orders=orders)
+
+        if state_id is not None:
+            self.states.add(state_id, revenue, order_quantity, orders)
+
+    def merge(self, other: "CampaignAggregates"):
+        """Add another shop's aggregates for the same campaign into this one"""
+        for sku, (quantity, revenue) in other.skus.items():
+            totals = self.skus.setdefault(sku, [0, 0.0])
+            totals[0] += quantity
+            totals[1] += revenue
+        for category, other_totals in other.categories.items():
+            totals = self.categories.setdefault(category, {"quantity": 0, "revenue": 0.0})
+            totals["quantity"] += other_totals["quantity"]
+            totals["revenue"] += other_totals["revenue"]
+            category_skus = self.skus_by_category.setdefault(category, {})
+            for sku, (quantity, revenue) in other.skus_by_category[category].items():
+                sku_totals = category_skus.setdefault(sku, [0, 0.0])
+                sku_totals[0] += quantity
+                sku_totals[1] += revenue
+        for sku, title in other.sku_titles.items():
+            self.sku_titles.setdefault(sku, title)
+        for sku, vendor in other.sku_vendors.items():
+            self.sku_vendors.setdefault(sku, vendor)
+        self.line_revenue += other.line_revenue
+        self.orders += other.orders
+        self.revenue += other.revenue
+        self.discount_codes.merge(other.discount_codes)
+        self.sources.merge(other.sources)
+        self.coded_orders += other.coded_orders
+        self.coded_revenue += other.coded_revenue
+        self.states.merge(other.states)
+        self.geo_grid.merge(other.geo_grid)
+
+    def top_skus(self, limit: int = 10) -> List[Tuple[str, int, float]]:
+        """Get the top SKUs as (sku, quantity, revenue), sorted by revenue"""
+        return sorted(
+            [(sku, totals[0], totals[1]) for sku, totals in self.skus.items()],
+            key=lambda x: x[2],
+            reverse=True
+        )[:limit]
+
+    def category_info(self) -> Dict[str, Any]:
+        """Get category totals with revenue shares and per-category SKU totals"""
+        total_revenue = self.line_revenue
+        category_data = {
+            category: dict(totals, share_percentage=(totals["revenue"] / total_revenue * 100) if total_revenue > 0 else 0)
+            for category, totals in self.categories.items()
+        }
+        all_skus_by_category = {
+            category: {
+                sku: {"title": self.sku_titles[sku], "vendor": self.sku_vendors[sku], "quantity": totals[0],
+                      "revenue": totals[1]}
+                for sku, totals in category_skus.items()
+            }
+            for category, category_skus in self.skus_by_category.items()
+        }
+        return {
+            "category_data": category_data,
+            "all_skus_by_category": all_skus_by_category,
+            "total_revenue": total_revenue
+        }
+
+    def category_rankings(self, top_n: int = CATEGORY_TOP_SKUS) -> Dict[str, Any]:
+        """Get the category section's tables, ranked by revenue once per snapshot so rendering only slices them"""
+        total_revenue = self.line_revenue
+        ranked = [
+            (category, totals["quantity"], totals["revenue"],
+             (totals["revenue"] / total_revenue * 100) if total_revenue > 0 else 0)
+            for category, totals in sorted(self.categories.items(), key=lambda item: item[1]["revenue"], reverse=True)
+        ]
+        categorized = [row for row in ranked if row[0].lower() != UNCATEGORIZED.lower()]
+        categorized_revenue = sum(row[2] for row in categorized)
+        return {
+            # (category, quantity, revenue, share %), without Uncategorized
+            "categories": categorized,
+            # (category, share %) for every category, Uncategorized included, for the share chart
+            "shares": [(category, share) for category, _, _, share in ranked],
+            # category -> its top SKUs as (sku, title, quantity, revenue)
+            "top_skus": {
+                category: [
+                    (sku, self.sku_titles[sku], totals[0], totals[1])
+                    for sku, totals in heapq.nlargest(top_n, self.skus_by_category[category].items(),
+                                                      key=lambda item: item[1][1])
+                ]
+                for category, _, _, _ in categorized
+            },
+            "categorized_revenue": categorized_revenue,
+            "uncategorized_revenue": total_revenue - categorized_revenue,
+            "total_revenue": total_revenue
+        }
+
+    def geographic_data(self) -> Dict[str, Any]:
+        """Get state totals and binned map locations"""
+        return {
+            "state_data": self.states.to_state_data(),  # Includes revenue/quantity percentages
+            "map_bins": self.geo_grid.to_bins(),  # Order-count/revenue weighted grid bins
+            "map_summary": self.geo_grid.summary(),
+            "total_revenue": self.states.total_revenue,
+            "total_quantity": self.states.total_quantity
+        }
+
+    def attribution_data(self, limit: int = 20) -> Dict[str, Any]:
+        """Get the top discount codes and traffic sources with their orders and revenue"""
+        return {
+            "discount_codes": self.discount_codes.top(limit),
+            "sources": self.sources.top(limit),
+            "orders": self.orders,
+            "revenue": self.revenue,
+            "coded_orders": self.coded_orders,
+            "coded_revenue": self.coded_revenue
+        }
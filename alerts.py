@@ -0,0 +1,236 @@
+"""Anomaly alerts on sales velocity and Shopify sync errors
+
+SalesAnomalyDetector walks a campaign's MinuteRollup one completed minute at a time. It compares each minute
+with a rolling baseline of the minutes before it, scaled by the hour-of-day profile of past sales when one
+is stored. It flags sharp drops and spikes (z-score), a run of minutes with no orders at all (checkout
+outage) and a run with orders but none tagged (stalled tag). ErrorRateDetector does the same for sync
+failures per minute. Each minute costs O(1), since baselines keep running sums over a fixed window.
+"""
+import collections
+import datetime
+import logging
+import math
+from typing import Any, Deque, Dict, List, Optional
+
+import requests
+
+from aggregation import MinuteRollup
+
+logger = logging.getLogger(__name__)
+
+ALERT_Z_THRESHOLD = 3.0
+BASELINE_MINUTES = 30
+MIN_BASELINE_MINUTES = 10
+
+# Consecutive minutes before a checkout outage or stalled tag is reported
+STREAK_MINUTES = 5
+
+# Minimum baseline orders per minute for drops and streaks to mean anything
+MIN_BASELINE_ORDERS = 0.5
+
+# A minute is evaluated this long after it ends, once the order scans have caught up with it
+EVALUATION_DELAY = datetime.timedelta(minutes=1)
+
+# Minutes older than this when first evaluated (e.g. catching up after a restart) feed the baseline silently
+ALERT_LOOKBACK = datetime.timedelta(minutes=15)
+
+# Alerts kept by the engine, and how long the dashboard lists them
+MAX_ALERTS = 50
+ALERT_RETENTION = datetime.timedelta(hours=1)
+
+
+class RollingBaseline:
+    """Mean and standard deviation of the last window values, updated in O(1) per value"""
+
+    __slots__ = ("window", "poisson", "_values", "_sum", "_sum_sq")
+
+    def __init__(self, window: int = BASELINE_MINUTES, poisson: bool = False):
+        self.window = window
+        # Counts are noisy at low rates; treat the spread as at least Poisson so quiet minutes are not anomalies
+        self.poisson = poisson
+        self._values: Deque[float] = collections.deque()
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def push(self, value: float):
+        self._values.append(value)
+        self._sum += value
+        self._sum_sq += value * value
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            self._sum -= old
+            self._sum_sq -= old * old
+
+    @property
+    def mean(self) -> float:
+        return self._sum / len(self._values) if self._values else 0.0
+
+    @property
+    def std(self) -> float:
+        if not self._values:
+            return 0.0
+        variance = max(self._sum_sq / len(self._values) - self.mean ** 2, 0.0)
+        floor = math.sqrt(max(self.mean, 1.0)) if self.poisson else 0.1 * self.mean
+        return max(math.sqrt(variance), floor)
+
+    def zscore(self, value: float, scale: float = 1.0) -> Optional[float]:
+        """Get value's z-score against the baseline scaled by a seasonal factor, or None while warming up"""
+        std = self.std * scale
+        if len(self._values) < MIN_BASELINE_MINUTES or std <= 0:
+            return None
+        return (value - self.mean * scale) / std
+
+
+def make_alert(kind: str, severity: str, message: str, at: datetime.datetime, campaign: Optional[str] = None,
+               **details) -> Dict[str, Any]:
+    return {"kind": kind, "severity": severity, "message": message, "at": at.isoformat(), "campaign": campaign,
+            **details}
+
+
+class SalesAnomalyDetector:
+    """Per-minute velocity checks for one campaign, resumed from the last evaluated minute on every scan"""
+
+    def __init__(self, campaign_name: str, weights: Optional[List[float]] = None,
+                 tz: Optional[datetime.tzinfo] = None):
+        self.campaign_name = campaign_name
+        self.weights = weights
+        self.tz = tz or datetime.timezone.utc
+        self.next_minute = 0
+        self.orders = RollingBaseline(poisson=True)
+        self.revenue = RollingBaseline()
+        self.all_orders = RollingBaseline(poisson=True)
+        self._quiet_streak = 0
+        self._untagged_streak = 0
+        # Set while consecutive minutes stay anomalous, so a drop or spike is reported once
+        self._anomalous = False
+
+    def _seasonal_factor(self, minute_start: datetime.datetime) -> float:
+        # Expected level this hour relative to the middle of the baseline window
+        if not self.weights:
+            return 1.0
+        baseline_mid = minute_start - datetime.timedelta(minutes=self.orders.window // 2)
+        return self.weights[minute_start.astimezone(self.tz).hour] / self.weights[baseline_mid.astimezone(self.tz).hour]
+
+    def evaluate(self, minutes: MinuteRollup, now: datetime.datetime) -> List[Dict[str, Any]]:
+        """Check every minute completed since the last call and return the alerts raised"""
+        completed = int((now - EVALUATION_DELAY - minutes.start_utc).total_seconds() // 60)
+        last = min(completed, len(minutes.orders)) - 1
+
+        alerts = []
+        for minute in range(self.next_minute, last + 1):
+            minute_start = minutes.start_utc + datetime.timedelta(minutes=minute)
+            raised = self._check(minute_start, minutes.orders[minute], minutes.revenue[minute],
+                                 minutes.all_orders[minute])
+            if now - minute_start <= ALERT_LOOKBACK:
+                alerts.extend(raised)
+        self.next_minute = max(self.next_minute, last + 1)
+        return alerts
+
+    def _check(self, at: datetime.datetime, orders: int, revenue: float, all_orders: int) -> List[Dict[str, Any]]:
+        alerts = []
+        scale = self._seasonal_factor(at)
+        usual_orders = self.orders.mean * scale
+        usual_all = self.all_orders.mean * scale
+        warmed_up = len(self.orders) >= MIN_BASELINE_MINUTES
+
+        self._quiet_streak = self._quiet_streak + 1 if all_orders == 0 else 0
+        self._untagged_streak = self._untagged_streak + 1 if orders == 0 and all_orders > 0 else 0
+
+        if warmed_up and self._quiet_streak == STREAK_MINUTES and usual_all >= MIN_BASELINE_ORDERS:
+            alerts.append(make_alert(
+                "checkout_outage", "critical",
+                f"No orders at all for {STREAK_MINUTES} minutes (usually {usual_all:.1f}/min). Check checkout and payments.",
+                at, self.campaign_name, expected=usual_all
+            ))
+        elif warmed_up and self._untagged_streak == STREAK_MINUTES and usual_orders >= MIN_BASELINE_ORDERS:
+            alerts.append(make_alert(
+                "tag_stalled", "critical",
+                f"Orders are coming in but none were tagged for {STREAK_MINUTES} minutes "
+                f"(usually {usual_orders:.1f}/min). Check the tagging rule.",
+                at, self.campaign_name, expected=usual_orders
+            ))
+        else:
+            order_z = self.orders.zscore(orders, scale)
+            revenue_z = self.revenue.zscore(revenue, scale)
+            usual_revenue = self.revenue.mean * scale
+            kind = None
+            if order_z is not None and revenue_z is not None:
+                z = min(order_z, revenue_z)
+                if z <= -ALERT_Z_THRESHOLD and usual_orders >= MIN_BASELINE_ORDERS:
+                    kind, severity = "velocity_drop", "warning"
+                elif order_z >= ALERT_Z_THRESHOLD and orders >= 5:
+                    kind, severity, z = "velocity_spike", "info", order_z
+            if kind is not None and not self._anomalous:
+                alerts.append(make_alert(
+                    kind, severity,
+                    f"{orders} campaign orders and {revenue:,.0f} revenue this minute, against a usual "
+                    f"{usual_orders:.1f} and {usual_revenue:,.0f} (z = {z:.1f}).",
+                    at, self.campaign_name, value=orders, expected=usual_orders, z=z
+                ))
+            self._anomalous = kind is not None
+
+        self.orders.push(orders)
+        self.revenue.push(revenue)
+        self.all_orders.push(all_orders)
+        return alerts
+
+
+class ErrorRateDetector:
+    """Sync failures per minute against a rolling baseline, plus a run of consecutive failures per scan"""
+
+    def __init__(self, failure_streak: int = 3):
+        self.failure_streak = failure_streak
+        self.errors = RollingBaseline(poisson=True)
+        self._minute: Optional[datetime.datetime] = None
+        self._count = 0
+        self._consecutive: Dict[str, int] = {}
+
+    def record(self, scan: str, error: Optional[str], now: datetime.datetime) -> List[Dict[str, Any]]:
+        """Record one scan attempt (error is None on success) and return the alerts raised"""
+        alerts = self._roll(now)
+        if error is None:
+            self._consecutive[scan] = 0
+            return alerts
+
+        self._count += 1
+        streak = self._consecutive[scan] = self._consecutive.get(scan, 0) + 1
+        if streak == self.failure_streak:
+            alerts.append(make_alert(
+                "sync_failing", "critical",
+                f"The {scan} sync has failed {streak} times in a row: {error}",
+                now, scan=scan, error=error
+            ))
+        return alerts
+
+    def _roll(self, now: datetime.datetime) -> List[Dict[str, Any]]:
+        minute = now.replace(second=0, microsecond=0)
+        if self._minute is None:
+            self._minute = minute
+        alerts = []
+        # Close the finished minute, then any idle minutes since (capped at the window, which they fill)
+        idle = 0
+        while self._minute < minute and idle <= self.errors.window:
+            z = self.errors.zscore(self._count)
+            if z is not None and z >= ALERT_Z_THRESHOLD and self._count >= 3:
+                alerts.append(make_alert(
+                    "error_spike", "warning",
+                    f"{self._count} Shopify sync errors in a minute against a usual {self.errors.mean:.1f}.",
+                    self._minute, value=self._count, expected=self.errors.mean, z=z
+                ))
+            self.errors.push(self._count)
+            self._count = 0
+            self._minute += datetime.timedelta(minutes=1)
+            idle += 1
+        self._minute = max(self._minute, minute)
+        return alerts
+
+
+def post_webhook(url: str, alerts: List[Dict[str, Any]]):
+    """Send alerts to a webhook sink as one JSON POST; failures are logged, never raised"""
+    try:
+        requests.post(url, json={"alerts": alerts}, timeout=5).raise_for_status()
+    except Exception as e:
+        logger.warning("Alert webhook %s failed: %s", url, e)
@@ -0,0 +1,104 @@
+"""Compact archive of finished campaigns
+
+Once a sale has ended, its per-minute tagged orders and revenue plus its top SKUs, categories and states
+are saved as one zlib-compressed JSON record (a few KB). The comparison view overlays any archived campaign
+on the current one from these records, without re-fetching its orders.
+"""
+import datetime
+import json
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from aggregation import CampaignAggregates, CampaignCounters
+from campaigns import Campaign
+
+ARCHIVE_VERSION = 1
+
+# Wait this long after a sale ends before archiving it, so late edits and early refunds are included
+ARCHIVE_DELAY = datetime.timedelta(minutes=15)
+
+ARCHIVE_TOP_N = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaign_archive (
+    campaign TEXT PRIMARY KEY,
+    start_at REAL NOT NULL,
+    end_at REAL NOT NULL,
+    archived_at REAL NOT NULL,
+    payload BLOB NOT NULL
+)
+"""
+
+
+def build_archive(campaign: Campaign, counters: CampaignCounters, aggregates: CampaignAggregates) -> Dict[str, Any]:
+    """Summarise a finished campaign's counters and aggregates into an archive record"""
+    states = sorted(aggregates.states.to_state_data().items(), key=lambda item: item[1]["revenue"], reverse=True)
+    categories = sorted(aggregates.categories.items(), key=lambda item: item[1]["revenue"], reverse=True)
+    return {
+        "version": ARCHIVE_VERSION,
+        "name": campaign.name,
+        "target_tags": campaign.target_tags,
+        "start": campaign.start_dt.isoformat(),
+        "end": campaign.end_dt.isoformat(),
+        "revenue_basis": counters.basis,
+        "totals": {
+            "total_orders": counters.total_orders,
+            "total_sales": round(counters.total_sales, 2),
+            "tag_orders": counters.tag_orders,
+            "tag_sales": round(counters.tag_sales, 2),
+            "unique_customers": counters.unique_customers
+        },
+        # Whole rupees per minute keep the series small; totals above stay exact
+        "minute_orders": counters.minutes.orders,
+        "minute_revenue": [round(revenue) for revenue in counters.minutes.revenue],
+        "top_skus": [[sku, quantity, round(revenue, 2)] for sku, quantity, revenue in aggregates.top_skus(ARCHIVE_TOP_N)],
+        "top_categories": [[category, totals["quantity"], round(totals["revenue"], 2)]
+                           for category, totals in categories[:ARCHIVE_TOP_N]],
+        "top_states": [[state, totals["orders"], round(totals["revenue"], 2)] for state, totals in states[:ARCHIVE_TOP_N]]
+    }
+
+
+class ArchiveStore:
+    """Archived campaigns in a SQLite file (usually the snapshot or warm-start file)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save(self, record: Dict[str, Any]):
+        """Store (or replace) a campaign's archive record"""
+        payload = zlib.compress(json.dumps(record, separators=(",", ":")).encode(), 9)
+        start_at = datetime.datetime.fromisoformat(record["start"]).timestamp()
+        end_at = datetime.datetime.fromisoformat(record["end"]).timestamp()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO campaign_archive (campaign, start_at, end_at, archived_at, payload) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (record["name"], start_at, end_at, time.time(), payload)
+            )
+
+    def names(self) -> List[str]:
+        """Get archived campaign names, most recent sale first"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT campaign FROM campaign_archive ORDER BY start_at DESC").fetchall()
+        return [row[0] for row in rows]
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        """Get a campaign's archive record, or None if it has not been archived"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload FROM campaign_archive WHERE campaign = ?", (name,)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
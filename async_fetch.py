@@ -0,0 +1,189 @@
+"""Asyncio fetch client for the Shopify Admin GraphQL API
+
+Every request goes through one concurrency limit and one cost bucket per shop, so independent ingestion
+streams can page concurrently without tripping Shopify's query-cost throttle. The event loop runs on a
+background thread (AsyncRunner), which lets synchronous callers such as Streamlit scripts and the daemon
+share it.
+"""
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Coroutine, Dict, List, Optional
+
+import requests
+
+from graphql_page import GraphQLPage, loads
+from ingest import build_orders_query
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+# Shopify's standard-plan bucket; replaced by the throttleStatus of the first response
+DEFAULT_BUCKET_SIZE = 1000.0
+DEFAULT_RESTORE_RATE = 50.0
+
+# Cost assumed for a query before Shopify has reported its requestedQueryCost
+DEFAULT_QUERY_COST = 250.0
+
+ORDERS_CONNECTION = ("data", "orders")
+
+
+class ThrottledError(Exception):
+    """Raised when Shopify rejects a query for exceeding the available query cost"""
+
+
+async def gather_or_cancel(*awaitables: Awaitable) -> List[Any]:
+    """Await awaitables concurrently like asyncio.gather; if one fails, cancel and await the rest before re-raising
+
+    Plain gather leaves the others running unowned, so a retried refresh could sync the same ledger twice at once.
+    """
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+class CostLimiter:
+    """Client-side mirror of Shopify's leaky query-cost bucket, corrected by each response's throttleStatus"""
+
+    def __init__(self, bucket_size: float = DEFAULT_BUCKET_SIZE, restore_rate: float = DEFAULT_RESTORE_RATE):
+        self.bucket_size = bucket_size
+        self.restore_rate = restore_rate
+        self.available = bucket_size
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _restore(self):
+        now = time.monotonic()
+        self.available = min(self.bucket_size, self.available + (now - self._updated_at) * self.restore_rate)
+        self._updated_at = now
+
+    async def acquire(self, cost: float):
+        """Wait until the bucket holds cost points, then spend them"""
+        cost = min(cost, self.bucket_size)
+        # Waiters queue on the lock, so a large query is not starved by a stream of small ones
+        async with self._lock:
+            self._restore()
+            while self.available < cost:
+                await asyncio.sleep((cost - self.available) / self.restore_rate)
+                self._restore()
+            self.available -= cost
+
+    def update(self, throttle_status: Optional[Dict[str, Any]]):
+        """Adopt the bucket state Shopify reported in extensions.cost.throttleStatus"""
+        if not throttle_status:
+            return
+        self.bucket_size = float(throttle_status.get("maximumAvailable", self.bucket_size))
+        self.restore_rate = float(throttle_status.get("restoreRate", self.restore_rate))
+        self.available = float(throttle_status.get("currentlyAvailable", self.available))
+        self._updated_at = time.monotonic()
+
+
+class ShopifyGraphQLClient:
+    """Sends GraphQL queries under a shared concurrency limit and cost bucket"""
+
+    def __init__(self, endpoint: str, headers: Dict[str, str], max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 limiter: Optional[CostLimiter] = None, retries: int = 3, json_backend: str = "stream"):
+        self.endpoint = endpoint
+        self.headers = headers
+        self.retries = retries
+        self.json_backend = json_backend
+        self.limiter = limiter or CostLimiter()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._query_costs: Dict[str, float] = {}
+        # Query-cost points Shopify charged so far, by cost key (one per order stream)
+        self.spent: Dict[str, float] = {}
+
+    async def _post(self, query: str, variables: Dict[str, Any], cost_key: str) -> bytes:
+        """Send one query once the cost bucket allows it and return the raw response body"""
+        await self.limiter.acquire(self._query_costs.get(cost_key, DEFAULT_QUERY_COST))
+        async with self._semaphore:
+            # requests is blocking; a worker thread keeps the loop free for the other streams
+            resp = await asyncio.to_thread(
+                requests.post, self.endpoint,
+                json={"query": query, "variables": variables}, headers=self.headers, timeout=30
+            )
+        resp.raise_for_status()
+        return resp.content
+
+    def _check_response(self, has_data: bool, errors: Optional[List[Dict[str, Any]]],
+                        extensions: Optional[Dict[str, Any]], cost_key: str):
+        """Record a response's query cost, then raise if it was throttled or carried no data"""
+        cost = (extensions or {}).get("cost") or {}
+        self.limiter.update(cost.get("throttleStatus"))
+        if cost.get("requestedQueryCost") is not None:
+            self._query_costs[cost_key] = float(cost["requestedQueryCost"])
+        charged = cost.get("actualQueryCost", cost.get("requestedQueryCost"))
+        if charged is not None:
+            self.spent[cost_key] = self.spent.get(cost_key, 0.0) + float(charged)
+
+        errors = errors or []
+        if any((error.get("extensions") or {}).get("code") == "THROTTLED" for error in errors):
+            raise ThrottledError("Shopify query cost limit reached")
+        if not has_data:
+            raise RuntimeError(errors[0].get("message") if errors else "Empty GraphQL response")
+
+    async def execute(self, query: str, variables: Dict[str, Any], cost_key: Optional[str] = None) -> Dict[str, Any]:
+        """Run a query and return its data, retrying failures and throttling with linear backoff"""
+        cost_key = cost_key or query
+        for attempt in range(self.retries):
+            try:
+                body = loads(await self._post(query, variables, cost_key))
+                self._check_response(body.get("data") is not None, body.get("errors"), body.get("extensions"), cost_key)
+                return body["data"]
+            except Exception as e:
+                if attempt == self.retries - 1:
+                    raise e
+                await asyncio.sleep(1 * (attempt + 1))
+
+    async def iter_orders(self, query_filter: str, node_fields: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield order nodes matching a filter, decoding each page one order at a time"""
+        graphql_query = build_orders_query(query_filter, node_fields)
+        cursor = None
+
+        while True:
+            for attempt in range(self.retries):
+                yielded = False
+                try:
+                    page = GraphQLPage(await self._post(graphql_query, {"cursor": cursor}, node_fields),
+                                       ORDERS_CONNECTION, self.json_backend)
+                    for node in page.nodes():
+                        yielded = True
+                        yield node
+                    page_info = page.fields.get("data.orders.pageInfo")
+                    self._check_response(page_info is not None, page.fields.get("errors"),
+                                         page.fields.get("extensions"), node_fields)
+                    break
+                except Exception as e:
+                    # Orders already handed out cannot be taken back, so only an unread page is retried
+                    if yielded or attempt == self.retries - 1:
+                        raise e
+                    await asyncio.sleep(1 * (attempt + 1))
+
+            if not page_info["hasNextPage"]:
+                break
+            cursor = page_info["endCursor"]
+
+
+class AsyncRunner:
+    """Event loop on a daemon thread, shared by synchronous callers"""
+
+    def __init__(self, name: str = "shopify-fetch"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True).start()
+            return self._loop
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Schedule a coroutine on the loop; cancelling the returned future cancels the task"""
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop())
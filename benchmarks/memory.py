@@ -0,0 +1,86 @@
+"""Peak-memory benchmark for the order ledgers and aggregates
+
+Feeds synthetic orders through both ledgers and applies their changes to one campaign's counters and aggregates,
+the way DashboardEngine does after its first sync, then reports peak RSS above the baseline. Each size runs in
+a fresh child process so peaks do not carry over. Run it on two commits to compare representations:
+
+    python benchmarks/memory.py --orders 100000 200000
+"""
+import argparse
+import datetime
+import os
+import resource
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+COUNTER_EXCLUDED_FIELDS = ("name", "shippingAddress", "lineItems")
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(orders: int):
+    """Ingest and aggregate orders in this process and print: orders, baseline MB, peak MB, seconds"""
+    import synthetic
+    from aggregation import CampaignAggregates, CampaignCounters, MinuteRollup
+    from campaigns import Campaign
+    from ledger import OrderLedger
+
+    campaign = Campaign("Benchmark", [synthetic.TAG], synthetic.SALE_START,
+                        synthetic.SALE_START + datetime.timedelta(hours=synthetic.SALE_HOURS))
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+
+    counter_ledger = OrderLedger()
+    order_ledger = OrderLedger()
+    for order in synthetic.iter_orders(orders):
+        # The all-orders stream selects no line items or addresses (COUNTER_ORDER_FIELDS)
+        counter_ledger.apply({key: value for key, value in order.items() if key not in COUNTER_EXCLUDED_FIELDS})
+        if campaign.is_tagged(order["tags"]):
+            order_ledger.apply(order)
+
+    counters = CampaignCounters(minutes=MinuteRollup(campaign.start_dt, campaign.end_dt))
+    for _, entry in counter_ledger.changes():
+        if campaign.in_window(entry.created_at):
+            counters.add_entry(entry, campaign.is_tagged(entry.tags))
+    aggregates = CampaignAggregates(products=synthetic.make_catalog())
+    for _, entry in order_ledger.changes():
+        if campaign.in_window(entry.created_at):
+            aggregates.add_entry(entry)
+    aggregates.category_info()
+    aggregates.geographic_data()
+
+    print(orders, baseline, peak_rss_mb(), time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure peak RSS of the ledgers and aggregates")
+    parser.add_argument("--orders", type=int, nargs="+", default=[100_000], help="Order counts to measure")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.orders[0])
+        return
+
+    print(f"{'orders':>10}{'peak RSS':>12}{'per 100k':>12}{'seconds':>10}")
+    for orders in args.orders:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "--orders", str(orders)],
+            check=True, capture_output=True, text=True
+        ).stdout.split()
+        _, baseline, peak, seconds = (float(value) for value in output)
+        used = peak - baseline
+        print(f"{orders:>10,}{used:>10.1f}MB{used / orders * 100_000:>10.1f}MB{seconds:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
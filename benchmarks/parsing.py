@@ -0,0 +1,92 @@
+"""Per-page parse benchmark for the order scans
+
+Parses synthetic 250-order response bodies three ways and reports CPU time per page, alone and with each
+order applied to a ledger, and the transient allocation per page (peak traced memory while a page is
+applied, above what the ledger keeps afterwards):
+
+    resp.json   what the client did before: requests decodes the body and json builds the whole page
+    stream      GraphQLPage walking the body one order at a time (the default)
+    orjson      GraphQLPage with the optional orjson backend, parsing the whole page at once
+
+    python benchmarks/parsing.py --orders 25000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterator, List
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+from async_fetch import ORDERS_CONNECTION
+from graphql_page import GraphQLPage, orjson
+from ledger import OrderLedger
+
+
+def response_json_nodes(body: bytes) -> Iterator[Dict]:
+    resp = requests.Response()
+    resp._content = body
+    resp.headers["Content-Type"] = "application/json"
+    for edge in resp.json()["data"]["orders"]["edges"]:
+        yield edge["node"]
+
+
+def page_nodes(backend: str) -> Callable[[bytes], Iterator[Dict]]:
+    return lambda body: GraphQLPage(body, ORDERS_CONNECTION, backend).nodes()
+
+
+def measure(pages: List[bytes], parse: Callable[[bytes], Iterator[Dict]]) -> Dict[str, float]:
+    """Time parsing and applying every page, then trace the transient allocation of each page"""
+    started = time.process_time()
+    for body in pages:
+        for _ in parse(body):
+            pass
+    parse_seconds = time.process_time() - started
+
+    ledger = OrderLedger()
+    started = time.process_time()
+    for body in pages:
+        for node in parse(body):
+            ledger.apply(node)
+    seconds = time.process_time() - started
+
+    ledger = OrderLedger()
+    transient = 0
+    tracemalloc.start()
+    for body in pages:
+        tracemalloc.reset_peak()
+        for node in parse(body):
+            ledger.apply(node)
+        current, peak = tracemalloc.get_traced_memory()
+        transient = max(transient, peak - current)
+    tracemalloc.stop()
+    return {"parse_ms": parse_seconds / len(pages) * 1000, "apply_ms": seconds / len(pages) * 1000,
+            "transient_mb": transient / (1024 * 1024)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare order page parsing paths")
+    parser.add_argument("--orders", type=int, default=25_000, help="Orders to parse")
+    args = parser.parse_args()
+
+    pages = synthetic.make_pages(args.orders)
+    print(f"{len(pages)} pages, {sum(map(len, pages)) / len(pages) / 1024:.0f} KB each")
+
+    paths = {"resp.json": response_json_nodes, "stream": page_nodes("stream")}
+    if orjson is not None:
+        paths["orjson"] = page_nodes("orjson")
+
+    print(f"{'path':<12}{'parse ms':>10}{'+ ledger ms':>13}{'transient':>12}")
+    for name, parse in paths.items():
+        result = measure(pages, parse)
+        print(f"{name:<12}{result['parse_ms']:>10.2f}{result['apply_ms']:>13.2f}{result['transient_mb']:>10.2f}MB")
+
+
+if __name__ == "__main__":
+    main()
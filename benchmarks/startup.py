@@ -0,0 +1,86 @@
+"""Time-to-first-paint benchmark for the dashboard
+
+Runs main.py headless with Streamlit's AppTest against the shop in a secrets.toml and reports:
+
+    first paint   the first script run, i.e. what a new session sees before any scan completes
+    loaded        reruns until the background cold load has filled every panel
+
+Each repeat is a fresh session in the same process, so the first repeat is a cold start and the rest show
+the warm engine (and the warm-start snapshot, if `warm_start_path` is set):
+
+    python benchmarks/startup.py --secrets .streamlit/secrets.toml --repeats 3
+"""
+import argparse
+import os
+import sys
+import time
+import tomllib
+
+from streamlit.testing.v1 import AppTest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run main.py with its rerun pauses disabled, so each AppTest.run() is exactly one script run
+APP_SCRIPT = f"""
+import runpy, sys, time
+import streamlit as st
+sys.path.insert(0, {REPO_ROOT!r})
+st.rerun = lambda: None
+sleep, time.sleep = time.sleep, lambda seconds: None
+try:
+    runpy.run_path({os.path.join(REPO_ROOT, "main.py")!r}, run_name="__main__")
+finally:
+    time.sleep = sleep
+"""
+
+
+def time_session(secrets: dict, timeout: float, poll_interval: float) -> dict:
+    """Open one session and time its first paint and full load"""
+    app = AppTest.from_string(APP_SCRIPT, default_timeout=timeout)
+    for key, value in secrets.items():
+        app.secrets[key] = value
+
+    started = time.perf_counter()
+    app.run()
+    first_paint = time.perf_counter() - started
+    painted_panels = sum(1 for panel in ("main", "sku", "map", "customer", "state", "category")
+                         if app.session_state[f"{panel}_data"] is not None)
+
+    runs = 1
+    while app.session_state["cold_load"] is not None and time.perf_counter() - started < timeout:
+        time.sleep(poll_interval)
+        app.run()
+        runs += 1
+
+    return {
+        "first_paint": first_paint,
+        "painted_panels": painted_panels,
+        "loaded": time.perf_counter() - started,
+        "runs": runs,
+        "exceptions": [e.value for e in app.exception]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure dashboard time-to-first-paint")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml", help="Path to a secrets.toml file")
+    parser.add_argument("--repeats", type=int, default=3, help="Sessions to open, the first one cold")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for a full load")
+    parser.add_argument("--poll-interval", type=float, default=0.25, help="Seconds between reruns while loading")
+    args = parser.parse_args()
+
+    with open(args.secrets, "rb") as f:
+        secrets = tomllib.load(f)
+
+    print(f"{'session':<10}{'first paint':>14}{'panels':>8}{'loaded':>12}{'runs':>6}")
+    for repeat in range(args.repeats):
+        result = time_session(secrets, args.timeout, args.poll_interval)
+        label = "cold" if repeat == 0 else f"warm {repeat}"
+        print(f"{label:<10}{result['first_paint']:>13.3f}s{result['painted_panels']:>6}/6"
+              f"{result['loaded']:>11.3f}s{result['runs']:>6}")
+        for exception in result["exceptions"]:
+            print(f"  exception: {exception}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Synthetic Shopify order nodes for the benchmarks
+
+Orders have the shape the ingestion queries return (LEDGER_FIELDS plus customer, shipping address and line
+items), with repeat customers, a few hundred SKUs and realistic string repetition. Generation is seeded, so
+runs are comparable.
+"""
+import copy
+import datetime
+import json
+import random
+from typing import Any, Dict, Iterator, List
+
+SALE_START = datetime.datetime(2025, 8, 15, 0, 0, tzinfo=datetime.timezone.utc)
+SALE_HOURS = 18
+TAG = "SALE18"
+
+CITIES = [
+    ("Mumbai", "Maharashtra", "MH", "400001", 19.076, 72.8777),
+    ("Pune", "Maharashtra", "MH", "411001", 18.5204, 73.8567),
+    ("New Delhi", "Delhi", "DL", "110001", 28.6139, 77.209),
+    ("Bengaluru", "Karnataka", "KA", "560001", 12.9716, 77.5946),
+    ("Chennai", "Tamil Nadu", "TN", "600001", 13.0827, 80.2707),
+    ("Hyderabad", "Telangana", "TG", "500001", 17.385, 78.4867),
+    ("Kolkata", "West Bengal", "WB", "700001", 22.5726, 88.3639),
+    ("Ahmedabad", "Gujarat", "GJ", "380001", 23.0225, 72.5714),
+    ("Jaipur", "Rajasthan", "RJ", "302001", 26.9124, 75.7873),
+    ("Lucknow", "Uttar Pradesh", "UP", "226001", 26.8467, 80.9462),
+]
+PRODUCT_TYPES = ["Jeans", "Shirts", "T-Shirts", "Jackets", "Shorts", "Chinos", None]
+VENDORS = ["18 Hour", "Denim Co", "Studio"]
+UTM_SOURCES = [("instagram", "social"), ("google", "cpc"), ("newsletter", "email"), (None, None)]
+
+
+def _money(amount: float) -> Dict[str, Any]:
+    return {"shopMoney": {"amount": f"{amount:.2f}"}}
+
+
+def make_order(index: int, count: int, rng: random.Random, skus: int = 400,
+               customers_per_order: float = 0.7) -> Dict[str, Any]:
+    """Build the index-th of count paid orders, spread evenly over the sale; about 30% are repeat customers"""
+    created_at = SALE_START + datetime.timedelta(seconds=SALE_HOURS * 3600 * (index + rng.random()) / count)
+    customer_number = rng.randrange(max(int(index * customers_per_order), 1)) if rng.random() < 0.3 else index
+    city, province, code, pin, lat, lon = rng.choice(CITIES)
+    has_coordinates = rng.random() < 0.6
+
+    line_items = []
+    subtotal = 0.0
+    for _ in range(rng.randint(1, 4)):
+        sku_number = int(rng.paretovariate(1.2)) % skus
+        quantity = rng.randint(1, 3)
+        price = 799 + (sku_number % 12) * 100
+        subtotal += price * quantity
+        line_items.append({"node": {
+            "sku": f"SKU-{sku_number:05d}",
+            "title": f"Product {sku_number} - Relaxed Fit",
+            "currentQuantity": quantity,
+            "originalUnitPriceSet": _money(price),
+            "product": {"id": f"gid://shopify/Product/{8000000000000 + sku_number}"}
+        }})
+
+    discounts = round(subtotal * rng.choice([0, 0, 0.1, 0.2]), 2)
+    # A few shared campaign codes plus a long tail of single-use codes
+    codes = []
+    if discounts:
+        codes = [rng.choice(["SALE18", "FLAT10", "WELCOME"]) if rng.random() < 0.8 else f"UNIQ{index:07d}"]
+    utm_source, utm_medium = rng.choice(UTM_SOURCES)
+    return {
+        "id": f"gid://shopify/Order/{5000000000000 + index}",
+        "name": f"#{100000 + index}",
+        "createdAt": created_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "updatedAt": created_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "cancelledAt": None,
+        "tags": [TAG, "web"] if rng.random() < 0.7 else ["web"],
+        "currentSubtotalPriceSet": _money(subtotal - discounts),
+        "currentTotalDiscountsSet": _money(discounts),
+        "refunds": [],
+        "customer": {
+            "id": f"gid://shopify/Customer/{7000000000000 + customer_number}",
+            "createdAt": (created_at - datetime.timedelta(days=rng.choice([0, 0, 30, 400]))).strftime("%Y-%m-%dT%H:%M:%SZ")
+        },
+        "discountCodes": codes,
+        "customerJourneySummary": {
+            "firstVisit": {"source": "Google", "landingPage": "/", "utmParameters": None},
+            "lastVisit": {"source": "direct", "landingPage": "/collections/sale",
+                          "utmParameters": {"source": utm_source, "medium": utm_medium} if utm_source else None}
+        },
+        "shippingAddress": {
+            "city": city, "province": province, "provinceCode": code, "countryCodeV2": "IN", "zip": pin,
+            "latitude": lat if has_coordinates else None, "longitude": lon if has_coordinates else None
+        },
+        "lineItems": {"edges": line_items}
+    }
+
+
+def remove_line(order: Dict[str, Any], position: int, refund: bool = False) -> Dict[str, Any]:
+    """Get a later version of an order with one line item removed by an order edit, or refunded"""
+    order = copy.deepcopy(order)
+    lines = [edge["node"] for edge in order["lineItems"]["edges"]]
+    values = [float(line["originalUnitPriceSet"]["shopMoney"]["amount"]) * line["currentQuantity"] for line in lines]
+    discounts = float(order["currentTotalDiscountsSet"]["shopMoney"]["amount"])
+    discount_rate = discounts / sum(values) if sum(values) else 0.0
+
+    lines[position]["currentQuantity"] = 0
+    remaining = sum(values) - values[position]
+    discounts = round(remaining * discount_rate, 2)
+    order["currentSubtotalPriceSet"] = _money(remaining - discounts)
+    order["currentTotalDiscountsSet"] = _money(discounts)
+    if refund:
+        refunded = _money(round(values[position] * (1 - discount_rate), 2))
+        order["refunds"] = order["refunds"] + [{"refundLineItems": {"edges": [{"node": {"subtotalSet": refunded}}]}}]
+    return order
+
+
+def product_node(product_id: int) -> Dict[str, Any]:
+    """Build the Product node a nodes(ids:) query returns for a numeric product ID"""
+    sku_number = product_id - 8000000000000
+    return {"id": f"gid://shopify/Product/{product_id}",
+            "productType": PRODUCT_TYPES[sku_number % len(PRODUCT_TYPES)],
+            "vendor": VENDORS[sku_number % len(VENDORS)]}
+
+
+def make_catalog(skus: int = 400):
+    """Build a ProductCatalog already holding every synthetic product"""
+    from products import ProductCatalog
+    catalog = ProductCatalog()
+    for sku_number in range(skus):
+        catalog.add_node(product_node(8000000000000 + sku_number))
+    return catalog
+
+
+def iter_orders(count: int, seed: int = 18) -> Iterator[Dict[str, Any]]:
+    """Yield count orders in creation order, one at a time"""
+    rng = random.Random(seed)
+    for index in range(count):
+        yield make_order(index, count, rng)
+
+
+def make_pages(count: int, page_size: int = 250, seed: int = 18) -> List[bytes]:
+    """Render count orders as GraphQL orders-connection response bodies, page_size orders each"""
+    orders = list(iter_orders(count, seed))
+    pages = []
+    for start in range(0, len(orders), page_size):
+        chunk = orders[start:start + page_size]
+        end = start + len(chunk)
+        pages.append(json.dumps({
+            "data": {"orders": {
+                "pageInfo": {"hasNextPage": end < len(orders), "endCursor": str(end) if end < len(orders) else None},
+                "edges": [{"node": order} for order in chunk]
+            }},
+            "extensions": {"cost": {
+                "requestedQueryCost": 252, "actualQueryCost": 252,
+                "throttleStatus": {"maximumAvailable": 2000.0, "currentlyAvailable": 1748, "restoreRate": 100.0}
+            }}
+        }).encode())
+    return pages
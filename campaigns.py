@@ -0,0 +1,91 @@
+import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+import pytz
+
+
+class Campaign:
+    """A sale window plus the order tags that count towards it"""
+
+    def __init__(self, name: str, target_tags: List[str], start_dt: datetime.datetime, end_dt: datetime.datetime):
+        self.name = name
+        self.target_tags = list(target_tags)
+        self.start_dt = start_dt
+        self.end_dt = end_dt
+        self.start_utc = start_dt.astimezone(pytz.UTC)
+        self.end_utc = end_dt.astimezone(pytz.UTC)
+        self._tag_keys = {tag.lower() for tag in target_tags}
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any], default_timezone: str) -> "Campaign":
+        """Build a campaign from a secrets.toml campaign table"""
+        tz = pytz.timezone(settings.get("timezone") or default_timezone)
+
+        start_date_str = f"{settings['sale_start_date']} {settings['sale_start_time']}"
+        end_date_str = f"{settings['sale_end_date']} {settings['sale_end_time']}"
+
+        start_dt = tz.localize(datetime.datetime.strptime(start_date_str, "%Y-%m-%d %H:%M"))
+        end_dt = tz.localize(datetime.datetime.strptime(end_date_str, "%Y-%m-%d %H:%M"))
+
+        return cls(settings.get("name") or ", ".join(settings["target_tags"]), settings["target_tags"], start_dt, end_dt)
+
+    def get_timeframe(self) -> Tuple[str, str, datetime.datetime]:
+        """Get the sale window as UTC ISO strings plus the local end time"""
+        return self.start_utc.isoformat(), self.end_utc.isoformat(), self.end_dt
+
+    def in_window(self, created_at: datetime.datetime) -> bool:
+        """Check whether an order timestamp falls in the sale window (start exclusive, end inclusive)"""
+        return self.start_utc < created_at <= self.end_utc
+
+    def is_tagged(self, tags: Iterable[str]) -> bool:
+        """Check whether any of an order's tags is a campaign tag (case-insensitive, like Shopify search)"""
+        return any(tag.lower() in self._tag_keys for tag in tags)
+
+
+class CampaignRegistry:
+    """The set of concurrently tracked campaigns, scanned through one shared ingestion stream"""
+
+    def __init__(self, campaigns: List[Campaign]):
+        if not campaigns:
+            raise ValueError("At least one campaign is required")
+        self.campaigns = campaigns
+        self._by_name = {campaign.name: campaign for campaign in campaigns}
+        if len(self._by_name) != len(campaigns):
+            raise ValueError("Campaign names must be unique")
+
+    @property
+    def names(self) -> List[str]:
+        return [campaign.name for campaign in self.campaigns]
+
+    def get(self, name: str) -> Campaign:
+        return self._by_name[name]
+
+    @property
+    def key(self) -> str:
+        """Stable identity for caching scans of this exact campaign set"""
+        return "|".join(
+            f"{c.name}:{','.join(sorted(c.target_tags))}:{c.start_utc.isoformat()}:{c.end_utc.isoformat()}"
+            for c in self.campaigns
+        )
+
+    def query_filter(self, tagged: bool) -> str:
+        """Get the Shopify search filter covering every campaign's window (and tags, if tagged)"""
+        start_iso = min(c.start_utc for c in self.campaigns).isoformat()
+        end_iso = max(c.end_utc for c in self.campaigns).isoformat()
+        date_query = f"created_at:>'{start_iso}' AND created_at:<='{end_iso}'"
+        # Refunded orders stay in the stream so the ledger can net their refunds out
+        paid_query = "(financial_status:paid OR financial_status:partially_refunded OR financial_status:refunded)"
+        if not tagged:
+            return f"{date_query} AND {paid_query}"
+
+        all_tags = sorted({tag for c in self.campaigns for tag in c.target_tags})
+        tag_query = " OR ".join(f"tag:{t}" for t in all_tags)
+        return f"({tag_query}) AND {date_query} AND {paid_query}"
+
+    def is_tagged(self, tags: Iterable[str]) -> bool:
+        """Check whether an order carries any campaign's tag"""
+        return any(c.is_tagged(tags) for c in self.campaigns)
+
+    def in_window(self, created_at: datetime.datetime) -> List[Campaign]:
+        """Get the campaigns whose sale window contains an order timestamp"""
+        return [c for c in self.campaigns if c.in_window(created_at)]
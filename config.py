@@ -1,42 +1,92 @@
-import os
-import streamlit as st
+import hashlib
+import json
+import tomllib
 from datetime import datetime
 import pytz
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Mapping, Optional
+from graphql_page import JSON_BACKENDS, orjson
+from ledger import REVENUE_BASES
+
+class ConfigError(ValueError):
+    """Raised when the dashboard configuration is missing or invalid"""
 
 class Config:
-    def __init__(self):
-        self._config = self._load_config()
+    """Dashboard configuration from a secrets.toml-shaped mapping, usable with or without Streamlit"""
+
+    def __init__(self, secrets: Mapping[str, Any]):
+        self._config = self._load_config(secrets)
         self._validate_config()
     
-    def _load_config(self) -> Dict[str, Any]:
-        """Load configuration from Streamlit secrets with fallbacks"""
+    @classmethod
+    def from_toml(cls, path: str) -> "Config":
+        """Load configuration from a secrets.toml file, for running outside Streamlit"""
+        with open(path, "rb") as f:
+            return cls(tomllib.load(f))
+    
+    def _load_config(self, secrets: Mapping[str, Any]) -> Dict[str, Any]:
+        """Load configuration from secrets (st.secrets or a parsed secrets.toml)"""
         try:
             return {
                 # Shopify Configuration
-                "ACCESS_TOKEN": st.secrets["shopify"]["access_token"],
-                "SHOP_NAME": st.secrets["shopify"]["shop_name"],
-                "API_VERSION": st.secrets["shopify"]["api_version"],
+                "ACCESS_TOKEN": secrets["shopify"]["access_token"],
+                "SHOP_NAME": secrets["shopify"]["shop_name"],
+                "API_VERSION": secrets["shopify"]["api_version"],
+                "SHOP_LABEL": secrets["shopify"].get("label"),
+                
+                # Additional storefronts running the same sale ([[shops]] tables), merged into combined totals
+                "EXTRA_SHOPS": [dict(s) for s in secrets.get("shops", [])],
                 
                 # Campaign Configuration
-                "TARGET_TAGS": st.secrets["campaign"]["target_tags"],
-                "SALE_START_DATE": st.secrets["campaign"]["sale_start_date"],
-                "SALE_START_TIME": st.secrets["campaign"]["sale_start_time"],
-                "SALE_END_DATE": st.secrets["campaign"]["sale_end_date"],
-                "SALE_END_TIME": st.secrets["campaign"]["sale_end_time"],
-                "TIMEZONE": st.secrets["campaign"]["timezone"],
+                "TARGET_TAGS": secrets["campaign"]["target_tags"],
+                "SALE_START_DATE": secrets["campaign"]["sale_start_date"],
+                "SALE_START_TIME": secrets["campaign"]["sale_start_time"],
+                "SALE_END_DATE": secrets["campaign"]["sale_end_date"],
+                "SALE_END_TIME": secrets["campaign"]["sale_end_time"],
+                "TIMEZONE": secrets["campaign"]["timezone"],
+                "CAMPAIGN_NAME": secrets["campaign"].get("name", "Primary Campaign"),
+                
+                # Additional concurrent campaigns ([[campaigns]] tables), scanned from the same order stream
+                "EXTRA_CAMPAIGNS": [dict(c) for c in secrets.get("campaigns", [])],
                 
                 # Dashboard Configuration
-                "MAIN_REFRESH_INTERVAL": st.secrets["dashboard"]["main_refresh_interval"],
-                "SKU_REFRESH_INTERVAL": st.secrets["dashboard"]["sku_refresh_interval"],
-                "MAP_REFRESH_INTERVAL": st.secrets["dashboard"]["map_refresh_interval"],
-                "CUSTOMER_REFRESH_INTERVAL": st.secrets["dashboard"]["customer_refresh_interval"],
-                "STATE_REFRESH_INTERVAL": st.secrets["dashboard"]["state_refresh_interval"],
+                "MAIN_REFRESH_INTERVAL": secrets["dashboard"]["main_refresh_interval"],
+                "SKU_REFRESH_INTERVAL": secrets["dashboard"]["sku_refresh_interval"],
+                "MAP_REFRESH_INTERVAL": secrets["dashboard"]["map_refresh_interval"],
+                "CUSTOMER_REFRESH_INTERVAL": secrets["dashboard"]["customer_refresh_interval"],
+                "STATE_REFRESH_INTERVAL": secrets["dashboard"]["state_refresh_interval"],
+                "CATEGORY_REFRESH_INTERVAL": secrets["dashboard"].get("category_refresh_interval", 300),
+                "ATTRIBUTION_REFRESH_INTERVAL": secrets["dashboard"].get("attribution_refresh_interval", 300),
+                
+                # Scale the intervals above by order velocity (orders per minute) and a query-cost budget
+                "ADAPTIVE_REFRESH": secrets["dashboard"].get("adaptive_refresh", True),
+                "SURGE_ORDERS_PER_MINUTE": secrets["dashboard"].get("surge_orders_per_minute", 30),
+                "LULL_ORDERS_PER_MINUTE": secrets["dashboard"].get("lull_orders_per_minute", 1),
+                # Average Shopify query-cost points per second that scheduled refreshes may spend, per shop
+                "API_COST_BUDGET": secrets["dashboard"].get("api_cost_budget", 10),
+                
+                # Revenue shown by every panel: "net" (after discounts, refunds, cancellations) or "gross"
+                "REVENUE_BASIS": secrets["dashboard"].get("revenue_basis", "net"),
+                
+                # SQLite snapshot feed written by daemon.py; when set, dashboards read it instead of polling Shopify
+                "SNAPSHOT_PATH": secrets["dashboard"].get("snapshot_path"),
+                
+                # SQLite file keeping the last good panel results, painted first by new sessions while they sync
+                "WARM_START_PATH": secrets["dashboard"].get("warm_start_path"),
+                
+                # Shopify requests each shop may have in flight at once, across its ingestion streams
+                "FETCH_CONCURRENCY": secrets["dashboard"].get("fetch_concurrency", 4),
+                
+                # How order pages are parsed: "stream" (one order at a time) or "orjson" (whole page, faster)
+                "JSON_BACKEND": secrets["dashboard"].get("json_backend", "stream"),
+                
+                # Seconds a product's type and vendor are cached before they are fetched again
+                "PRODUCT_CACHE_TTL": secrets["dashboard"].get("product_cache_ttl", 6 * 3600),
+                
+                # Local URL that raised alerts are POSTed to as JSON, in addition to the dashboard
+                "ALERT_WEBHOOK_URL": secrets["dashboard"].get("alert_webhook_url"),
             }
         except Exception as e:
-            st.error(f"Configuration Error: {str(e)}")
-            st.error("Please ensure your .streamlit/secrets.toml file is properly configured.")
-            st.stop()
+            raise ConfigError(f"Configuration Error: {str(e)}") from e
     
     def _validate_config(self):
         """Validate required configuration values"""
@@ -44,8 +94,31 @@ class Config:
         
         for field in required_fields:
             if not self._config.get(field):
-                st.error(f"Missing required configuration: {field}")
-                st.stop()
+                raise ConfigError(f"Missing required configuration: {field}")
+        
+        for shop in self._config["EXTRA_SHOPS"]:
+            if not shop.get("shop_name") or not shop.get("access_token"):
+                raise ConfigError("every [[shops]] entry needs a shop_name and access_token")
+        labels = [shop["label"] for shop in self.SHOPS]
+        if len(set(labels)) != len(labels):
+            raise ConfigError("shop labels must be unique (set label in [shopify] and [[shops]])")
+        
+        if not isinstance(self._config["FETCH_CONCURRENCY"], int) or self._config["FETCH_CONCURRENCY"] < 1:
+            raise ConfigError("fetch_concurrency must be a positive integer")
+        
+        for field in ("SURGE_ORDERS_PER_MINUTE", "LULL_ORDERS_PER_MINUTE", "API_COST_BUDGET"):
+            if not isinstance(self._config[field], (int, float)) or self._config[field] < 0:
+                raise ConfigError(f"{field.lower()} must be a non-negative number")
+        if self._config["LULL_ORDERS_PER_MINUTE"] > self._config["SURGE_ORDERS_PER_MINUTE"]:
+            raise ConfigError("lull_orders_per_minute must not exceed surge_orders_per_minute")
+        
+        if self._config["JSON_BACKEND"] not in JSON_BACKENDS:
+            raise ConfigError(f"json_backend must be one of {', '.join(JSON_BACKENDS)}")
+        if self._config["JSON_BACKEND"] == "orjson" and orjson is None:
+            raise ConfigError("json_backend = \"orjson\" needs the orjson package (pip install orjson)")
+        
+        if self._config["REVENUE_BASIS"] not in REVENUE_BASES:
+            raise ConfigError(f"revenue_basis must be one of {', '.join(REVENUE_BASES)}")
         
         # Validate date formats
         try:
@@ -53,9 +126,15 @@ class Config:
             datetime.strptime(self._config["SALE_END_DATE"], "%Y-%m-%d")
             datetime.strptime(self._config["SALE_START_TIME"], "%H:%M")
             datetime.strptime(self._config["SALE_END_TIME"], "%H:%M")
-        except ValueError as e:
-            st.error(f"Invalid date/time format in configuration: {str(e)}")
-            st.stop()
+            for campaign in self._config["EXTRA_CAMPAIGNS"]:
+                if not campaign.get("name") or not campaign.get("target_tags"):
+                    raise ValueError("every [[campaigns]] entry needs a name and target_tags")
+                datetime.strptime(campaign["sale_start_date"], "%Y-%m-%d")
+                datetime.strptime(campaign["sale_end_date"], "%Y-%m-%d")
+                datetime.strptime(campaign["sale_start_time"], "%H:%M")
+                datetime.strptime(campaign["sale_end_time"], "%H:%M")
+        except (KeyError, ValueError) as e:
+            raise ConfigError(f"Invalid date/time format in configuration: {str(e)}") from e
     
     @property
     def ACCESS_TOKEN(self) -> str:
@@ -84,6 +163,22 @@ class Config:
             "X-Shopify-Access-Token": self.ACCESS_TOKEN
         }
     
+    @property
+    def SHOPS(self) -> List[Dict[str, Any]]:
+        """Get every shop's label, GraphQL endpoint and headers, the [shopify] table first"""
+        primary = {"shop_name": self.SHOP_NAME, "access_token": self.ACCESS_TOKEN, "label": self._config["SHOP_LABEL"]}
+        shops = []
+        for shop in [primary] + self._config["EXTRA_SHOPS"]:
+            api_version = shop.get("api_version", self.API_VERSION)
+            shops.append({
+                "label": shop.get("label") or shop["shop_name"],
+                "shop_name": shop["shop_name"],
+                "api_version": api_version,
+                "endpoint": f"https://{shop['shop_name']}.myshopify.com/admin/api/{api_version}/graphql.json",
+                "headers": {"Content-Type": "application/json", "X-Shopify-Access-Token": shop["access_token"]}
+            })
+        return shops
+    
     def get_timeframe(self):
         """Get the configured timeframe for the sale"""
         tz = pytz.timezone(self._config["TIMEZONE"])
@@ -96,6 +191,24 @@ class Config:
         
         return start_dt.astimezone(pytz.UTC).isoformat(), end_dt.astimezone(pytz.UTC).isoformat(), end_dt
     
+    @property
+    def TIMEZONE(self) -> str:
+        return self._config["TIMEZONE"]
+    
+    @property
+    def CAMPAIGNS(self) -> List[Dict[str, Any]]:
+        """Get every campaign's settings, the [campaign] table first"""
+        primary = {
+            "name": self._config["CAMPAIGN_NAME"],
+            "target_tags": self._config["TARGET_TAGS"],
+            "sale_start_date": self._config["SALE_START_DATE"],
+            "sale_start_time": self._config["SALE_START_TIME"],
+            "sale_end_date": self._config["SALE_END_DATE"],
+            "sale_end_time": self._config["SALE_END_TIME"],
+            "timezone": self._config["TIMEZONE"]
+        }
+        return [primary] + self._config["EXTRA_CAMPAIGNS"]
+    
     @property
     def REFRESH_INTERVALS(self) -> Dict[str, int]:
         return {
@@ -103,8 +216,61 @@ class Config:
             "sku": self._config["SKU_REFRESH_INTERVAL"],
             "map": self._config["MAP_REFRESH_INTERVAL"],
             "customer": self._config["CUSTOMER_REFRESH_INTERVAL"],
-            "state": self._config["STATE_REFRESH_INTERVAL"]
+            "state": self._config["STATE_REFRESH_INTERVAL"],
+            "category": self._config["CATEGORY_REFRESH_INTERVAL"],
+            "attribution": self._config["ATTRIBUTION_REFRESH_INTERVAL"]
         }
-
-# Global config instance
-config = Config()
\ No newline at end of file
+    
+    @property
+    def ADAPTIVE_REFRESH(self) -> bool:
+        return bool(self._config["ADAPTIVE_REFRESH"])
+    
+    @property
+    def SURGE_ORDERS_PER_MINUTE(self) -> float:
+        return self._config["SURGE_ORDERS_PER_MINUTE"]
+    
+    @property
+    def LULL_ORDERS_PER_MINUTE(self) -> float:
+        return self._config["LULL_ORDERS_PER_MINUTE"]
+    
+    @property
+    def API_COST_BUDGET(self) -> float:
+        return self._config["API_COST_BUDGET"]
+    
+    @property
+    def REVENUE_BASIS(self) -> str:
+        return self._config["REVENUE_BASIS"]
+    
+    @property
+    def SNAPSHOT_PATH(self) -> Optional[str]:
+        return self._config["SNAPSHOT_PATH"]
+    
+    @property
+    def WARM_START_PATH(self) -> Optional[str]:
+        return self._config["WARM_START_PATH"]
+    
+    @property
+    def HISTORY_PATH(self) -> Optional[str]:
+        """SQLite file for campaign history (hourly profiles, archives): the snapshot or warm-start file"""
+        return self.SNAPSHOT_PATH or self.WARM_START_PATH
+    
+    @property
+    def FETCH_CONCURRENCY(self) -> int:
+        return self._config["FETCH_CONCURRENCY"]
+    
+    @property
+    def JSON_BACKEND(self) -> str:
+        return self._config["JSON_BACKEND"]
+    
+    @property
+    def PRODUCT_CACHE_TTL(self) -> float:
+        return self._config["PRODUCT_CACHE_TTL"]
+    
+    @property
+    def ALERT_WEBHOOK_URL(self) -> Optional[str]:
+        return self._config["ALERT_WEBHOOK_URL"]
+    
+    @property
+    def cache_key(self) -> str:
+        """Stable fingerprint of the settings, for keying per-process engine caches"""
+        return hashlib.sha256(json.dumps(self._config, sort_keys=True, default=str).encode()).hexdigest()
@@ -0,0 +1,87 @@
+"""Standalone ingestion daemon
+
+Owns the Shopify connection, the shared scans and the aggregates, and publishes each panel's result for
+every campaign to a SQLite snapshot file. Dashboards configured with the same `snapshot_path` read that
+file instead of polling Shopify, so any number of Streamlit processes cost one set of API calls:
+
+    python daemon.py --secrets .streamlit/secrets.toml
+"""
+import argparse
+import logging
+import time
+from typing import Optional
+
+from config import Config
+from engine import DashboardEngine, PANEL_FETCHERS
+from freshness import PanelHealth
+from snapshot_store import SnapshotStore
+
+logger = logging.getLogger("daemon")
+
+
+def publish_panel(engine: DashboardEngine, store: SnapshotStore, panel: str, max_age: float) -> Optional[str]:
+    """Compute one panel for every campaign and publish the successful results; returns the last error"""
+    error = None
+    for campaign_name in engine.registry.names:
+        result = engine.fetch_panel(panel, campaign_name, max_age)
+        if result["success"]:
+            store.publish(campaign_name, panel, result)
+        else:
+            # Keep serving the previous snapshot rather than replacing it with an error
+            logger.warning("%s panel failed for %s: %s", panel, campaign_name, result["error"])
+            error = result["error"]
+    return error
+
+
+def run(engine: DashboardEngine, store: SnapshotStore, poll_interval: float = 1.0):
+    """Publish every panel on its adaptive refresh interval until interrupted, backing off failing panels"""
+    # Last publish per panel; due is re-derived every poll, so a new tier applies straight away
+    published_at = {panel: 0.0 for panel in PANEL_FETCHERS}
+    health = {panel: PanelHealth() for panel in PANEL_FETCHERS}
+
+    tier = None
+    while True:
+        now = time.time()
+        plan = engine.refresh_plan()
+        intervals = plan.intervals
+        if plan.tier != tier:
+            tier = plan.tier
+            logger.info("Refresh tier %s: %s", tier, intervals)
+        # A failing panel stays due, but waits out its backoff before it is retried
+        due = {panel: intervals[panel] for panel in PANEL_FETCHERS
+               if now - published_at[panel] >= intervals[panel] and health[panel].can_attempt(now)}
+        if due:
+            # Sync every scan the due panels read concurrently before publishing them one by one
+            try:
+                engine.refresh_panels(due)
+            except Exception as e:
+                logger.warning("Refresh failed: %s", e)
+            for panel, interval in due.items():
+                error = publish_panel(engine, store, panel, interval)
+                if error is None:
+                    health[panel].record_success()
+                    published_at[panel] = now
+                    logger.info("Published %s", panel)
+                else:
+                    health[panel].record_failure(error)
+        time.sleep(poll_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll Shopify once and publish dashboard snapshots")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml", help="Path to a secrets.toml file")
+    parser.add_argument("--snapshot-path", help="SQLite snapshot file (defaults to dashboard.snapshot_path)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    config = Config.from_toml(args.secrets)
+    snapshot_path = args.snapshot_path or config.SNAPSHOT_PATH
+    if not snapshot_path:
+        parser.error("set dashboard.snapshot_path in secrets.toml or pass --snapshot-path")
+
+    run(DashboardEngine(config), SnapshotStore(snapshot_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,713 @@
+"""Headless fetch/aggregate engine behind the dashboard
+
+Has no Streamlit dependency, so it can run in a worker process, a CLI or a benchmark:
+
+    python engine.py --secrets .streamlit/secrets.toml [--campaign NAME]
+"""
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import datetime
+import functools
+import itertools
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import pytz
+import requests
+
+from aggregation import CampaignAggregates, CampaignCounters, DEFAULT_MAP_ZOOM, MinuteRollup
+from alerts import ALERT_RETENTION, MAX_ALERTS, ErrorRateDetector, SalesAnomalyDetector, post_webhook
+from archive import ARCHIVE_DELAY, ArchiveStore, build_archive
+from async_fetch import AsyncRunner, ShopifyGraphQLClient, gather_or_cancel
+from campaigns import Campaign, CampaignRegistry
+from config import Config, ConfigError
+from forecast import RunRateForecaster, seasonal_weights
+from freshness import PanelHealth
+from ingest import COUNTER_ORDER_FIELDS, CAMPAIGN_ORDER_FIELDS, SHOP_CURRENCY_QUERY, parse_gid
+from ledger import LedgerEntry, OrderLedger
+from products import ProductCatalog
+from scheduler import RefreshPlan, RefreshScheduler
+from snapshot_store import SnapshotStore
+
+
+# Panel name -> DashboardEngine method producing its result
+PANEL_FETCHERS = {
+    "main": "fetch_main_metrics",
+    "sku": "fetch_sku_metrics",
+    "category": "fetch_category_metrics",
+    "map": "fetch_map_metrics",
+    "customer": "fetch_customer_metrics",
+    "state": "fetch_state_metrics",
+    "attribution": "fetch_attribution_metrics"
+}
+
+# Panel name -> shared scan it reads
+PANEL_SCANS = {
+    "main": "counters",
+    "customer": "counters",
+    "sku": "orders",
+    "category": "orders",
+    "map": "orders",
+    "state": "orders",
+    "attribution": "orders"
+}
+
+# Scan -> order fields its stream selects, which is also its query-cost key
+SCAN_FIELDS = {"counters": COUNTER_ORDER_FIELDS, "orders": CAMPAIGN_ORDER_FIELDS}
+
+# Completed minutes averaged into the order velocity the refresh scheduler reads
+VELOCITY_MINUTES = 10
+
+# Seconds between saves of a running campaign's hourly revenue profile; it is saved for good once the sale ends
+PROFILE_SAVE_INTERVAL = 15 * 60
+
+
+class ShopResults:
+    """A shop's per-campaign results from one ledger, kept as two copies so readers hold one that scans leave alone
+
+    Each scan brings the copy published two scans ago up to date, first with the changed orders from the last scan
+    and then with its own, and publishes it. Updates cost time in proportion to the changed orders, and a published
+    copy is only changed again after a later scan has published the other one.
+    """
+
+    __slots__ = ("published", "_copies", "_missed", "_spare")
+
+    def __init__(self):
+        self.published: Dict[str, Any] = {}
+        self._copies: List[Optional[Dict[str, Any]]] = [None, None]
+        # Changed orders each copy has not seen yet
+        self._missed: List[List[Tuple[Optional[LedgerEntry], LedgerEntry]]] = [[], []]
+        self._spare = 0
+
+    def reset(self):
+        """Drop both copies, so each is rebuilt from the whole ledger when it is next updated"""
+        self._copies = [None, None]
+        self._missed = [[], []]
+
+    def update(self, ledger: OrderLedger, build: Callable[[], Dict[str, Any]],
+               apply: Callable[[Dict[str, Any], Optional[LedgerEntry], LedgerEntry], None]) -> Dict[str, Any]:
+        """Apply a ledger's changes to the spare copy (building it from every entry if it has none) and publish it"""
+        spare, other = self._spare, 1 - self._spare
+        results = self._copies[spare]
+        if results is None:
+            results = self._copies[spare] = build()
+            changes = ledger.changes()
+            pending = ((None, entry) for entry in ledger.entries())
+        else:
+            changes = list(ledger.changes())
+            pending = itertools.chain(self._missed[spare], changes)
+        for previous, entry in pending:
+            apply(results, previous, entry)
+
+        self._missed[spare] = []
+        if self._copies[other] is not None:
+            self._missed[other].extend(changes)
+        self._spare = other
+        self.published = results
+        return results
+
+
+class ShopStream:
+    """One shop's GraphQL client and order ledgers, so each shop keeps its own throttle budget and sync cursors"""
+
+    __slots__ = ("label", "client", "counter_ledger", "order_ledger", "products", "sync_costs", "counters",
+                 "aggregates", "products_version", "currency")
+
+    def __init__(self, label: str, client: ShopifyGraphQLClient, products: ProductCatalog):
+        self.label = label
+        self.client = client
+        self.counter_ledger = OrderLedger()
+        self.order_ledger = OrderLedger()
+        self.products = products
+        # Order fields -> query cost of that stream's last incremental sync
+        self.sync_costs: Dict[str, float] = {}
+        # Campaign name -> counters kept current from the all-orders ledger's changes
+        self.counters = ShopResults()
+        # Campaign name -> aggregates kept current from the tagged-orders ledger's changes, and the product
+        # catalog version they were built with
+        self.aggregates = ShopResults()
+        self.products_version = 0
+        # The shop's currency code, fetched once when several shops are combined
+        self.currency: Optional[str] = None
+
+
+class DashboardEngine:
+    """Runs the shared order scans and serves per-campaign panel results from them"""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.registry = CampaignRegistry([Campaign.from_settings(c, config.TIMEZONE) for c in config.CAMPAIGNS])
+        self.revenue_basis = config.REVENUE_BASIS
+
+        # A shop's two scans page through its client, sharing its concurrency limit and cost bucket
+        self.shops = [
+            ShopStream(shop["label"], ShopifyGraphQLClient(shop["endpoint"], shop["headers"],
+                                                           max_concurrency=config.FETCH_CONCURRENCY,
+                                                           json_backend=config.JSON_BACKEND),
+                       ProductCatalog(config.PRODUCT_CACHE_TTL))
+            for shop in config.SHOPS
+        ]
+        self._runner = AsyncRunner()
+        self._scan_results: Dict[str, Any] = {}
+        self._scan_loaded_at: Dict[str, float] = {}
+        self._refresh_lock = threading.Lock()
+        self._refresh_future: Optional[concurrent.futures.Future] = None
+        self._refresh_scans: Set[str] = set()
+        self._scan_health = {scan: PanelHealth() for scan in set(PANEL_SCANS.values())}
+
+        # Local store of past campaigns: hourly profiles for seasonality, and archives of finished campaigns
+        self._history = SnapshotStore(config.HISTORY_PATH) if config.HISTORY_PATH else None
+        self.archive = ArchiveStore(config.HISTORY_PATH) if config.HISTORY_PATH else None
+        self._seasonal_weights: Dict[str, Optional[List[float]]] = {}
+        self._profile_saved_at: Dict[str, float] = {}
+        self._profiles_final: Set[str] = set()
+        self._scan_synced_at: Dict[str, datetime.datetime] = {}
+        self._archived: Set[str] = set()
+        self._background = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="engine-refresh")
+
+        # Anomaly detectors fed after every scan, and the alerts they raised, newest last. Alerts are
+        # appended on the fetch loop's thread while dashboard sessions read them, so both hold the lock
+        self._sales_detectors: Dict[str, SalesAnomalyDetector] = {}
+        self._error_detector = ErrorRateDetector()
+        self.alerts: collections.deque = collections.deque(maxlen=MAX_ALERTS)
+        self._alerts_lock = threading.Lock()
+
+        self.scheduler = RefreshScheduler(
+            config.REFRESH_INTERVALS, PANEL_SCANS, config.SURGE_ORDERS_PER_MINUTE, config.LULL_ORDERS_PER_MINUTE,
+            config.API_COST_BUDGET, adaptive=config.ADAPTIVE_REFRESH
+        )
+
+    def campaign(self, name: Optional[str] = None) -> Campaign:
+        """Get a campaign by name, defaulting to the primary campaign"""
+        return self.registry.get(name) if name else self.registry.campaigns[0]
+
+    # ─── Shared scans ─────────────────────────────────────────────────────────
+
+    async def sync_ledger(self, shop: ShopStream, ledger: OrderLedger, query_filter: str, node_fields: str,
+                          keep: Optional[Callable[[Dict[str, Any]], bool]] = None) -> int:
+        """Apply a shop's new and changed orders (edits, refunds, cancellations) to a ledger; returns orders read
+
+        Orders that fail keep are skipped unless the ledger already holds them, so their new state replaces the old.
+        """
+        # The first sync backfills the sale, so only incremental syncs say what a scheduled refresh costs
+        incremental = ledger.synced
+        spent = shop.client.spent.get(node_fields, 0.0)
+        synced = 0
+        async for order in shop.client.iter_orders(ledger.sync_filter(query_filter), node_fields):
+            if keep is None or keep(order) or parse_gid(order["id"]) in ledger:
+                ledger.apply(order)
+            synced += 1
+        ledger.commit_sync()
+        if incremental:
+            shop.sync_costs[node_fields] = shop.client.spent.get(node_fields, 0.0) - spent
+        return synced
+
+    async def sync_products(self, shop: ShopStream) -> int:
+        """Fetch the product type and vendor of a shop's new (or expired) products in its tagged orders"""
+        product_ids = {
+            line[4] for entry in shop.order_ledger.entries() for line in entry.line_items if line[4] is not None
+        }
+        return await shop.products.refresh(shop.client, product_ids)
+
+    def _merge_shops(self, parts: Dict[str, Dict[str, Any]], combine) -> Dict[str, Any]:
+        """Merge the shops' published results into a new total per campaign, keeping the parts for the breakdown
+
+        A single shop's published results are served as they are.
+        """
+        if len(parts) == 1:
+            return next(iter(parts.values()))
+        merged = {}
+        for campaign in self.registry.campaigns:
+            total = combine(campaign)
+            for results in parts.values():
+                total.merge(results[campaign.name])
+            total.shops = {label: results[campaign.name] for label, results in parts.items()}
+            merged[campaign.name] = total
+        return merged
+
+    async def check_currencies(self):
+        """Fetch each shop's currency once, and refuse to combine shops whose amounts are in different currencies"""
+        if len(self.shops) < 2:
+            return
+        unchecked = [shop for shop in self.shops if shop.currency is None]
+        results = await gather_or_cancel(*(
+            shop.client.execute(SHOP_CURRENCY_QUERY, {}, cost_key="shop") for shop in unchecked
+        ))
+        for shop, data in zip(unchecked, results):
+            shop.currency = data["shop"]["currencyCode"]
+        if len({shop.currency for shop in self.shops}) > 1:
+            currencies = ", ".join(f"{shop.label}: {shop.currency}" for shop in self.shops)
+            raise ConfigError(f"shops report different currencies ({currencies}); combine only shops that share one")
+
+    def _new_counters(self, campaign: Campaign) -> CampaignCounters:
+        return CampaignCounters(
+            basis=self.revenue_basis,
+            forecaster=RunRateForecaster(campaign.start_dt, campaign.end_dt, self.seasonal_weights(campaign)),
+            minutes=MinuteRollup(campaign.start_dt, campaign.end_dt)
+        )
+
+    async def scan_campaign_counters(self) -> Dict[str, CampaignCounters]:
+        """Sync every shop's all-orders ledger concurrently, then apply its changed orders to each campaign's counters"""
+        sync_started = datetime.datetime.now(pytz.UTC)
+        query_filter = self.registry.query_filter(tagged=False)
+        await gather_or_cancel(*(
+            self.sync_ledger(shop, shop.counter_ledger, query_filter, COUNTER_ORDER_FIELDS) for shop in self.shops
+        ))
+
+        counters = self._merge_shops({
+            shop.label: shop.counters.update(shop.counter_ledger, self._campaign_counters, self._apply_counter_change)
+            for shop in self.shops
+        }, self._new_counters)
+
+        if self._history is not None:
+            self.save_hourly_profiles(counters, sync_started)
+        return counters
+
+    def _campaign_counters(self) -> Dict[str, CampaignCounters]:
+        return {campaign.name: self._new_counters(campaign) for campaign in self.registry.campaigns}
+
+    def _apply_counter_change(self, counters: Dict[str, CampaignCounters], previous: Optional[LedgerEntry],
+                              entry: LedgerEntry):
+        if previous is not None:
+            for campaign in self.registry.in_window(previous.created_at):
+                counters[campaign.name].remove_entry(previous, campaign.is_tagged(previous.tags))
+        for campaign in self.registry.in_window(entry.created_at):
+            counters[campaign.name].add_entry(entry, campaign.is_tagged(entry.tags))
+
+    def save_hourly_profiles(self, counters: Dict[str, CampaignCounters], synced_at: datetime.datetime):
+        """Store campaigns' hour-of-day revenue for later seasonality: once every PROFILE_SAVE_INTERVAL, and once at the end"""
+        for campaign in self.registry.campaigns:
+            forecaster = counters[campaign.name].forecaster
+            if not forecaster.orders or campaign.name in self._profiles_final:
+                continue
+            ended = synced_at >= campaign.end_utc
+            saved_at = self._profile_saved_at.get(campaign.name)
+            if ended or saved_at is None or time.monotonic() - saved_at >= PROFILE_SAVE_INTERVAL:
+                self._history.save_hourly_profile(campaign.name, campaign.start_dt, campaign.end_dt,
+                                                  forecaster.hourly_revenue)
+                self._profile_saved_at[campaign.name] = time.monotonic()
+                if ended:
+                    self._profiles_final.add(campaign.name)
+
+    def seasonal_weights(self, campaign: Campaign) -> Optional[List[float]]:
+        """Get hour-of-day weights from the campaigns that ended before this one started, if any are stored"""
+        if self._history is None:
+            return None
+        if campaign.name not in self._seasonal_weights:
+            profiles = self._history.read_hourly_profiles(ended_before=campaign.start_dt)
+            self._seasonal_weights[campaign.name] = seasonal_weights(profiles)
+        return self._seasonal_weights[campaign.name]
+
+    def _new_aggregates(self, campaign: Campaign, products: Optional[ProductCatalog] = None) -> CampaignAggregates:
+        return CampaignAggregates(zoom=DEFAULT_MAP_ZOOM, basis=self.revenue_basis, products=products)
+
+    async def _sync_shop_orders(self, shop: ShopStream):
+        # Re-syncs leave out the tag clause, or an order whose campaign tag was removed would never be read again
+        # and would stay in the aggregates; untagged orders are only kept if the ledger already holds them
+        ledger = shop.order_ledger
+        query_filter = self.registry.query_filter(tagged=not ledger.synced)
+        await self.sync_ledger(shop, ledger, query_filter, CAMPAIGN_ORDER_FIELDS,
+                               keep=lambda order: self.registry.is_tagged(order.get("tags") or ()))
+        await self.sync_products(shop)
+
+    async def scan_campaign_orders(self) -> Dict[str, CampaignAggregates]:
+        """Sync every shop's tagged-orders ledger and product cache concurrently, then apply its changed orders to each campaign's aggregates"""
+        await gather_or_cancel(*(self._sync_shop_orders(shop) for shop in self.shops))
+
+        parts = {}
+        for shop in self.shops:
+            # Removing an order reads its categories from the catalog, so a changed product means a rebuild
+            if shop.products.version != shop.products_version:
+                shop.aggregates.reset()
+                shop.products_version = shop.products.version
+            build = functools.partial(self._campaign_aggregates, shop.products)
+            parts[shop.label] = shop.aggregates.update(shop.order_ledger, build, self._apply_order_change)
+        return self._merge_shops(parts, self._new_aggregates)
+
+    def _campaign_aggregates(self, products: ProductCatalog) -> Dict[str, CampaignAggregates]:
+        return {campaign.name: self._new_aggregates(campaign, products) for campaign in self.registry.campaigns}
+
+    def _apply_order_change(self, aggregates: Dict[str, CampaignAggregates], previous: Optional[LedgerEntry],
+                            entry: LedgerEntry):
+        if previous is not None:
+            for campaign in self.registry.in_window(previous.created_at):
+                if campaign.is_tagged(previous.tags):
+                    aggregates[campaign.name].remove_entry(previous)
+        for campaign in self.registry.in_window(entry.created_at):
+            if campaign.is_tagged(entry.tags):
+                aggregates[campaign.name].add_entry(entry)
+
+    async def _run_scans(self, scans: Tuple[str, ...]) -> Dict[str, BaseException]:
+        """Run scans concurrently, keeping each successful result; returns the failures by scan"""
+        loaders = {"counters": self.scan_campaign_counters, "orders": self.scan_campaign_orders}
+        # The scans hold every order created before they started, not necessarily any created during them
+        started_utc = datetime.datetime.now(pytz.UTC)
+        try:
+            await self.check_currencies()
+        except Exception as e:
+            results = [e] * len(scans)
+        else:
+            results = await asyncio.gather(*(loaders[scan]() for scan in scans), return_exceptions=True)
+
+        failures = {}
+        now_utc = datetime.datetime.now(pytz.UTC)
+        alerts = []
+        for scan, result in zip(scans, results):
+            if isinstance(result, BaseException):
+                failures[scan] = result
+                if not isinstance(result, asyncio.CancelledError):
+                    self._scan_health[scan].record_failure(str(result))
+                    alerts += self._error_detector.record(scan, str(result), now_utc)
+            else:
+                self._scan_results[scan] = result
+                self._scan_loaded_at[scan] = time.monotonic()
+                self._scan_synced_at[scan] = started_utc
+                self._scan_health[scan].record_success()
+                alerts += self._error_detector.record(scan, None, now_utc)
+
+        # Only a fresh counters scan may close minutes; an older one would read minutes it never saw as empty
+        if "counters" in scans and "counters" not in failures:
+            alerts += self.detect_sales_anomalies(self._scan_results["counters"], started_utc)
+        if alerts:
+            self.record_alerts(alerts)
+
+        if self.archive is not None:
+            self.archive_finished_campaigns()
+        return failures
+
+    def detect_sales_anomalies(self, counters: Dict[str, CampaignCounters],
+                               now_utc: datetime.datetime) -> List[Dict[str, Any]]:
+        """Run each campaign's velocity checks over the minutes completed since the last counters scan"""
+        alerts = []
+        for campaign in self.registry.campaigns:
+            detector = self._sales_detectors.get(campaign.name)
+            if detector is None:
+                detector = self._sales_detectors[campaign.name] = SalesAnomalyDetector(
+                    campaign.name, self.seasonal_weights(campaign), campaign.end_dt.tzinfo
+                )
+            alerts += detector.evaluate(counters[campaign.name].minutes, now_utc)
+        return alerts
+
+    def record_alerts(self, alerts: List[Dict[str, Any]]):
+        """Keep alerts for the dashboard and hand them to the webhook sink, if one is configured"""
+        with self._alerts_lock:
+            self.alerts.extend(alerts)
+        if self.config.ALERT_WEBHOOK_URL:
+            self._background.submit(post_webhook, self.config.ALERT_WEBHOOK_URL, alerts)
+
+    def recent_alerts(self, campaign_name: str, now_utc: Optional[datetime.datetime] = None) -> List[Dict[str, Any]]:
+        """Get a campaign's alerts and the engine-wide sync alerts raised within ALERT_RETENTION, newest first"""
+        since = (now_utc or datetime.datetime.now(pytz.UTC)) - ALERT_RETENTION
+        with self._alerts_lock:
+            alerts = list(self.alerts)
+        return [
+            alert for alert in reversed(alerts)
+            if alert["campaign"] in (None, campaign_name) and datetime.datetime.fromisoformat(alert["at"]) >= since
+        ]
+
+    def archive_finished_campaigns(self):
+        """Archive campaigns whose sale ended at least ARCHIVE_DELAY before both scans were last synced"""
+        if len(self._scan_synced_at) < len(self._scan_health):
+            return
+        synced_at = min(self._scan_synced_at.values())
+        for campaign in self.registry.campaigns:
+            if campaign.name in self._archived or campaign.end_utc + ARCHIVE_DELAY > synced_at:
+                continue
+            counters = self._scan_results["counters"][campaign.name]
+            aggregates = self._scan_results["orders"][campaign.name]
+            self.archive.save(build_archive(campaign, counters, aggregates))
+            self._archived.add(campaign.name)
+
+    def scan_costs(self) -> Dict[str, float]:
+        """Get each scan's query cost per incremental sync, for the shop where it is highest"""
+        return {
+            scan: max(shop.sync_costs.get(fields, 0.0) for shop in self.shops)
+            for scan, fields in SCAN_FIELDS.items()
+        }
+
+    def order_velocity(self, now_utc: datetime.datetime) -> Optional[float]:
+        """Get orders per minute over the last VELOCITY_MINUTES completed minutes of the busiest running campaign"""
+        counters = self._scan_results.get("counters")
+        if counters is None:
+            return None
+        velocities = []
+        for campaign in self.registry.campaigns:
+            if not campaign.in_window(now_utc):
+                continue
+            minutes = counters[campaign.name].minutes
+            current = minutes.minute_index(now_utc)
+            window = minutes.all_orders[max(current - VELOCITY_MINUTES, 0):current]
+            if window:
+                velocities.append(sum(window) / len(window))
+        return max(velocities) if velocities else None
+
+    def refresh_plan(self, campaign_name: Optional[str] = None) -> RefreshPlan:
+        """Get the refresh intervals for the current order velocity, for one campaign or (by default) all"""
+        now_utc = datetime.datetime.now(pytz.UTC)
+        campaigns = [self.campaign(campaign_name)] if campaign_name else self.registry.campaigns
+        ended = all(campaign.end_utc <= now_utc for campaign in campaigns)
+        return self.scheduler.plan(self.order_velocity(now_utc), ended, self.scan_costs())
+
+    def _stale_scans(self, max_ages: Dict[str, float]) -> Set[str]:
+        now = time.monotonic()
+        return {
+            scan for scan, max_age in max_ages.items()
+            if scan not in self._scan_loaded_at or now - self._scan_loaded_at[scan] >= max_age
+        }
+
+    def refresh(self, max_ages: Dict[str, float]):
+        """Bring scans ("counters", "orders") within their max ages in seconds, syncing stale ones concurrently
+
+        A refresh already in flight is joined when it covers the stale scans, and superseded (cancelled and
+        restarted with the union) when it does not, so no scan is synced twice at once. A scan that keeps
+        failing is not retried until its backoff has passed; until then its last error is raised.
+        """
+        while True:
+            with self._refresh_lock:
+                stale = self._stale_scans(max_ages)
+                backing_off = sorted(scan for scan in stale if not self._scan_health[scan].can_attempt())
+                stale -= set(backing_off)
+                if not stale:
+                    break
+
+                future = self._refresh_future
+                if future is None or future.done() or not stale <= self._refresh_scans:
+                    if future is not None and not future.done():
+                        future.cancel()
+                        stale |= self._refresh_scans
+                    self._refresh_scans = stale
+                    future = self._refresh_future = self._runner.submit(self._run_scans(tuple(sorted(stale))))
+
+            try:
+                failures = future.result()
+            except concurrent.futures.CancelledError:
+                # Superseded by a wider refresh from another caller; join that one instead
+                continue
+
+            for scan in sorted(stale & set(max_ages)):
+                if scan in failures:
+                    raise failures[scan]
+            break
+
+        if backing_off:
+            raise RuntimeError(f"Shopify sync failing, retrying later: {self._scan_health[backing_off[0]].last_error}")
+
+    @staticmethod
+    def _panel_scan_ages(max_ages: Dict[str, float]) -> Dict[str, float]:
+        scan_ages: Dict[str, float] = {}
+        for panel, max_age in max_ages.items():
+            scan = PANEL_SCANS[panel]
+            scan_ages[scan] = min(max_age, scan_ages.get(scan, max_age))
+        return scan_ages
+
+    def panels_fresh(self, max_ages: Dict[str, float]) -> bool:
+        """Check whether every scan behind the panels is within its max age, so fetching them needs no sync"""
+        return not self._stale_scans(self._panel_scan_ages(max_ages))
+
+    def refresh_panels(self, max_ages: Dict[str, float]):
+        """Refresh the scans behind several panels at once, e.g. on a cold load"""
+        self.refresh(self._panel_scan_ages(max_ages))
+
+    def refresh_panels_in_background(self, max_ages: Dict[str, float]) -> concurrent.futures.Future:
+        """Start refresh_panels without waiting for it; the future resolves once the scans are synced"""
+        return self._background.submit(self.refresh_panels, max_ages)
+
+    def get_campaign_counters(self, campaign_name: str, max_age: float) -> CampaignCounters:
+        """Get a campaign's counters from the shared all-orders scan"""
+        self.refresh({"counters": max_age})
+        return self._scan_results["counters"][campaign_name]
+
+    def get_campaign_aggregates(self, campaign_name: str, max_age: float) -> CampaignAggregates:
+        """Get a campaign's aggregates from the shared tagged-orders scan"""
+        self.refresh({"orders": max_age})
+        return self._scan_results["orders"][campaign_name]
+
+    # ─── Panel results ────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _shop_cart_activity(shop: Dict[str, Any], start_iso: str, end_iso: str) -> int:
+        try:
+            url = f"https://{shop['shop_name']}.myshopify.com/admin/api/{shop['api_version']}/checkouts.json"
+            params = {
+                "created_at_min": start_iso,
+                "created_at_max": end_iso,
+                "limit": 250
+            }
+            headers = {"X-Shopify-Access-Token": shop["headers"]["X-Shopify-Access-Token"]}
+            r = requests.get(url, headers=headers, params=params, timeout=30)
+            r.raise_for_status()
+            checkouts = r.json().get("checkouts", [])
+            return len([c for c in checkouts if not c.get("completed_at")])
+        except Exception:
+            return 0
+
+    def get_recent_cart_activity(self, start_iso: str, end_iso: str) -> int:
+        """Get recent abandoned carts across every shop, fetched concurrently"""
+        shops = self.config.SHOPS
+        if len(shops) == 1:
+            return self._shop_cart_activity(shops[0], start_iso, end_iso)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(shops)) as pool:
+            return sum(pool.map(lambda shop: self._shop_cart_activity(shop, start_iso, end_iso), shops))
+
+    def fetch_main_metrics(self, campaign_name: str, max_age: float) -> Dict[str, Any]:
+        """Fetch main dashboard metrics (orders, sales, etc.)"""
+        try:
+            start_iso, end_iso, now_ist = self.campaign(campaign_name).get_timeframe()
+
+            counters = self.get_campaign_counters(campaign_name, max_age)
+
+            now_utc = datetime.datetime.now(pytz.UTC)
+            recent_carts = self.get_recent_cart_activity(
+                (now_utc - datetime.timedelta(minutes=30)).isoformat(),
+                now_utc.isoformat()
+            )
+
+            aov = counters.total_sales / counters.total_orders if counters.total_orders else 0
+            uniq = counters.unique_customers
+            opc = counters.total_orders / uniq if uniq else 0
+            conversion_rate = (counters.tag_orders / counters.total_orders * 100) if counters.total_orders else 0
+
+            return {
+                "total_orders": counters.total_orders,
+                "total_sales": counters.total_sales,
+                "tag_orders": counters.tag_orders,
+                "tag_sales": counters.tag_sales,
+                "recent_carts": recent_carts,
+                "additional_metrics": {
+                    "avg_order_value": aov,
+                    "unique_customers": uniq,
+                    "orders_per_customer": opc
+                },
+                "conversion_rate": conversion_rate,
+                "forecast": counters.forecaster.summary(now_utc),
+                # Per-shop totals when several shops are configured (empty otherwise)
+                "shops": [
+                    {
+                        "shop": label,
+                        "total_orders": shop.total_orders,
+                        "total_sales": shop.total_sales,
+                        "tag_orders": shop.tag_orders,
+                        "tag_sales": shop.tag_sales,
+                        "unique_customers": shop.unique_customers
+                    }
+                    for label, shop in counters.shops.items()
+                ],
+                # Running campaign revenue per minute so far, for overlaying archived campaigns
+                "revenue_curve": [round(revenue) for revenue in counters.minutes.cumulative_revenue(until=now_utc)],
+                "alerts": self.recent_alerts(campaign_name, now_utc),
+                # Adaptive refresh intervals, read by dashboards that follow the daemon's snapshots too
+                "refresh_plan": self.refresh_plan(campaign_name)._asdict(),
+                "now_ist": now_ist,
+                "success": True,
+                "error": None
+            }
+        except Exception as e:
+            return self._failure(e)
+
+    def fetch_sku_metrics(self, campaign_name: str, max_age: float) -> Dict[str, Any]:
+        """Fetch SKU data with revenue information"""
+        try:
+            start_iso, end_iso, now_ist = self.campaign(campaign_name).get_timeframe()
+            aggregates = self.get_campaign_aggregates(campaign_name, max_age)
+            top_skus = aggregates.top_skus(10)
+            shop_revenue = {
+                label: {sku: shop.skus[sku][1] for sku, _, _ in top_skus if sku in shop.skus}
+                for label, shop in aggregates.shops.items()
+            }
+            return {"top_skus": top_skus, "shop_revenue": shop_revenue, "now_ist": now_ist, "success": True, "error": None}
+        except Exception as e:
+            return self._failure(e, top_skus=[])
+
+    def fetch_category_metrics(self, campaign_name: str, max_age: float) -> Dict[str, Any]:
+        """Fetch category totals and per-category SKUs"""
+        try:
+            start_iso, end_iso, now_ist = self.campaign(campaign_name).get_timeframe()
+            aggregates = self.get_campaign_aggregates(campaign_name, max_age)
+            shop_revenue = {
+                label: {category: totals["revenue"] for category, totals in shop.categories.items()}
+                for label, shop in aggregates.shops.items()
+            }
+            return {"category_info": aggregates.category_info(), "category_rankings": aggregates.category_rankings(),
+                    "shop_revenue": shop_revenue, "now_ist": now_ist, "success": True, "error": None}
+        except Exception as e:
+            return self._failure(e, category_info={}, category_rankings={})
+
+    def fetch_map_metrics(self, campaign_name: str, max_age: float) -> Dict[str, Any]:
+        """Fetch geographic data for map visualization"""
+        try:
+            start_iso, end_iso, now_ist = self.campaign(campaign_name).get_timeframe()
+            geo_data = self.get_campaign_aggregates(campaign_name, max_age).geographic_data()
+            return {"geographic_data": geo_data, "now_ist": now_ist, "success": True, "error": None}
+        except Exception as e:
+            return self._failure(e, geographic_data={})
+
+    def fetch_customer_metrics(self, campaign_name: str, max_age: float) -> Dict[str, Any]:
+        """Fetch customer segmentation data"""
+        try:
+            start_iso, end_iso, now_ist = self.campaign(campaign_name).get_timeframe()
+            customer_seg = self.get_campaign_counters(campaign_name, max_age).customer_segmentation()
+            return {"customer_segmentation": customer_seg, "now_ist": now_ist, "success": True, "error": None}
+        except Exception as e:
+            return self._failure(e, customer_segmentation={})
+
+    def fetch_state_metrics(self, campaign_name: str, max_age: float) -> Dict[str, Any]:
+        """Fetch state performance data"""
+        try:
+            start_iso, end_iso, now_ist = self.campaign(campaign_name).get_timeframe()
+            aggregates = self.get_campaign_aggregates(campaign_name, max_age)
+            shop_revenue = {label: shop.states.revenue_by_state() for label, shop in aggregates.shops.items()}
+            return {"state_performance": aggregates.geographic_data(), "shop_revenue": shop_revenue, "now_ist": now_ist,
+                    "success": True, "error": None}
+        except Exception as e:
+            return self._failure(e, state_performance={})
+
+    def fetch_attribution_metrics(self, campaign_name: str, max_age: float) -> Dict[str, Any]:
+        """Fetch discount code and traffic source attribution"""
+        try:
+            start_iso, end_iso, now_ist = self.campaign(campaign_name).get_timeframe()
+            attribution = self.get_campaign_aggregates(campaign_name, max_age).attribution_data()
+            return {"attribution": attribution, "now_ist": now_ist, "success": True, "error": None}
+        except Exception as e:
+            return self._failure(e, attribution={})
+
+    def fetch_panel(self, panel: str, campaign_name: str, max_age: float) -> Dict[str, Any]:
+        """Fetch one panel's result by name (main, sku, category, map, customer, state, attribution)"""
+        return getattr(self, PANEL_FETCHERS[panel])(campaign_name, max_age)
+
+    @staticmethod
+    def _failure(error: Exception, **empty_fields) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "error": str(error),
+            "now_ist": datetime.datetime.now(pytz.timezone("Asia/Kolkata")),
+            **empty_fields
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute dashboard metrics without Streamlit")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml", help="Path to a secrets.toml file")
+    parser.add_argument("--campaign", help="Campaign name (defaults to the primary campaign)")
+    args = parser.parse_args()
+
+    engine = DashboardEngine(Config.from_toml(args.secrets))
+    campaign_name = engine.campaign(args.campaign).name
+    engine.refresh({"counters": 0, "orders": 0})
+    result = {
+        "campaign": campaign_name,
+        "main": engine.fetch_main_metrics(campaign_name, max_age=float("inf")),
+        "sku": engine.fetch_sku_metrics(campaign_name, max_age=float("inf")),
+        "category": engine.fetch_category_metrics(campaign_name, max_age=float("inf")),
+        "customer": engine.fetch_customer_metrics(campaign_name, max_age=float("inf")),
+        "state": engine.fetch_state_metrics(campaign_name, max_age=float("inf")),
+        "attribution": engine.fetch_attribution_metrics(campaign_name, max_age=float("inf"))
+    }
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
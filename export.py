@@ -0,0 +1,190 @@
+"""Export panel snapshots as CSV, JSON or Parquet tables
+
+Tables are read from panel results that are already held: the dashboard's session data, or the snapshot
+file written by the daemon (or the warm-start file). The category panel carries every SKU and the state panel
+every state, so exports are full tables and never call Shopify. Rows are serialized EXPORT_CHUNK_ROWS at a
+time, so large tables stream out in chunks:
+
+    python export.py --secrets .streamlit/secrets.toml --table skus --format parquet --output skus.parquet
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from config import Config
+from snapshot_store import SnapshotStore
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_FORMATS = ("csv", "json", "parquet")
+EXPORT_CHUNK_ROWS = 5000
+
+MIME_TYPES = {"csv": "text/csv", "json": "application/json", "parquet": "application/vnd.apache.parquet"}
+
+# Table name -> panel it is read from, and its columns with their types
+EXPORT_TABLES = {
+    "skus": ("category", (("sku", str), ("title", str), ("category", str), ("vendor", str), ("quantity", int),
+                          ("revenue", float))),
+    "categories": ("category", (("category", str), ("quantity", int), ("revenue", float),
+                                ("share_percentage", float))),
+    "states": ("state", (("state", str), ("orders", int), ("quantity", int), ("revenue", float),
+                         ("revenue_percentage", float), ("quantity_percentage", float)))
+}
+
+
+def available_formats() -> Tuple[str, ...]:
+    """Get the export formats usable here; Parquet needs the optional pyarrow package"""
+    return EXPORT_FORMATS if pyarrow is not None else tuple(fmt for fmt in EXPORT_FORMATS if fmt != "parquet")
+
+
+def table_rows(table: str, panel_data: Dict[str, Any]) -> List[Tuple]:
+    """Get a table's rows from its panel's result, highest revenue first"""
+    if table == "skus":
+        rows = [
+            (sku, totals["title"], category, totals.get("vendor"), totals["quantity"], totals["revenue"])
+            for category, skus in panel_data["category_info"].get("all_skus_by_category", {}).items()
+            for sku, totals in skus.items()
+        ]
+    elif table == "categories":
+        rows = [
+            (category, totals["quantity"], totals["revenue"], totals["share_percentage"])
+            for category, totals in panel_data["category_info"].get("category_data", {}).items()
+        ]
+    elif table == "states":
+        rows = [
+            (state, totals["orders"], totals["quantity"], totals["revenue"], totals["revenue_percentage"],
+             totals["quantity_percentage"])
+            for state, totals in panel_data["state_performance"].get("state_data", {}).items()
+        ]
+    else:
+        raise ValueError(f"Unknown export table: {table}")
+
+    revenue = [name for name, _ in EXPORT_TABLES[table][1]].index("revenue")
+    rows.sort(key=lambda row: row[revenue], reverse=True)
+    return rows
+
+
+def _batches(rows: Iterable[Tuple]) -> Iterator[List[Tuple]]:
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, EXPORT_CHUNK_ROWS))
+        if not batch:
+            return
+        yield batch
+
+
+def _csv_chunks(columns: List[str], rows: Iterable[Tuple]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in _batches(rows):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _json_chunks(columns: List[str], rows: Iterable[Tuple]) -> Iterator[bytes]:
+    # One JSON array of records, written a batch of records at a time
+    separator = "["
+    for batch in _batches(rows):
+        records = ",".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) for row in batch)
+        yield (separator + records).encode("utf-8")
+        separator = ","
+    yield b"[]" if separator == "[" else b"]"
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file handing back what was written so far, while reporting full offsets to the writer"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_chunks(columns: List[Tuple[str, type]], rows: Iterable[Tuple]) -> Iterator[bytes]:
+    # One row group per batch, so only a batch is held as Arrow arrays at a time
+    types = {str: pyarrow.string(), int: pyarrow.int64(), float: pyarrow.float64()}
+    schema = pyarrow.schema([(name, types[kind]) for name, kind in columns])
+    sink = _ChunkSink()
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for batch in _batches(rows):
+            arrays = [pyarrow.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_chunks(table: str, panel_data: Dict[str, Any], fmt: str) -> Iterator[bytes]:
+    """Serialize one table from its panel's result, yielding the file in chunks"""
+    if fmt not in available_formats():
+        raise ValueError(f"Export format must be one of {', '.join(available_formats())}")
+    columns = EXPORT_TABLES[table][1]
+    rows = table_rows(table, panel_data)
+    if fmt == "parquet":
+        return _parquet_chunks(columns, rows)
+    names = [name for name, _ in columns]
+    return _csv_chunks(names, rows) if fmt == "csv" else _json_chunks(names, rows)
+
+
+def export_bytes(table: str, panel_data: Dict[str, Any], fmt: str) -> bytes:
+    """Serialize one table into a whole file, e.g. for a download button"""
+    return b"".join(export_chunks(table, panel_data, fmt))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a table from the latest panel snapshots")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml", help="Path to a secrets.toml file")
+    parser.add_argument("--campaign", help="Campaign name (defaults to the primary campaign)")
+    parser.add_argument("--table", choices=sorted(EXPORT_TABLES), required=True)
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--output", help="File to write (defaults to stdout)")
+    args = parser.parse_args()
+
+    config = Config.from_toml(args.secrets)
+    if not config.HISTORY_PATH:
+        parser.error("exports read the snapshot file: set snapshot_path (daemon) or warm_start_path")
+    campaign_name = args.campaign or config.CAMPAIGNS[0]["name"]
+    panel = EXPORT_TABLES[args.table][0]
+    panel_data = SnapshotStore(config.HISTORY_PATH).read(campaign_name, panel)
+    if panel_data is None:
+        parser.error(f"no {panel} snapshot has been published for {campaign_name} yet")
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in export_chunks(args.table, panel_data, args.format):
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
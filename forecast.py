@@ -0,0 +1,141 @@
+"""Run-rate and projected finish for a sale, updated in O(1) per order
+
+The run-rate is an exponentially weighted rate estimate with time constant EWMA_TIME_CONSTANT: each order
+adds amount / tau to it and it decays by exp(-dt / tau) between orders, so recent sales dominate without
+keeping a window of orders. Projections spread that rate over the rest of the sale, weighted by the
+hour-of-day profile of prior campaigns when one is available (flat otherwise).
+"""
+import datetime
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+EWMA_TIME_CONSTANT = datetime.timedelta(minutes=30)
+
+# Lower bound on an hour's seasonal weight, so a quiet hour in past sales cannot blow up the estimate
+MIN_HOUR_WEIGHT = 0.05
+
+
+def seasonal_weights(hourly_profiles: Iterable[List[float]]) -> Optional[List[float]]:
+    """Average prior campaigns' hour-of-day revenue into 24 weights with mean 1 over the hours they covered
+
+    Hours no prior campaign sold in get a weight of 1. Returns None without usable profiles.
+    """
+    sums = [0.0] * 24
+    counts = [0] * 24
+    for hourly in hourly_profiles:
+        covered = [hour for hour in range(24) if hourly[hour] > 0]
+        if len(covered) < 2:
+            continue
+        mean = sum(hourly[hour] for hour in covered) / len(covered)
+        for hour in covered:
+            sums[hour] += hourly[hour] / mean
+            counts[hour] += 1
+
+    if not any(counts):
+        return None
+    return [max(sums[hour] / counts[hour], MIN_HOUR_WEIGHT) if counts[hour] else 1.0 for hour in range(24)]
+
+
+class RunRateForecaster:
+    """Cumulative revenue, EWMA run-rate and hour-of-day totals for one campaign's orders"""
+
+    __slots__ = ("start_dt", "end_dt", "weights", "tau", "total", "orders", "hourly_revenue",
+                 "_rate", "_rate_at")
+
+    def __init__(self, start_dt: datetime.datetime, end_dt: datetime.datetime,
+                 weights: Optional[List[float]] = None, time_constant: datetime.timedelta = EWMA_TIME_CONSTANT):
+        self.start_dt = start_dt
+        self.end_dt = end_dt
+        self.weights = weights
+        self.tau = time_constant.total_seconds()
+        self.total = 0.0
+        self.orders = 0
+        # Revenue by local hour of day in the campaign's timezone, saved as the profile for later campaigns
+        self.hourly_revenue = [0.0] * 24
+        self._rate = 0.0
+        self._rate_at: Optional[datetime.datetime] = None
+
+    def add(self, created_at: datetime.datetime, amount: float):
+        """Add one order"""
+        self.total += amount
+        self.orders += 1
+        self.hourly_revenue[created_at.astimezone(self.end_dt.tzinfo).hour] += amount
+
+        if self._rate_at is None:
+            self._rate, self._rate_at = amount / self.tau, created_at
+        elif created_at >= self._rate_at:
+            decay = math.exp(-(created_at - self._rate_at).total_seconds() / self.tau)
+            self._rate, self._rate_at = self._rate * decay + amount / self.tau, created_at
+        else:
+            # Late arrival (e.g. an order first seen by an incremental sync): decay it to the current anchor
+            self._rate += amount / self.tau * math.exp(-(self._rate_at - created_at).total_seconds() / self.tau)
+
+    def remove(self, created_at: datetime.datetime, amount: float):
+        """Take back an order added earlier, e.g. when it is refunded or cancelled"""
+        self.total -= amount
+        self.orders -= 1
+        self.hourly_revenue[created_at.astimezone(self.end_dt.tzinfo).hour] -= amount
+        # The EWMA is linear, so the order's decayed contribution at the current anchor is subtracted
+        if self._rate_at is not None:
+            self._rate -= amount / self.tau * math.exp(-(self._rate_at - created_at).total_seconds() / self.tau)
+
+    def merge(self, other: "RunRateForecaster"):
+        """Add another forecaster's orders for the same sale; the EWMA is linear, so rates add at a common anchor"""
+        self.total += other.total
+        self.orders += other.orders
+        for hour, revenue in enumerate(other.hourly_revenue):
+            self.hourly_revenue[hour] += revenue
+
+        if other._rate_at is None:
+            return
+        if self._rate_at is None:
+            self._rate, self._rate_at = other._rate, other._rate_at
+            return
+        anchor = max(self._rate_at, other._rate_at)
+        self._rate = (self._rate * math.exp(-(anchor - self._rate_at).total_seconds() / self.tau)
+                      + other._rate * math.exp(-(anchor - other._rate_at).total_seconds() / self.tau))
+        self._rate_at = anchor
+
+    def _weight(self, moment: datetime.datetime) -> float:
+        if not self.weights:
+            return 1.0
+        return self.weights[moment.astimezone(self.end_dt.tzinfo).hour]
+
+    def run_rate(self, now: datetime.datetime) -> float:
+        """Get the current revenue rate per second"""
+        if self._rate_at is None:
+            return 0.0
+        elapsed = (now - self.start_dt).total_seconds()
+        if elapsed <= 0:
+            return 0.0
+        rate = self._rate * math.exp(-max((now - self._rate_at).total_seconds(), 0.0) / self.tau)
+        # Undo the estimator's warm-up bias during the sale's first few time constants
+        return rate / (1 - math.exp(-elapsed / self.tau))
+
+    def projected_remaining(self, now: datetime.datetime) -> float:
+        """Get the revenue expected between now and the end of the sale at the current run-rate"""
+        if now >= self.end_dt:
+            return 0.0
+        moment = max(now, self.start_dt).astimezone(self.end_dt.tzinfo)
+        base_rate = self.run_rate(moment) / self._weight(moment)
+
+        remaining = 0.0
+        while moment < self.end_dt:
+            next_hour = (moment + datetime.timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+            segment_end = min(next_hour, self.end_dt)
+            remaining += base_rate * self._weight(moment) * (segment_end - moment).total_seconds()
+            moment = segment_end
+        return remaining
+
+    def summary(self, now: datetime.datetime) -> Dict[str, Any]:
+        """Get the run-rate and projection as of now"""
+        duration = (self.end_dt - self.start_dt).total_seconds()
+        elapsed = min(max((now - self.start_dt).total_seconds(), 0.0), duration)
+        projected_total = self.total + self.projected_remaining(now)
+        return {
+            "run_rate_per_hour": self.run_rate(now) * 3600,
+            "projected_total": projected_total,
+            "remaining_hours": (duration - elapsed) / 3600,
+            "elapsed_percentage": elapsed / duration * 100 if duration else 100.0,
+            "seasonal": self.weights is not None
+        }
@@ -0,0 +1,94 @@
+"""Stale-while-revalidate bookkeeping for dashboard panels
+
+A panel keeps its last good result when a refresh fails. PanelHealth decides when the next attempt may
+run (exponential backoff after consecutive failures, paused once the error budget for the window is spent)
+and describes how stale the served result is.
+"""
+import collections
+import time
+from typing import Deque, Optional
+
+RETRY_BASE_DELAY = 5.0
+RETRY_MAX_DELAY = 300.0
+
+# Failures a panel may have within the window before it stops retrying until the oldest one ages out
+ERROR_BUDGET = 5
+ERROR_BUDGET_WINDOW = 600.0
+
+
+class PanelHealth:
+    """Refresh outcomes of one panel: when it last succeeded, why it last failed and when to try again"""
+
+    def __init__(self, base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY,
+                 error_budget: int = ERROR_BUDGET, budget_window: float = ERROR_BUDGET_WINDOW):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.error_budget = error_budget
+        self.budget_window = budget_window
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+        self.last_success_at: Optional[float] = None
+        self.next_attempt_at = 0.0
+        self._failures: Deque[float] = collections.deque()
+
+    def _trim(self, now: float):
+        while self._failures and now - self._failures[0] >= self.budget_window:
+            self._failures.popleft()
+
+    def budget_exhausted(self, now: Optional[float] = None) -> bool:
+        """Check whether the panel has used up its failures for the current window"""
+        now = time.time() if now is None else now
+        self._trim(now)
+        return len(self._failures) >= self.error_budget
+
+    def can_attempt(self, now: Optional[float] = None) -> bool:
+        """Check whether a refresh may run now, given the backoff and the error budget"""
+        now = time.time() if now is None else now
+        return now >= self.next_attempt_at and not self.budget_exhausted(now)
+
+    def record_success(self, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.last_success_at = now
+        self.next_attempt_at = 0.0
+
+    def record_failure(self, error: str, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self.consecutive_failures += 1
+        self.last_error = error
+        self._failures.append(now)
+
+        delay = min(self.base_delay * 2 ** (self.consecutive_failures - 1), self.max_delay)
+        if self.budget_exhausted(now):
+            # Resume once the oldest failure in the window no longer counts against the budget
+            delay = max(delay, self._failures[0] + self.budget_window - now)
+        self.next_attempt_at = now + delay
+
+    @property
+    def failing(self) -> bool:
+        return self.consecutive_failures > 0
+
+    def staleness_note(self, now: Optional[float] = None) -> Optional[str]:
+        """Describe a failing panel's served result and next retry, or None while it is healthy"""
+        if not self.failing:
+            return None
+        now = time.time() if now is None else now
+
+        if self.last_success_at is None:
+            served = "No data yet"
+        else:
+            served = f"Showing data from {format_age(now - self.last_success_at)} ago"
+        retry_in = max(0, int(self.next_attempt_at - now))
+        retry = "retries paused" if self.budget_exhausted(now) else "retrying"
+        return f"{served} · refresh failed: {self.last_error} · {retry} in {format_age(retry_in)}"
+
+
+def format_age(seconds: float) -> str:
+    """Format a duration as 45s, 3m 20s or 1h 5m"""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60}m"
@@ -0,0 +1,69 @@
+import csv
+import os
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from utils import get_state_coordinates
+
+GEO_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "geo_index.csv")
+
+# Prefix length used for district-level pincode entries in the index file
+PIN_PREFIX_LENGTH = 3
+
+
+def _normalize_name(name: Optional[str]) -> str:
+    return " ".join(name.lower().split()) if name else ""
+
+
+def _normalize_pin(zip_code: Optional[str]) -> str:
+    return "".join(ch for ch in zip_code if ch.isdigit()) if zip_code else ""
+
+
+class GeoIndex:
+    """Offline pincode/city/state to coordinate lookup for orders without Shopify coordinates"""
+
+    def __init__(self, pins: Dict[str, Tuple[float, float]], cities: Dict[str, Tuple[float, float]]):
+        self._pins = pins
+        self._cities = cities
+        self._states = {
+            _normalize_name(state): (coords["lat"], coords["lon"])
+            for state, coords in get_state_coordinates().items()
+        }
+
+    @classmethod
+    def load(cls, path: str = GEO_INDEX_PATH) -> "GeoIndex":
+        """Load the bundled index file into hash maps"""
+        pins = {}
+        cities = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                coords = (float(row["lat"]), float(row["lon"]))
+                if row["kind"] == "pin":
+                    pins[row["key"]] = coords
+                elif row["kind"] == "city":
+                    cities[_normalize_name(row["key"])] = coords
+        return cls(pins, cities)
+
+    def lookup(self, zip_code: Optional[str] = None, city: Optional[str] = None,
+               province: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        """Get approximate coordinates, most precise match first: full pincode, city, pincode prefix, state"""
+        pin = _normalize_pin(zip_code)
+        if pin in self._pins:
+            return self._pins[pin]
+
+        coords = self._cities.get(_normalize_name(city))
+        if coords:
+            return coords
+
+        if len(pin) == 6:
+            coords = self._pins.get(pin[:PIN_PREFIX_LENGTH])
+            if coords:
+                return coords
+
+        return self._states.get(_normalize_name(province))
+
+
+@lru_cache(maxsize=1)
+def get_geo_index() -> GeoIndex:
+    """Get the process-wide geocoding index, loading it on first use"""
+    return GeoIndex.load()
@@ -0,0 +1,113 @@
+"""Streaming parse of GraphQL connection pages
+
+resp.json() turns a whole 250-order page into nested dicts before the first order is used. GraphQLPage walks
+the response text instead and decodes one edge at a time with the standard library's C scanner, so only the
+order being aggregated is materialised. Values outside the connection's edges (pageInfo, errors, extensions)
+are collected on the way. With the optional orjson package installed, the "orjson" backend parses whole pages
+faster, at the cost of that transient allocation.
+"""
+import json
+import re
+from typing import Any, Dict, Iterator, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKENDS = ("stream", "orjson")
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_decode = json.JSONDecoder().raw_decode
+_scan_string = json.decoder.scanstring
+
+
+def loads(body: bytes) -> Any:
+    """Parse a whole JSON document, with orjson when it is installed"""
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+class GraphQLPage:
+    """One GraphQL response body whose connection nodes are decoded one at a time"""
+
+    __slots__ = ("body", "connection", "backend", "fields")
+
+    def __init__(self, body: bytes, connection: Tuple[str, ...], backend: str = "stream"):
+        self.body = body
+        # Path to the connection, e.g. ("data", "orders")
+        self.connection = connection
+        self.backend = backend
+        # Every other value by dotted path ("data.orders.pageInfo", "extensions", ...), filled in by nodes()
+        self.fields: Dict[str, Any] = {}
+
+    def nodes(self) -> Iterator[Dict[str, Any]]:
+        """Yield the connection's edge nodes in order, collecting the other fields as they are passed"""
+        if self.backend == "orjson":
+            yield from self._parsed_nodes()
+            return
+        text = self.body.decode("utf-8")
+        self.body = b""
+        yield from self._walk_object(text, 0, ())
+
+    def _parsed_nodes(self) -> Iterator[Dict[str, Any]]:
+        document = loads(self.body)
+        self.body = b""
+        self._collect(document, ())
+        edges = self.fields.pop(".".join(self.connection + ("edges",)), None) or []
+        # Drop each edge once it is handed out, so aggregation frees the page as it goes
+        edges.reverse()
+        while edges:
+            yield edges.pop()["node"]
+
+    def _collect(self, value: Any, path: Tuple[str, ...]):
+        if isinstance(value, dict) and path == self.connection[:len(path)]:
+            for key, item in value.items():
+                self._collect(item, path + (key,))
+        else:
+            self.fields[".".join(path)] = value
+
+    def _walk_object(self, text: str, index: int, path: Tuple[str, ...]):
+        index = _WHITESPACE.match(text, index).end()
+        if text[index] != "{":
+            # A null (or otherwise unexpected) value where the connection should be
+            value, index = _decode(text, index)
+            self.fields[".".join(path)] = value
+            return index
+
+        index = _WHITESPACE.match(text, index + 1).end()
+        if text[index] == "}":
+            return index + 1
+        while True:
+            key, index = _scan_string(text, index + 1)
+            index = _WHITESPACE.match(text, index).end()
+            index = _WHITESPACE.match(text, index + 1).end()
+            key_path = path + (key,)
+
+            if key_path == self.connection + ("edges",):
+                index = yield from self._walk_edges(text, index)
+            elif key_path == self.connection[:len(key_path)]:
+                index = yield from self._walk_object(text, index, key_path)
+            else:
+                value, index = _decode(text, index)
+                self.fields[".".join(key_path)] = value
+
+            index = _WHITESPACE.match(text, index).end()
+            if text[index] == "}":
+                return index + 1
+            index = _WHITESPACE.match(text, index + 1).end()
+
+    def _walk_edges(self, text: str, index: int):
+        if text[index] != "[":
+            _, index = _decode(text, index)
+            return index
+
+        index = _WHITESPACE.match(text, index + 1).end()
+        if text[index] == "]":
+            return index + 1
+        while True:
+            edge, index = _decode(text, index)
+            yield edge["node"]
+            index = _WHITESPACE.match(text, index).end()
+            if text[index] == "]":
+                return index + 1
+            index = _WHITESPACE.match(text, index + 1).end()
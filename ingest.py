@@ -0,0 +1,89 @@
+import datetime
+from typing import Union
+
+ORDERS_PAGE_SIZE = 250
+
+# Order revenue fields recorded in the order ledger: current amounts, which follow order edits and refunds
+LEDGER_FIELDS = """
+    id
+    createdAt
+    updatedAt
+    cancelledAt
+    tags
+    currentSubtotalPriceSet { shopMoney { amount } }
+    currentTotalDiscountsSet { shopMoney { amount } }
+    refunds(first: 10) {
+      refundLineItems(first: 50) { edges { node { subtotalSet { shopMoney { amount } } } } }
+    }
+"""
+
+# Fields for the overall order stream: counters, unique customers and customer segmentation
+COUNTER_ORDER_FIELDS = LEDGER_FIELDS + """
+    customer { id createdAt }
+"""
+
+# Fields for the tagged-order stream shared by the SKU, category, map, state and attribution panels
+# (line items carry only the product ID; type and vendor come from the product cache, products.py)
+CAMPAIGN_ORDER_FIELDS = LEDGER_FIELDS + """
+    name
+    shippingAddress {
+      city
+      province
+      provinceCode
+      countryCodeV2
+      zip
+      latitude
+      longitude
+    }
+    discountCodes
+    customerJourneySummary {
+      firstVisit { source landingPage utmParameters { source medium } }
+      lastVisit { source landingPage utmParameters { source medium } }
+    }
+    lineItems(first: 50) {
+      edges {
+        node {
+          sku
+          title
+          currentQuantity
+          originalUnitPriceSet { shopMoney { amount } }
+          product { id }
+        }
+      }
+    }
+"""
+
+# Amounts are in each shop's currency, which must match before shops are summed
+SHOP_CURRENCY_QUERY = "query { shop { currencyCode } }"
+
+
+def build_orders_query(query_filter: str, node_fields: str) -> str:
+    """Build the paginated orders query used by every ingestion stream"""
+    return f'''
+    query ($cursor: String) {{
+      orders(
+        first: {ORDERS_PAGE_SIZE},
+        after: $cursor,
+        query: "{query_filter}",
+        sortKey: CREATED_AT
+      ) {{
+        pageInfo {{ hasNextPage endCursor }}
+        edges {{
+          node {{
+            {node_fields}
+          }}
+        }}
+      }}
+    }}
+    '''
+
+
+def parse_shopify_datetime(value: str) -> datetime.datetime:
+    """Parse a Shopify ISO-8601 timestamp into an aware datetime"""
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def parse_gid(gid: str) -> Union[int, str]:
+    """Get the numeric ID from a Shopify GID such as gid://shopify/Customer/123 (the GID itself if not numeric)"""
+    tail = gid.rsplit("/", 1)[-1]
+    return int(tail) if tail.isdigit() else gid
@@ -0,0 +1,214 @@
+"""Order-state ledger: one revenue record per order, updated in place as orders change
+
+Revenue definitions shared by every panel, from the order's current amounts so edits and refunds apply:
+    net       current subtotal: the items still on the order after edits and refunds, less their discounts;
+              0 once the order is cancelled
+    discounts current order-level and line-level discounts
+    refunds   subtotals of the refunded line items (shipping and tax refunds are not item revenue)
+    gross     net + discounts + refunds: the items sold, before discounts and refunds
+
+Shopify's current subtotal already leaves out refunded items, so refunds are added back for gross rather than
+taken off net again. Line items carry their current quantity, and their share of the order's revenue prorated
+by line value, so SKU, category and state totals add up to the same figure as the counters.
+"""
+import datetime
+import sys
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from ingest import parse_gid, parse_shopify_datetime
+
+REVENUE_BASES = ("net", "gross")
+
+# Re-read orders updated slightly before the last sync, since Shopify's search index lags behind writes
+SYNC_OVERLAP = datetime.timedelta(minutes=5)
+
+
+def _money(node: Dict[str, Any], field: str) -> float:
+    money = node.get(field) or {}
+    return float((money.get("shopMoney") or {}).get("amount") or 0)
+
+
+def _refunded(order: Dict[str, Any]) -> float:
+    return sum(_money(edge["node"], "subtotalSet")
+               for refund in order.get("refunds") or ()
+               for edge in (refund.get("refundLineItems") or {}).get("edges", []))
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    # SKUs, titles, tags and places repeat across thousands of orders; one shared copy of each is enough
+    return sys.intern(value) if value else value
+
+
+def _coordinate(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except (ValueError, TypeError):
+        return None  # Bad coordinates fall back to the offline geocoding index
+
+
+def _product_id(product: Optional[Dict[str, Any]]) -> Any:
+    # Line items of deleted products have no product
+    return parse_gid(product["id"]) if product and product.get("id") else None
+
+
+def _visit_source(visit: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Describe a visit's traffic source as "source / medium" from its UTM parameters or landing page"""
+    if not visit:
+        return None
+    utm = visit.get("utmParameters") or {}
+    source, medium = utm.get("source"), utm.get("medium")
+    if not source and visit.get("landingPage"):
+        query = parse_qs(urlsplit(visit["landingPage"]).query)
+        source = (query.get("utm_source") or [None])[0]
+        medium = medium or (query.get("utm_medium") or [None])[0]
+    # Shopify's own classification (e.g. a search engine or referrer) when the visit carried no UTM tags
+    source = source or visit.get("source")
+    if not source:
+        return None
+    return _intern(f"{source} / {medium}".lower() if medium else source.lower())
+
+
+def attribution_source(journey: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Get an order's traffic source from its customer journey, last visit first (last-touch attribution)"""
+    if not journey:
+        return None
+    return _visit_source(journey.get("lastVisit")) or _visit_source(journey.get("firstVisit"))
+
+
+class ShippingAddress:
+    """The parts of an order's shipping address used for geographic totals"""
+
+    __slots__ = ("city", "province", "province_code", "country_code", "zip", "latitude", "longitude")
+
+    def __init__(self, address: Dict[str, Any]):
+        self.city = _intern(address.get("city"))
+        self.province = _intern(address.get("province"))
+        self.province_code = _intern(address.get("provinceCode"))
+        self.country_code = _intern(address.get("countryCodeV2"))
+        self.zip = _intern(address.get("zip"))
+        self.latitude = _coordinate(address.get("latitude"))
+        self.longitude = _coordinate(address.get("longitude"))
+
+
+class LedgerEntry:
+    """Revenue state of one order, kept compact since a ledger holds every order in the sale window"""
+
+    __slots__ = ("order_id", "created_at", "tags", "customer_id", "customer_is_new", "gross", "discounts",
+                 "refunds", "cancelled", "line_items", "shipping_address", "discount_codes", "source")
+
+    def __init__(self, order: Dict[str, Any]):
+        self.order_id = parse_gid(order["id"])
+        self.created_at = parse_shopify_datetime(order["createdAt"])
+        self.tags = tuple(_intern(tag) for tag in order.get("tags") or ())
+        self.discounts = _money(order, "currentTotalDiscountsSet")
+        self.refunds = _refunded(order)
+        self.gross = _money(order, "currentSubtotalPriceSet") + self.discounts + self.refunds
+        self.cancelled = bool(order.get("cancelledAt"))
+
+        # Numeric customer ID, and whether the customer was created within 1 hour of this order (None if unknown)
+        customer = order.get("customer") or {}
+        self.customer_id = parse_gid(customer["id"]) if customer.get("id") else None
+        self.customer_is_new: Optional[bool] = None
+        if customer.get("createdAt"):
+            customer_dt = parse_shopify_datetime(customer["createdAt"])
+            self.customer_is_new = (self.created_at - customer_dt).total_seconds() / 3600 <= 1
+
+        address = order.get("shippingAddress")
+        self.shipping_address = ShippingAddress(address) if address else None
+
+        # Attribution, for streams that select discountCodes and customerJourneySummary
+        self.discount_codes = tuple(_intern(code.upper()) for code in order.get("discountCodes") or ())
+        self.source = attribution_source(order.get("customerJourneySummary"))
+
+        # (sku, title, current quantity, line value at unit price, numeric product ID) for streams that select
+        # line items; lines edited or refunded down to nothing are left out
+        self.line_items: Tuple[Tuple[str, str, int, float, Any], ...] = tuple(
+            (
+                _intern(item.get("sku") or "UNKNOWN"),
+                _intern(item.get("title") or "Unknown Product"),
+                quantity,
+                _money(item, "originalUnitPriceSet") * quantity,
+                _product_id(item.get("product"))
+            )
+            for item, quantity in (
+                (edge["node"], int(edge["node"].get("currentQuantity", 1)))
+                for edge in (order.get("lineItems") or {}).get("edges", [])
+            )
+            if quantity > 0
+        )
+
+    @property
+    def net(self) -> float:
+        if self.cancelled:
+            return 0.0
+        return max(self.gross - self.discounts - self.refunds, 0.0)
+
+    def revenue(self, basis: str) -> float:
+        """Get the order's revenue on a basis from REVENUE_BASES"""
+        return self.gross if basis == "gross" else self.net
+
+    def line_revenue_factor(self, basis: str) -> float:
+        """Get the multiplier from a line's value to its share of the order revenue on a basis"""
+        line_value = sum(line[3] for line in self.line_items)
+        return self.revenue(basis) / line_value if line_value else 0.0
+
+
+class OrderLedger:
+    """Orders keyed by ID, kept current by re-reading only orders updated since the last sync"""
+
+    def __init__(self):
+        self._entries: Dict[Any, LedgerEntry] = {}
+        # Order ID -> the entry it replaced as of the last changes() call (None for orders new since then); None
+        # until the first call, when every entry is new, so the initial sync does not track each order twice
+        self._changed: Optional[Dict[Any, Optional[LedgerEntry]]] = None
+        self._synced_through: Optional[datetime.datetime] = None
+        self._seen_through: Optional[datetime.datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, order_id: Any) -> bool:
+        return order_id in self._entries
+
+    def entries(self) -> Iterator[LedgerEntry]:
+        """Iterate entries in first-seen order (creation order for the initial scan)"""
+        return iter(self._entries.values())
+
+    def apply(self, order: Dict[str, Any]) -> LedgerEntry:
+        """Insert or replace an order's entry, e.g. from a sync page or an orders/updated webhook"""
+        entry = LedgerEntry(order)
+        if self._changed is not None and entry.order_id not in self._changed:
+            self._changed[entry.order_id] = self._entries.get(entry.order_id)
+        self._entries[entry.order_id] = entry
+        updated_at = order.get("updatedAt")
+        if updated_at:
+            updated_dt = parse_shopify_datetime(updated_at)
+            if self._seen_through is None or updated_dt > self._seen_through:
+                self._seen_through = updated_dt
+        return entry
+
+    def changes(self) -> Iterator[Tuple[Optional[LedgerEntry], LedgerEntry]]:
+        """Yield (superseded entry or None, current entry) for each order applied since the last call, then forget them"""
+        # Swapped now, not on first iteration; yielded lazily so a first sync does not copy every entry into a list
+        changed, self._changed = self._changed, {}
+        if changed is None:
+            return ((None, entry) for entry in self._entries.values())
+        return ((previous, self._entries[order_id]) for order_id, previous in changed.items())
+
+    def commit_sync(self):
+        """Mark a sync as complete, so the next one starts from the newest update it applied"""
+        # Pages arrive in creation order, so an interrupted sync may have skipped older updates
+        self._synced_through = self._seen_through
+
+    @property
+    def synced(self) -> bool:
+        """Whether a sync has completed, so the next one is incremental"""
+        return self._synced_through is not None
+
+    def sync_filter(self, query_filter: str) -> str:
+        """Narrow a stream's filter to orders changed since the last sync (unchanged before the first)"""
+        if self._synced_through is None:
+            return query_filter
+        since = (self._synced_through - SYNC_OVERLAP).isoformat()
+        return f"({query_filter}) AND updated_at:>'{since}'"
@@ -1,101 +1,126 @@
 import streamlit as st
 import datetime
-import pytz
-import requests
+import functools
 import time
 import pandas as pd
-import threading
-from typing import Dict, Any, Tuple, List
-from config import config
-from utils import format_indian_currency, get_state_coordinates
-import plotly.express as px
-
-GRAPHQL_ENDPOINT = config.GRAPHQL_ENDPOINT
-HEADERS = config.HEADERS
-TARGET_TAGS = config.TARGET_TAGS
+from typing import Dict, Any, List, Tuple
+from config import Config, ConfigError
+from engine import DashboardEngine
+from snapshot_store import SnapshotStore
+from utils import format_indian_currency, format_indian_currency_series, format_indian_currency_compact
+from aggregation import DEFAULT_MAP_ZOOM
+from freshness import PanelHealth
+from archive import ArchiveStore
+from sku_index import SEARCH_PAGE_SIZE, SkuIndex
+from export import EXPORT_TABLES, MIME_TYPES, available_formats, export_bytes
+# plotly.express is the slowest import here; the chart sections import it when they first render
+
+try:
+    config = Config(st.secrets)
+except ConfigError as e:
+    st.error(str(e))
+    st.error("Please ensure your .streamlit/secrets.toml file is properly configured.")
+    st.stop()
+
+@st.cache_resource
+def get_engine(config_key: str, _config: Config) -> DashboardEngine:
+    """Get the engine shared by every session with the same configuration"""
+    return DashboardEngine(_config)
+
+ENGINE = get_engine(config.cache_key, config)
+CAMPAIGN_REGISTRY = ENGINE.registry
+
+# With a snapshot feed configured, daemon.py owns ingestion and this app only reads its snapshots
+SNAPSHOT_STORE = SnapshotStore(config.SNAPSHOT_PATH) if config.SNAPSHOT_PATH else None
+
+# Otherwise the last good results are kept here, so a new session paints them before the first sync finishes
+WARM_START_STORE = SnapshotStore(config.WARM_START_PATH) if config.WARM_START_PATH and not SNAPSHOT_STORE else None
+
+# Finished campaigns archived by the engine or daemon, for the comparison view
+ARCHIVE_STORE = ArchiveStore(config.HISTORY_PATH) if config.HISTORY_PATH else None
 
 # ─── Page & CSS ───────────────────────────────────────────────────────────────
 st.set_page_config(page_title="18 Hours Sale Dashboard", page_icon="📊", layout="wide")
 
-# Initialize session state for caching
-if 'main_data' not in st.session_state:
-    st.session_state.main_data = None
-if 'sku_data' not in st.session_state:
-    st.session_state.sku_data = None
-if 'map_data' not in st.session_state:
-    st.session_state.map_data = None
-if 'customer_data' not in st.session_state:
-    st.session_state.customer_data = None
-if 'state_data' not in st.session_state:
-    st.session_state.state_data = None
-
-# Last update timestamps
-if 'last_main_update' not in st.session_state:
-    st.session_state.last_main_update = None
-if 'last_sku_update' not in st.session_state:
-    st.session_state.last_sku_update = None
-if 'last_map_update' not in st.session_state:
-    st.session_state.last_map_update = None
-if 'last_customer_update' not in st.session_state:
-    st.session_state.last_customer_update = None
-if 'last_state_update' not in st.session_state:
-    st.session_state.last_state_update = None
-
-# Loading states
-if 'main_loading' not in st.session_state:
-    st.session_state.main_loading = False
-if 'sku_loading' not in st.session_state:
-    st.session_state.sku_loading = False
-if 'map_loading' not in st.session_state:
-    st.session_state.map_loading = False
-if 'customer_loading' not in st.session_state:
-    st.session_state.customer_loading = False
-if 'state_loading' not in st.session_state:
-    st.session_state.state_loading = False
-if 'category_data' not in st.session_state:
-    st.session_state.category_data = None
-if 'last_category_update' not in st.session_state:
-    st.session_state.last_category_update = None
-if 'category_loading' not in st.session_state:
-    st.session_state.category_loading = False
+# Initialize session state for caching: each panel's last good data, last update time, loading flag and health
+PANELS = ("main", "sku", "map", "customer", "state", "category", "attribution")
+for panel in PANELS:
+    for key, default in ((f"{panel}_data", None), (f"last_{panel}_update", None), (f"{panel}_loading", False)):
+        if key not in st.session_state:
+            st.session_state[key] = default
+    if f"{panel}_health" not in st.session_state:
+        st.session_state[f"{panel}_health"] = PanelHealth()
+
+# Background scan sync started by a cold load, and the panels waiting on it
+if 'cold_load' not in st.session_state:
+    st.session_state.cold_load = None
+    st.session_state.cold_panels = []
 
 st.sidebar.markdown("### Settings")
 auto_refresh = st.sidebar.checkbox("Auto-refresh enabled", value=True)
 
-# Refresh intervals
-intervals = config.REFRESH_INTERVALS
+# Campaign selection - every campaign is aggregated from the same scans, so switching costs no API calls
+if len(CAMPAIGN_REGISTRY.campaigns) > 1:
+    active_campaign_name = st.sidebar.selectbox("Campaign", options=CAMPAIGN_REGISTRY.names)
+else:
+    active_campaign_name = CAMPAIGN_REGISTRY.names[0]
+ACTIVE_CAMPAIGN = CAMPAIGN_REGISTRY.get(active_campaign_name)
+
+if st.session_state.get("active_campaign") != active_campaign_name:
+    # Re-derive every panel for the newly selected campaign from the shared scans
+    st.session_state.active_campaign = active_campaign_name
+    for panel in PANELS:
+        st.session_state[f"{panel}_data"] = None
+        st.session_state[f"last_{panel}_update"] = None
+        st.session_state[f"{panel}_health"] = PanelHealth()
+
+# Refresh intervals: the adaptive plan carried by the latest main result, the configured ones until it loads
+PANEL_LABELS = {
+    "main": "Main Metrics",
+    "sku": "SKU Data",
+    "customer": "Customer Analysis",
+    "map": "Geographic Data",
+    "state": "State Performance",
+    "category": "Category Sales",
+    "attribution": "Attribution"
+}
+refresh_plan = (st.session_state.main_data or {}).get("refresh_plan")
+intervals = refresh_plan["intervals"] if refresh_plan else config.REFRESH_INTERVALS
 main_refresh_interval = intervals["main"]
 sku_refresh_interval = intervals["sku"]
 map_refresh_interval = intervals["map"]
 customer_refresh_interval = intervals["customer"]
 state_refresh_interval = intervals["state"]
-category_refresh_interval = 300  # 5 minutes
-
-st.sidebar.markdown("### Refresh Intervals")
-st.sidebar.info(f"""
-**Main Metrics:** Every {main_refresh_interval} seconds
-- Total Orders & Sales
-- Tagged Orders & Sales  
-- Recent Carts & Additional Metrics
-
-**SKU Data:** Every {sku_refresh_interval//60} minutes
-- Top 10 Best-Selling SKUs
+category_refresh_interval = intervals["category"]
+attribution_refresh_interval = intervals["attribution"]
 
-**Customer Analysis:** Every {customer_refresh_interval//60} minutes
-- New vs Returning Customers
+def format_interval(seconds: int) -> str:
+    return f"{seconds} seconds" if seconds < 120 else f"{seconds / 60:g} minutes"
 
-**Geographic Data:** Every {map_refresh_interval//60} minutes
-- India Map & State Performance
-
-**State Performance:** Every {state_refresh_interval//60} minutes
-- Top 10 Performing States
-""")
+st.sidebar.markdown("### Refresh Intervals")
+if refresh_plan is None:
+    plan_note = "Configured intervals, until the first orders sync lands"
+elif refresh_plan["tier"] == "fixed":
+    plan_note = "Configured intervals (adaptive refresh is off)"
+else:
+    velocity = "n/a" if refresh_plan["velocity"] is None else f"{refresh_plan['velocity']:.1f} orders/min"
+    plan_note = (f"**{refresh_plan['tier'].title()}** tier · {velocity} · "
+                 f"{refresh_plan['cost_rate']:.1f} of {config.API_COST_BUDGET:g} query-cost points/s")
+    if refresh_plan["budget_limited"]:
+        plan_note += " (lengthened to stay within the budget)"
+st.sidebar.info(plan_note + "\n\n" + "\n".join(
+    f"- **{label}:** every {format_interval(intervals[panel])}" for panel, label in PANEL_LABELS.items()
+))
 
 st.sidebar.markdown("### About Metrics")
-st.sidebar.info("""
+revenue_basis_label = (
+    "Net line-item revenue (after discounts, refunds and cancellations)"
+    if config.REVENUE_BASIS == "net" else "Gross line-item revenue (before discounts and refunds)"
+)
+st.sidebar.info(f"""
 **Primary Metrics:**
 • Orders Placed: Paid orders with campaign tag since campaign start
-• Sale Revenue: Line-item revenue from tagged paid orders
+• Sale Revenue: {revenue_basis_label} from tagged orders
 • Recent Carts: Abandoned carts (last 30 min)
 
 **Additional Metrics:**
@@ -242,6 +267,16 @@ st.markdown("""
     margin-top: 1rem; 
     font-style: italic;
   }
+  .stale-badge {
+    display: inline-block;
+    background: rgba(255, 193, 7, 0.15);
+    color: #b8860b;
+    border: 1px solid rgba(255, 193, 7, 0.5);
+    padding: 4px 12px;
+    border-radius: 12px;
+    font-size: 0.8rem;
+    margin-bottom: 0.5rem;
+  }
   .error-message {
     background: #f8d7da; 
     color: #721c24; 
@@ -261,731 +296,390 @@ st.markdown("<br>", unsafe_allow_html=True)
 st.markdown('<h1 class="main-header">Campaign Performance Dashboard</h1>', unsafe_allow_html=True)
 
 # ─── Helper Functions ────────────────────────────────────────────────────────
-
-
-
-def get_additional_metrics(start_iso: str, end_iso: str, total_orders: int, total_sales: float) -> Dict[str, float]:
-    """Calculate additional metrics"""
-    aov = total_sales / total_orders if total_orders else 0
-    uniq = get_unique_customers_count(start_iso, end_iso)
-    opc = total_orders / uniq if uniq else 0
-    return {
-        "avg_order_value": aov,
-        "unique_customers": uniq,
-        "orders_per_customer": opc
-    }
+# All fetching and aggregation lives in engine.DashboardEngine (or the daemon feeding SNAPSHOT_STORE);
+# these only bind the selected campaign and the panel's refresh interval.
 
 def get_timeframe():
-    """Get the configured timeframe for the sale"""
-    return config.get_timeframe()
-
-def fetch_orders_metrics(query_filter: str) -> Tuple[int, float]:
-    """Fetch order count and revenue with improved error handling"""
-    total_count = 0
-    total_revenue = 0.0
-    cursor = None
-    retries = 3
-
-    while True:
-        for attempt in range(retries):
-            try:
-                graphql_query = f'''
-                query ($cursor: String) {{
-                  orders(
-                    first: 250,
-                    after: $cursor,
-                    query: "{query_filter}",
-                    sortKey: CREATED_AT
-                  ) {{
-                    pageInfo {{ hasNextPage endCursor }}
-                    edges {{
-                      node {{
-                        currentTotalPriceSet {{ shopMoney {{ amount }} }}
-                      }}
-                    }}
-                  }}
-                }}
-                '''
-                payload = {"query": graphql_query, "variables": {"cursor": cursor}}
-                resp = requests.post(GRAPHQL_ENDPOINT, json=payload, headers=HEADERS, timeout=30)
-                resp.raise_for_status()
-                data = resp.json()["data"]["orders"]
-                break
-            except Exception as e:
-                if attempt == retries - 1:
-                    raise e
-                time.sleep(1 * (attempt + 1))
-
-        for edge in data["edges"]:
-            total_count += 1
-            total_revenue += float(edge["node"]["currentTotalPriceSet"]["shopMoney"]["amount"])
-
-        if not data["pageInfo"]["hasNextPage"]:
-            break
-        cursor = data["pageInfo"]["endCursor"]
-
-    return total_count, total_revenue
-
-def fetch_category_data(start_iso: str, end_iso: str, target_tags: List[str]) -> Dict[str, Any]:
-    """Fetch category-wise sales data from tagged orders"""
-    tag_query = " OR ".join(f"tag:{t}" for t in target_tags)
-    date_query = f"created_at:>'{start_iso}' AND created_at:<='{end_iso}'"
-    paid_query = "financial_status:paid"
-    query_filter = f"({tag_query}) AND {date_query} AND {paid_query}"
+    """Get the configured timeframe for the selected campaign"""
+    return ACTIVE_CAMPAIGN.get_timeframe()
+
+def fetch_panel(panel: str, max_age: float) -> Dict[str, Any]:
+    """Fetch a panel for the selected campaign from the daemon's snapshot feed or the in-process engine"""
+    if SNAPSHOT_STORE is None:
+        result = ENGINE.fetch_panel(panel, ACTIVE_CAMPAIGN.name, max_age)
+        if WARM_START_STORE is not None and result["success"]:
+            WARM_START_STORE.publish(ACTIVE_CAMPAIGN.name, panel, result)
+        return result
     
-    category_data = {}
-    all_skus_by_category = {}  # For dropdown functionality
-    total_revenue = 0
-    cursor = None
-    
-    while True:
-        try:
-            graphql_query = f'''
-            query ($cursor: String) {{
-              orders(
-                first: 250,
-                after: $cursor,
-                query: "{query_filter}",
-                sortKey: CREATED_AT
-              ) {{
-                pageInfo {{ hasNextPage endCursor }}
-                edges {{
-                  node {{
-                    lineItems(first: 50) {{
-                      edges {{
-                        node {{
-                          sku
-                          title
-                          quantity
-                          originalTotalSet {{ shopMoney {{ amount }} }}
-                          product {{
-                            productType
-                            vendor
-                            tags
-                          }}
-                        }}
-                      }}
-                    }}
-                  }}
-                }}
-              }}
-            }}
-            '''
-            payload = {"query": graphql_query, "variables": {"cursor": cursor}}
-            resp = requests.post(GRAPHQL_ENDPOINT, json=payload, headers=HEADERS, timeout=30)
-            resp.raise_for_status()
-            data = resp.json()["data"]["orders"]
-
-            for edge in data["edges"]:
-                line_items = edge["node"]["lineItems"]["edges"]
-                for item_edge in line_items:
-                    item = item_edge["node"]
-                    product = item.get("product", {})
-                    
-                    sku = item.get("sku") or "UNKNOWN"
-                    title = item.get("title") or "Unknown Product"
-                    quantity = int(item.get("quantity", 1))
-                    revenue = float(item.get("originalTotalSet", {}).get("shopMoney", {}).get("amount", 0))
-                    category = product.get("productType") or "Uncategorized"
-                    
-                    total_revenue += revenue
-                    
-                    # Aggregate by category
-                    if category not in category_data:
-                        category_data[category] = {"quantity": 0, "revenue": 0.0}
-                        all_skus_by_category[category] = {}
-                    
-                    category_data[category]["quantity"] += quantity
-                    category_data[category]["revenue"] += revenue
-                    
-                    # Store SKU-level data for dropdown functionality
-                    if sku not in all_skus_by_category[category]:
-                        all_skus_by_category[category][sku] = {"title": title, "quantity": 0, "revenue": 0.0}
-                    
-                    all_skus_by_category[category][sku]["quantity"] += quantity
-                    all_skus_by_category[category][sku]["revenue"] += revenue
-
-            if not data["pageInfo"]["hasNextPage"]:
-                break
-            cursor = data["pageInfo"]["endCursor"]
-            
-        except Exception as e:
-            st.error(f"Error fetching category data: {str(e)}")
-            break
-    
-    # Calculate category shares
-    for category in category_data:
-        category_data[category]["share_percentage"] = (category_data[category]["revenue"] / total_revenue * 100) if total_revenue > 0 else 0
-    
-    return {
-        "category_data": category_data,
-        "all_skus_by_category": all_skus_by_category,
-        "total_revenue": total_revenue
-    }
-
-def fetch_category_metrics() -> Dict[str, Any]:
-    """Fetch category metrics separately"""
-    try:
-        start_iso, end_iso, now_ist = get_timeframe()
-        category_info = fetch_category_data(start_iso, end_iso, TARGET_TAGS)
-        
-        return {
-            "category_info": category_info,
-            "now_ist": now_ist,
-            "success": True,
-            "error": None
-        }
-    except Exception as e:
+    snapshot = SNAPSHOT_STORE.read(ACTIVE_CAMPAIGN.name, panel)
+    if snapshot is None:
         return {
             "success": False,
-            "error": str(e),
-            "category_info": {},
-            "now_ist": datetime.datetime.now(pytz.timezone("Asia/Kolkata"))
+            "error": "Waiting for the ingestion daemon to publish its first snapshot",
+            "now_ist": datetime.datetime.now(ACTIVE_CAMPAIGN.end_dt.tzinfo)
         }
-
-def get_recent_cart_activity(start_iso: str, end_iso: str) -> int:
-    """Get recent cart activity with improved error handling"""
-    try:
-        url = f"https://{SHOP_NAME}.myshopify.com/admin/api/{API_VERSION}/checkouts.json"
-        params = {
-            "created_at_min": start_iso,
-            "created_at_max": end_iso,
-            "limit": 250
-        }
-        headers = {"X-Shopify-Access-Token": ACCESS_TOKEN}
-        r = requests.get(url, headers=headers, params=params, timeout=30)
-        r.raise_for_status()
-        checkouts = r.json().get("checkouts", [])
-        return len([c for c in checkouts if not c.get("completed_at")])
-    except Exception:
-        return 0
-
-def get_unique_customers_count(start_iso: str, end_iso: str) -> int:
-    """Get unique customer count with improved pagination"""
-    date_query = f"created_at:>'{start_iso}' AND created_at:<='{end_iso}'"
-    paid_query = "financial_status:paid"
-    query_filter = f"{date_query} AND {paid_query}"
-
-    customers = set()
-    cursor = None
-
-    while True:
-        try:
-            graphql_query = f'''
-            query ($cursor: String) {{
-              orders(
-                first: 250,
-                after: $cursor,
-                query: "{query_filter}",
-                sortKey: CREATED_AT
-              ) {{
-                pageInfo {{ hasNextPage endCursor }}
-                edges {{ node {{ customer {{ id }} }} }}
-              }}
-            }}
-            '''
-            payload = {"query": graphql_query, "variables": {"cursor": cursor}}
-            resp = requests.post(GRAPHQL_ENDPOINT, json=payload, headers=HEADERS, timeout=30)
-            resp.raise_for_status()
-            data = resp.json()["data"]["orders"]
-
-            for edge in data["edges"]:
-                cust = edge["node"].get("customer") or {}
-                if cust.get("id"):
-                    customers.add(cust["id"])
-
-            if not data["pageInfo"]["hasNextPage"]:
-                break
-            cursor = data["pageInfo"]["endCursor"]
-        except Exception:
-            break
-
-    return len(customers)
-
-def get_top_skus_improved(start_iso: str, end_iso: str, target_tags: List[str]) -> List[Tuple[str, int, float]]:
-    """Get top SKUs with quantity and revenue data, sorted by revenue"""
-    sku_data = {}  # Changed to store both quantity and revenue
-    tag_query = " OR ".join(f"tag:{t}" for t in target_tags)
-    date_query = f"created_at:>'{start_iso}' AND created_at:<='{end_iso}'"
-    paid_query = "financial_status:paid"
-    query_filter = f"({tag_query}) AND {date_query} AND {paid_query}"
-    
-    cursor = None
-    
-    while True:
-        try:
-            graphql_query = f'''
-            query ($cursor: String) {{
-              orders(
-                first: 250,
-                after: $cursor,
-                query: "{query_filter}",
-                sortKey: CREATED_AT
-              ) {{
-                pageInfo {{ hasNextPage endCursor }}
-                edges {{
-                  node {{
-                    lineItems(first: 50) {{
-                      edges {{
-                        node {{
-                          sku
-                          quantity
-                          originalTotalSet {{ shopMoney {{ amount }} }}
-                        }}
-                      }}
-                    }}
-                  }}
-                }}
-              }}
-            }}
-            '''
-            payload = {"query": graphql_query, "variables": {"cursor": cursor}}
-            resp = requests.post(GRAPHQL_ENDPOINT, json=payload, headers=HEADERS, timeout=30)
-            resp.raise_for_status()
-            data = resp.json()["data"]["orders"]
-
-            for edge in data["edges"]:
-                line_items = edge["node"]["lineItems"]["edges"]
-                for item_edge in line_items:
-                    item = item_edge["node"]
-                    sku = item.get("sku") or "UNKNOWN"
-                    qty = int(item.get("quantity", 1))
-                    revenue = float(item.get("originalTotalSet", {}).get("shopMoney", {}).get("amount", 0))
-                    
-                    if sku not in sku_data:
-                        sku_data[sku] = {"quantity": 0, "revenue": 0.0}
-                    
-                    sku_data[sku]["quantity"] += qty
-                    sku_data[sku]["revenue"] += revenue
-
-            if not data["pageInfo"]["hasNextPage"]:
-                break
-            cursor = data["pageInfo"]["endCursor"]
-            
-        except Exception as e:
-            st.error(f"Error fetching SKU data: {str(e)}")
-            break
-
-    # Sort by revenue (descending) and return top 10
-    top_10 = sorted(
-        [(sku, data["quantity"], data["revenue"]) for sku, data in sku_data.items()],
-        key=lambda x: x[2],  # Sort by revenue (index 2)
-        reverse=True
-    )[:10]
-    
-    return top_10
-
-def fetch_geographic_data(start_iso: str, end_iso: str, target_tags: List[str]) -> Dict[str, Any]:
-    """Fetch geographic data for mapping and state analysis"""
-    tag_query = " OR ".join(f"tag:{t}" for t in target_tags)
-    date_query = f"created_at:>'{start_iso}' AND created_at:<='{end_iso}'"
-    paid_query = "financial_status:paid"
-    query_filter = f"({tag_query}) AND {date_query} AND {paid_query}"
-    
-    state_data = {}
-    order_locations = []  # For actual map plotting
-    total_revenue = 0
-    total_quantity = 0
-    cursor = None
-    
-    while True:
-        try:
-            graphql_query = f'''
-            query ($cursor: String) {{
-              orders(
-                first: 250,
-                after: $cursor,
-                query: "{query_filter}",
-                sortKey: CREATED_AT
-              ) {{
-                pageInfo {{ hasNextPage endCursor }}
-                edges {{
-                  node {{
-                    id
-                    name
-                    shippingAddress {{
-                      address1
-                      address2
-                      city
-                      province
-                      provinceCode
-                      zip
-                      country
-                      countryCodeV2
-                      latitude
-                      longitude
-                    }}
-                    currentTotalPriceSet {{ shopMoney {{ amount }} }}
-                    lineItems(first: 50) {{
-                      edges {{
-                        node {{
-                          quantity
-                          title
-                        }}
-                      }}
-                    }}
-                  }}
-                }}
-              }}
-            }}
-            '''
-            payload = {"query": graphql_query, "variables": {"cursor": cursor}}
-            resp = requests.post(GRAPHQL_ENDPOINT, json=payload, headers=HEADERS, timeout=30)
-            resp.raise_for_status()
-            data = resp.json()["data"]["orders"]
-
-            for edge in data["edges"]:
-                order = edge["node"]
-                shipping_addr = order.get("shippingAddress")
-                
-                if shipping_addr:
-                    state = shipping_addr.get("province")
-                    city = shipping_addr.get("city")
-                    latitude = shipping_addr.get("latitude")
-                    longitude = shipping_addr.get("longitude")
-                    revenue = float(order["currentTotalPriceSet"]["shopMoney"]["amount"])
-                    
-                    # Calculate total quantity for this order
-                    order_quantity = sum(
-                        int(item["node"]["quantity"]) 
-                        for item in order["lineItems"]["edges"]
-                    )
-                    
-                    # Store individual order location for mapping
-                    if latitude and longitude:
-                        try:
-                            lat_float = float(latitude)
-                            lon_float = float(longitude)
-                            # Validate coordinates are within India bounds
-                            if 6.0 <= lat_float <= 37.0 and 68.0 <= lon_float <= 97.0:
-                                order_locations.append({
-                                    "lat": lat_float,
-                                    "lon": lon_float,
-                                    "order_id": order["name"],
-                                    "city": city or "Unknown",
-                                    "state": state or "Unknown",
-                                    "revenue": revenue,
-                                    "quantity": order_quantity
-                                })
-                        except (ValueError, TypeError):
-                            pass  # Skip invalid coordinates
-                    
-                    # Aggregate by state for state analysis
-                    if state:
-                        if state not in state_data:
-                            state_data[state] = {"revenue": 0, "quantity": 0, "orders": 0}
-                        
-                        state_data[state]["revenue"] += revenue
-                        state_data[state]["quantity"] += order_quantity
-                        state_data[state]["orders"] += 1
-                        
-                        total_revenue += revenue
-                        total_quantity += order_quantity
-
-            if not data["pageInfo"]["hasNextPage"]:
-                break
-            cursor = data["pageInfo"]["endCursor"]
-            
-        except Exception as e:
-            st.error(f"Error fetching geographic data: {str(e)}")
-            break
-    
-    # Calculate percentages and prepare data
-    for state in state_data:
-        state_data[state]["revenue_percentage"] = (state_data[state]["revenue"] / total_revenue * 100) if total_revenue > 0 else 0
-        state_data[state]["quantity_percentage"] = (state_data[state]["quantity"] / total_quantity * 100) if total_quantity > 0 else 0
-    
-    return {
-        "state_data": state_data,
-        "order_locations": order_locations,  # Actual order coordinates
-        "total_revenue": total_revenue,
-        "total_quantity": total_quantity
-    }
-
-def fetch_customer_segmentation(start_iso: str, end_iso: str) -> Dict[str, Any]:
-    """Fetch new vs returning customer data"""
-    date_query = f"created_at:>'{start_iso}' AND created_at:<='{end_iso}'"
-    paid_query = "financial_status:paid"
-    query_filter = f"{date_query} AND {paid_query}"
-    
-    customer_data = {}
-    cursor = None
-    
-    while True:
-        try:
-            graphql_query = f'''
-            query ($cursor: String) {{
-              orders(
-                first: 250,
-                after: $cursor,
-                query: "{query_filter}",
-                sortKey: CREATED_AT
-              ) {{
-                pageInfo {{ hasNextPage endCursor }}
-                edges {{
-                  node {{
-                    customer {{
-                      id
-                      createdAt
-                    }}
-                    createdAt
-                  }}
-                }}
-              }}
-            }}
-            '''
-            payload = {"query": graphql_query, "variables": {"cursor": cursor}}
-            resp = requests.post(GRAPHQL_ENDPOINT, json=payload, headers=HEADERS, timeout=30)
-            resp.raise_for_status()
-            data = resp.json()["data"]["orders"]
-
-            for edge in data["edges"]:
-                order = edge["node"]
-                customer = order.get("customer")
-                
-                if customer and customer.get("id"):
-                    customer_id = customer["id"]
-                    customer_created = customer.get("createdAt")
-                    order_created = order.get("createdAt")
-                    
-                    # If customer was created very close to order time, consider as new
-                    if customer_created and order_created:
-                        customer_dt = datetime.datetime.fromisoformat(customer_created.replace('Z', '+00:00'))
-                        order_dt = datetime.datetime.fromisoformat(order_created.replace('Z', '+00:00'))
-                        
-                        # If customer created within 1 hour of order, consider new
-                        time_diff = (order_dt - customer_dt).total_seconds() / 3600
-                        
-                        if customer_id not in customer_data:
-                            customer_data[customer_id] = {
-                                "is_new": time_diff <= 1,
-                                "orders": 0
-                            }
-                        
-                        customer_data[customer_id]["orders"] += 1
-
-            if not data["pageInfo"]["hasNextPage"]:
-                break
-            cursor = data["pageInfo"]["endCursor"]
-            
-        except Exception as e:
-            st.error(f"Error fetching customer data: {str(e)}")
-            break
-    
-    # Calculate totals
-    new_customers = sum(1 for data in customer_data.values() if data["is_new"])
-    returning_customers = len(customer_data) - new_customers
-    new_customer_orders = sum(data["orders"] for data in customer_data.values() if data["is_new"])
-    returning_customer_orders = sum(data["orders"] for data in customer_data.values() if not data["is_new"])
-    
-    return {
-        "new_customers": new_customers,
-        "returning_customers": returning_customers,
-        "new_customer_orders": new_customer_orders,
-        "returning_customer_orders": returning_customer_orders,
-        "total_customers": len(customer_data)
-    }
+    return snapshot
 
 def fetch_main_metrics() -> Dict[str, Any]:
     """Fetch main dashboard metrics (orders, sales, etc.)"""
-    try:
-        start_iso, end_iso, now_ist = get_timeframe()
-        
-        date_query = f"created_at:>'{start_iso}' AND created_at:<='{end_iso}'"
-        paid_query = "financial_status:paid"
-        overall_filt = f"{date_query} AND {paid_query}"
-        tag_query = " OR ".join(f"tag:{t}" for t in TARGET_TAGS)
-        tagged_filt = f"({tag_query}) AND {date_query} AND {paid_query}"
-
-        total_orders, total_sales = fetch_orders_metrics(overall_filt)
-        tag_orders, tag_sales = fetch_orders_metrics(tagged_filt)
-        
-        now_utc = datetime.datetime.now(pytz.UTC)
-        recent_carts = get_recent_cart_activity(
-            (now_utc - datetime.timedelta(minutes=30)).isoformat(),
-            now_utc.isoformat()
-        )
-
-        additional_metrics = get_additional_metrics(start_iso, end_iso, total_orders, total_sales)
-        conversion_rate = (tag_orders / total_orders * 100) if total_orders else 0
-
-        return {
-            "total_orders": total_orders,
-            "total_sales": total_sales,
-            "tag_orders": tag_orders,
-            "tag_sales": tag_sales,
-            "recent_carts": recent_carts,
-            "additional_metrics": additional_metrics,
-            "conversion_rate": conversion_rate,
-            "now_ist": now_ist,
-            "success": True,
-            "error": None
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "error": str(e),
-            "now_ist": datetime.datetime.now(pytz.timezone("Asia/Kolkata"))
-        }
+    return fetch_panel("main", main_refresh_interval)
 
 def fetch_sku_metrics() -> Dict[str, Any]:
     """Fetch SKU data with revenue information"""
-    try:
-        start_iso, end_iso, now_ist = get_timeframe()
-        top_skus = get_top_skus_improved(start_iso, end_iso, TARGET_TAGS)
-        
-        return {
-            "top_skus": top_skus,
-            "now_ist": now_ist,
-            "success": True,
-            "error": None
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "error": str(e),
-            "top_skus": [],
-            "now_ist": datetime.datetime.now(pytz.timezone("Asia/Kolkata"))
-        }
+    return fetch_panel("sku", sku_refresh_interval)
+
+def fetch_category_metrics() -> Dict[str, Any]:
+    """Fetch category metrics separately"""
+    return fetch_panel("category", category_refresh_interval)
 
 def fetch_map_metrics() -> Dict[str, Any]:
     """Fetch geographic data for map visualization"""
-    try:
-        start_iso, end_iso, now_ist = get_timeframe()
-        geo_data = fetch_geographic_data(start_iso, end_iso, TARGET_TAGS)
-        
-        return {
-            "geographic_data": geo_data,
-            "now_ist": now_ist,
-            "success": True,
-            "error": None
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "error": str(e),
-            "geographic_data": {},
-            "now_ist": datetime.datetime.now(pytz.timezone("Asia/Kolkata"))
-        }
+    return fetch_panel("map", map_refresh_interval)
 
 def fetch_customer_metrics() -> Dict[str, Any]:
     """Fetch customer segmentation data"""
-    try:
-        start_iso, end_iso, now_ist = get_timeframe()
-        customer_seg = fetch_customer_segmentation(start_iso, end_iso)
-        
-        return {
-            "customer_segmentation": customer_seg,
-            "now_ist": now_ist,
-            "success": True,
-            "error": None
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "error": str(e),
-            "customer_segmentation": {},
-            "now_ist": datetime.datetime.now(pytz.timezone("Asia/Kolkata"))
-        }
+    return fetch_panel("customer", customer_refresh_interval)
 
 def fetch_state_metrics() -> Dict[str, Any]:
     """Fetch state performance data"""
-    try:
-        start_iso, end_iso, now_ist = get_timeframe()
-        geo_data = fetch_geographic_data(start_iso, end_iso, TARGET_TAGS)
-        
-        return {
-            "state_performance": geo_data,
-            "now_ist": now_ist,
-            "success": True,
-            "error": None
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "error": str(e),
-            "state_performance": {},
-            "now_ist": datetime.datetime.now(pytz.timezone("Asia/Kolkata"))
-        }
+    return fetch_panel("state", state_refresh_interval)
+
+def fetch_attribution_metrics() -> Dict[str, Any]:
+    """Fetch discount code and traffic source attribution"""
+    return fetch_panel("attribution", attribution_refresh_interval)
 
 # ─── Refresh Logic Functions ──────────────────────────────────────────────────
 
-def should_refresh_main_data() -> bool:
-    if st.session_state.last_main_update is None:
+def should_refresh_panel(panel: str) -> bool:
+    """Check whether a panel's data is older than its refresh interval"""
+    last_update = st.session_state[f"last_{panel}_update"]
+    if last_update is None:
         return True
-    time_since_update = (datetime.datetime.now() - st.session_state.last_main_update).total_seconds()
-    return time_since_update >= main_refresh_interval
+    time_since_update = (datetime.datetime.now() - last_update).total_seconds()
+    return time_since_update >= intervals[panel]
+
+PANEL_LOADERS = {
+    "main": fetch_main_metrics,
+    "sku": fetch_sku_metrics,
+    "map": fetch_map_metrics,
+    "customer": fetch_customer_metrics,
+    "state": fetch_state_metrics,
+    "category": fetch_category_metrics,
+    "attribution": fetch_attribution_metrics
+}
+
+def start_cold_load():
+    """Paint empty panels from the warm-start snapshot and sync their scans in the background"""
+    cold_panels = [panel for panel in PANELS if st.session_state[f"{panel}_data"] is None]
+    if not cold_panels or st.session_state.cold_load is not None:
+        return
+    if ENGINE.panels_fresh({panel: intervals[panel] for panel in cold_panels}):
+        return  # another session already synced them; loading below is instant
+
+    for panel in cold_panels:
+        snapshot = WARM_START_STORE.read(ACTIVE_CAMPAIGN.name, panel) if WARM_START_STORE else None
+        if snapshot is not None:
+            # Left without an update time, so it is replaced as soon as the sync lands
+            st.session_state[f"{panel}_data"] = snapshot
+        st.session_state[f"{panel}_loading"] = True
+
+    st.session_state.cold_load = ENGINE.refresh_panels_in_background({panel: intervals[panel] for panel in cold_panels})
+    st.session_state.cold_panels = cold_panels
+
+def finish_cold_load():
+    """Load the cold panels from the synced scans once the background sync is done"""
+    cold_load = st.session_state.cold_load
+    if cold_load is None or not cold_load.done():
+        return
 
-def should_refresh_sku_data() -> bool:
-    if st.session_state.last_sku_update is None:
-        return True
-    time_since_update = (datetime.datetime.now() - st.session_state.last_sku_update).total_seconds()
-    return time_since_update >= sku_refresh_interval
+    for panel in st.session_state.cold_panels:
+        # Scans are fresh now, so this only derives the panel (or reports the sync's error)
+        load_panel(panel)
+    st.session_state.cold_load = None
+    st.session_state.cold_panels = []
 
-def should_refresh_map_data() -> bool:
-    if st.session_state.last_map_update is None:
-        return True
-    time_since_update = (datetime.datetime.now() - st.session_state.last_map_update).total_seconds()
-    return time_since_update >= map_refresh_interval
+def cold_load_pending() -> bool:
+    return st.session_state.cold_load is not None
 
-def should_refresh_customer_data() -> bool:
-    if st.session_state.last_customer_update is None:
-        return True
-    time_since_update = (datetime.datetime.now() - st.session_state.last_customer_update).total_seconds()
-    return time_since_update >= customer_refresh_interval
+def load_panel(panel: str):
+    """Fetch a panel, keeping its last good data if the fetch fails"""
+    st.session_state[f"{panel}_loading"] = True
+    try:
+        result = PANEL_LOADERS[panel]()
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+    finally:
+        st.session_state[f"{panel}_loading"] = False
+
+    health = st.session_state[f"{panel}_health"]
+    if result.get("success"):
+        health.record_success()
+        st.session_state[f"{panel}_data"] = result
+        st.session_state[f"last_{panel}_update"] = datetime.datetime.now()
+    else:
+        health.record_failure(result.get("error") or "Unknown error")
+        previous = st.session_state[f"{panel}_data"]
+        if not previous or not previous.get("success"):
+            # Nothing good to keep serving; the panel shows the error until a retry succeeds
+            st.session_state[f"{panel}_data"] = result
+
+def revalidate_panel(panel: str) -> bool:
+    """Refresh a panel in place if its backoff and error budget allow an attempt now; returns whether it ran"""
+    if st.session_state[f"{panel}_loading"] or not st.session_state[f"{panel}_health"].can_attempt():
+        return False
+    load_panel(panel)
+    return True
+
+def rerun_at_next_attempt(panel: str):
+    """Rerun the page once a failing panel's backoff allows another attempt, without blocking the session"""
+    health = st.session_state[f"{panel}_health"]
+
+    @st.fragment(run_every=max(health.next_attempt_at - time.time(), 1.0))
+    def wait_for_retry():
+        if health.can_attempt():
+            st.rerun()
 
-def should_refresh_state_data() -> bool:
-    if st.session_state.last_state_update is None:
-        return True
-    time_since_update = (datetime.datetime.now() - st.session_state.last_state_update).total_seconds()
-    return time_since_update >= state_refresh_interval
+    wait_for_retry()
+
+def retry_pending() -> bool:
+    """Check whether any panel is failing and waiting on its next retry"""
+    return any(st.session_state[f"{panel}_health"].failing for panel in PANELS)
+
+def render_staleness_badge(*panels: str):
+    """Show how stale a section is while any of its panels keeps failing to refresh"""
+    for panel in panels:
+        note = st.session_state[f"{panel}_health"].staleness_note()
+        if note:
+            st.markdown(f'<div class="stale-badge">⏳ {note}</div>', unsafe_allow_html=True)
+
+
+def render_alerts(alerts: List[Dict[str, Any]], now_ist: datetime.datetime):
+    """Show the anomaly alerts raised within the last hour, newest first"""
+    show = {"critical": st.error, "warning": st.warning, "info": st.info}
+    for alert in alerts:
+        at = datetime.datetime.fromisoformat(alert["at"]).astimezone(now_ist.tzinfo)
+        show[alert["severity"]](f"**{at.strftime('%I:%M %p')}** · {alert['message']}")
+
+
+def add_shop_revenue_columns(display: pd.DataFrame, key_column: str, panel_data: Dict[str, Any]) -> pd.DataFrame:
+    """Append a formatted revenue column per shop when the panel was merged from several shops"""
+    for label, revenue in (panel_data.get("shop_revenue") or {}).items():
+        display[f"Revenue · {label}"] = format_indian_currency_series(display[key_column].map(revenue).fillna(0.0))
+    return display
+
+
+def render_shop_breakdown(shops: List[Dict[str, Any]]):
+    """Show each shop's share of the campaign when several storefronts are merged"""
+    tag_sales = sum(shop["tag_sales"] for shop in shops)
+    table = pd.DataFrame([
+        {
+            "Store": shop["shop"],
+            "Campaign Orders": shop["tag_orders"],
+            "Campaign Revenue": shop["tag_sales"],
+            "Revenue Share %": shop["tag_sales"] / tag_sales * 100 if tag_sales else 0.0,
+            "All Orders": shop["total_orders"],
+            "Customers": shop["unique_customers"]
+        }
+        for shop in shops
+    ]).sort_values("Campaign Revenue", ascending=False)
+    table.index = range(1, len(table) + 1)
+    table["Campaign Revenue"] = format_indian_currency_series(table["Campaign Revenue"])
+    table["Revenue Share %"] = table["Revenue Share %"].round(1).astype(str) + "%"
+    st.markdown("### By Store")
+    st.dataframe(table, use_container_width=True)
+
+
+def get_sku_index(category_data: Dict[str, Any]) -> SkuIndex:
+    """Get the SKU search index for a category result, built once per panel refresh rather than per rerun"""
+    cached = st.session_state.get("sku_index")
+    if cached is None or cached[0] is not category_data:
+        cached = st.session_state.sku_index = (category_data, SkuIndex.from_category_info(category_data["category_info"]))
+    return cached[1]
+
+
+def render_sku_search(sku_index: SkuIndex, selected_category: str):
+    """Search every SKU by code or title, with vendor, revenue and category filters, one page at a time"""
+    st.markdown("#### Find a SKU")
+    s1, s2, s3, s4 = st.columns([3, 1, 1, 1])
+    with s1:
+        query = st.text_input("SKU or title", key="sku_search_query", placeholder="Type part of a SKU or product title")
+    with s2:
+        match = st.selectbox("Match", ["Contains", "SKU starts with"], key="sku_search_match")
+    with s3:
+        vendor = st.selectbox("Vendor", ["All vendors"] + sku_index.vendors, key="sku_search_vendor")
+    with s4:
+        min_revenue = st.number_input("Min revenue (₹)", min_value=0.0, step=1000.0, key="sku_search_min_revenue")
+    only_category = st.checkbox(f"Only {selected_category}", key="sku_search_only_category")
+
+    filters = {
+        "query": query,
+        "prefix": match == "SKU starts with",
+        "category": selected_category if only_category else None,
+        "vendor": None if vendor == "All vendors" else vendor,
+        "min_revenue": min_revenue
+    }
+    _, total = sku_index.search(**filters, page_size=0)
+    pages = max(-(-total // SEARCH_PAGE_SIZE), 1)
+    page = 1
+    if pages > 1:
+        # A narrower search can leave the stored page past the end
+        if st.session_state.get("sku_search_page", 1) > pages:
+            st.session_state.sku_search_page = pages
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, key="sku_search_page")
+    started = time.perf_counter()
+    rows, total = sku_index.search(**filters, page=page, page_size=SEARCH_PAGE_SIZE)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    st.caption(f"{total:,} of {len(sku_index.rows):,} SKUs match · page {page} of {pages} · {elapsed_ms:.1f} ms")
+    if rows:
+        results = pd.DataFrame([
+            {"SKU": row.sku, "Title": row.title, "Category": row.category, "Vendor": row.vendor or "",
+             "Quantity": row.quantity, "Revenue": row.revenue}
+            for row in rows
+        ])
+        results.index = range((page - 1) * SEARCH_PAGE_SIZE + 1, (page - 1) * SEARCH_PAGE_SIZE + len(results) + 1)
+        results["Revenue"] = format_indian_currency_series(results["Revenue"])
+        st.dataframe(results, use_container_width=True)
+
+
+def attribution_table(rows: List[Tuple[str, int, float]], label: str, total_revenue: float) -> pd.DataFrame:
+    """Tabulate (name, orders, revenue) attribution rows with their share of campaign revenue"""
+    table = pd.DataFrame(rows, columns=[label, "Orders", "Revenue"])
+    table["Revenue %"] = (table["Revenue"] / total_revenue * 100 if total_revenue else 0.0)
+    table["Revenue"] = format_indian_currency_series(table["Revenue"])
+    table["Revenue %"] = table["Revenue %"].round(1).astype(str) + "%"
+    table.index = range(1, len(table) + 1)
+    return table
+
+
+def render_attribution(attribution: Dict[str, Any]):
+    """Show the top discount codes and traffic sources behind the campaign's tagged orders"""
+    total_orders = attribution["orders"]
+    coded_share = attribution["coded_orders"] / total_orders * 100 if total_orders else 0.0
+
+    at1, at2, at3 = st.columns(3)
+    with at1:
+        st.metric("Orders with a Discount Code", f"{attribution['coded_orders']:,}", f"{coded_share:.1f}% of orders",
+                  delta_color="off")
+    with at2:
+        st.metric("Discount Code Revenue", format_indian_currency(attribution["coded_revenue"]))
+    with at3:
+        st.metric("Traffic Sources", f"{len(attribution['sources']):,}")
+
+    code_col, source_col = st.columns(2)
+    with code_col:
+        st.markdown("#### Top Discount Codes")
+        if attribution["discount_codes"]:
+            st.dataframe(attribution_table(attribution["discount_codes"], "Code", attribution["revenue"]),
+                         use_container_width=True)
+        else:
+            st.info("No tagged orders used a discount code yet.")
+    with source_col:
+        st.markdown("#### Top Traffic Sources")
+        st.dataframe(attribution_table(attribution["sources"], "Source", attribution["revenue"]),
+                     use_container_width=True)
+
+
+def ranking_table(current: List[Tuple[str, float]], archived: List[Tuple[str, float]], limit: int = 10) -> pd.DataFrame:
+    """Line up the current and an archived campaign's (name, revenue) rankings side by side"""
+    rows = max(min(len(current), limit), min(len(archived), limit))
+    def column(ranking, index):
+        return [ranking[i][index] if i < len(ranking) else None for i in range(rows)]
+    table = pd.DataFrame({
+        "Rank": range(1, rows + 1),
+        "Current": column(current, 0),
+        "Current Revenue": pd.Series(column(current, 1), dtype="float64"),
+        "Archived": column(archived, 0),
+        "Archived Revenue": pd.Series(column(archived, 1), dtype="float64")
+    })
+    for revenue_column in ("Current Revenue", "Archived Revenue"):
+        table[revenue_column] = format_indian_currency_series(table[revenue_column]).where(
+            table[revenue_column].notna(), "")
+    return table
+
+def render_export():
+    """Offer the full SKU, category and state tables for download, serialized from the current panel data"""
+    fmt = st.radio("Format", options=available_formats(), horizontal=True, key="export_format")
+    campaign_slug = ACTIVE_CAMPAIGN.name.lower().replace(" ", "_")
+    for column, (table, (panel, _)) in zip(st.columns(len(EXPORT_TABLES)), EXPORT_TABLES.items()):
+        panel_data = st.session_state[f"{panel}_data"]
+        ready = bool(panel_data and panel_data.get("success"))
+        with column:
+            st.download_button(
+                f"⬇️ {table.title()}",
+                # Serialized only when clicked, from the data already on screen
+                data=functools.partial(export_bytes, table, panel_data, fmt) if ready else b"",
+                file_name=f"{campaign_slug}_{table}.{fmt}",
+                mime=MIME_TYPES[fmt],
+                on_click="ignore",
+                disabled=not ready,
+                key=f"export_{table}"
+            )
+
+
+def render_campaign_comparison(main_data, sku_data, category_data, state_data, archived: Dict[str, Any]):
+    """Overlay the active campaign's revenue curve and rankings on an archived campaign's"""
+    current_curve = main_data.get("revenue_curve") or []
+    archived_curve = pd.Series(archived["minute_revenue"], dtype="float64").cumsum()
+    
+    comp1, comp2, comp3 = st.columns(3)
+    elapsed_minutes = len(current_curve)
+    current_so_far = current_curve[-1] if current_curve else 0
+    archived_so_far = archived_curve.iloc[min(elapsed_minutes, len(archived_curve)) - 1] if elapsed_minutes else 0
+    with comp1:
+        delta = (f"{(current_so_far / archived_so_far - 1) * 100:+.1f}% vs {archived['name']}"
+                 if archived_so_far else None)
+        st.metric("Revenue at the same point", format_indian_currency(current_so_far), delta)
+    with comp2:
+        st.metric(f"{archived['name']} final revenue", format_indian_currency(archived["totals"]["tag_sales"]))
+    with comp3:
+        st.metric(f"{archived['name']} orders", f"{archived['totals']['tag_orders']:,}")
+    
+    st.markdown("#### Cumulative Revenue by Hours Since Start")
+    curves = pd.DataFrame({
+        ACTIVE_CAMPAIGN.name: pd.Series(current_curve, dtype="float64"),
+        archived["name"]: archived_curve
+    })
+    curves.index = curves.index / 60
+    st.line_chart(curves, height=400)
+    
+    current_skus = [(sku[0], sku[2]) for sku in sku_data["top_skus"]] if sku_data and sku_data.get("success") else []
+    current_categories = []
+    if category_data and category_data.get("success"):
+        current_categories = sorted(
+            ((name, totals["revenue"]) for name, totals in category_data["category_info"]["category_data"].items()),
+            key=lambda item: item[1], reverse=True
+        )
+    current_states = []
+    if state_data and state_data.get("success"):
+        current_states = sorted(
+            ((name, totals["revenue"]) for name, totals in state_data["state_performance"].get("state_data", {}).items()),
+            key=lambda item: item[1], reverse=True
+        )
+    
+    sku_tab, category_tab, state_tab = st.tabs(["Top SKUs", "Categories", "States"])
+    with sku_tab:
+        st.dataframe(ranking_table(current_skus, [(row[0], row[2]) for row in archived["top_skus"]]),
+                     use_container_width=True, hide_index=True)
+    with category_tab:
+        st.dataframe(ranking_table(current_categories, [(row[0], row[2]) for row in archived["top_categories"]]),
+                     use_container_width=True, hide_index=True)
+    with state_tab:
+        st.dataframe(ranking_table(current_states, [(row[0], row[2]) for row in archived["top_states"]]),
+                     use_container_width=True, hide_index=True)
 
-def should_refresh_category_data() -> bool:
-    if st.session_state.last_category_update is None:
-        return True
-    time_since_update = (datetime.datetime.now() - st.session_state.last_category_update).total_seconds()
-    return time_since_update >= category_refresh_interval
 
 # ─── Main Application ─────────────────────────────────────────────────────────
 
 def main():
-    # Initialize data on first load only
-    if st.session_state.main_data is None and not st.session_state.main_loading:
-        st.session_state.main_loading = True
-        st.session_state.main_data = fetch_main_metrics()
-        st.session_state.last_main_update = datetime.datetime.now()
-        st.session_state.main_loading = False
-
-    if st.session_state.sku_data is None and not st.session_state.sku_loading:
-        st.session_state.sku_loading = True
-        st.session_state.sku_data = fetch_sku_metrics()
-        st.session_state.last_sku_update = datetime.datetime.now()
-        st.session_state.sku_loading = False
-
-    if st.session_state.map_data is None and not st.session_state.map_loading:
-        st.session_state.map_loading = True
-        st.session_state.map_data = fetch_map_metrics()
-        st.session_state.last_map_update = datetime.datetime.now()
-        st.session_state.map_loading = False
-
-    if st.session_state.customer_data is None and not st.session_state.customer_loading:
-        st.session_state.customer_loading = True
-        st.session_state.customer_data = fetch_customer_metrics()
-        st.session_state.last_customer_update = datetime.datetime.now()
-        st.session_state.customer_loading = False
-
-    if st.session_state.state_data is None and not st.session_state.state_loading:
-        st.session_state.state_loading = True
-        st.session_state.state_data = fetch_state_metrics()
-        st.session_state.last_state_update = datetime.datetime.now()
-        st.session_state.state_loading = False
-
-    if st.session_state.category_data is None and not st.session_state.category_loading:
-        st.session_state.category_loading = True
-        st.session_state.category_data = fetch_category_metrics()
-        st.session_state.last_category_update = datetime.datetime.now()
-        st.session_state.category_loading = False
+    if SNAPSHOT_STORE is None:
+        start_cold_load()
+        finish_cold_load()
 
+    # Initialize data on first load only
+    for panel in PANELS:
+        if st.session_state[f"{panel}_data"] is None and not st.session_state[f"{panel}_loading"]:
+            load_panel(panel)
 
     # Show loading indicators
     loading_status = []
@@ -1001,6 +695,8 @@ def main():
         loading_status.append("🏛️ States")
     if st.session_state.category_loading:
         loading_status.append("🏷️ Categories")
+    if st.session_state.attribution_loading:
+        loading_status.append("🎟️ Attribution")
     
     if loading_status:
         st.markdown(f'<div class="loading-indicator">🔄 {", ".join(loading_status)}</div>', unsafe_allow_html=True)
@@ -1047,6 +743,11 @@ def main():
         cat_next_min = cat_next_refresh // 60
         cat_next_sec = cat_next_refresh % 60
         tooltip_lines.append(f"🏷️ Categories: {cat_seconds_ago}s ago | Next: {cat_next_min}m {cat_next_sec}s")
+
+    if st.session_state.last_attribution_update:
+        attr_seconds_ago = int((datetime.datetime.now() - st.session_state.last_attribution_update).total_seconds())
+        attr_next_refresh = max(0, attribution_refresh_interval - attr_seconds_ago)
+        tooltip_lines.append(f"🎟️ Attribution: {attr_seconds_ago}s ago | Next: {attr_next_refresh // 60}m {attr_next_refresh % 60}s")
     
     # Always show the info icon
     tooltip_text = "<br>".join(tooltip_lines) if tooltip_lines else "Dashboard Status Information"
@@ -1067,16 +768,26 @@ def main():
     customer_data = st.session_state.customer_data
     state_data = st.session_state.state_data
     
+    if not main_data and st.session_state.main_loading:
+        st.info("📊 Loading campaign data...")
+        time.sleep(0.5)
+        st.rerun()
+        return
+
     if not main_data or not main_data.get("success"):
         error_msg = main_data.get("error", "Unknown error") if main_data else "No main data available"
         st.markdown(f'<div class="error-message">⚠️ Main Data Error: {error_msg}</div>', unsafe_allow_html=True)
+        render_staleness_badge("main")
         
-        if st.button("🔄 Retry Main Data", key="retry_main_button"):
-            st.session_state.main_data = None
-            st.session_state.last_main_update = None
+        # Retried on the panel's backoff rather than from a button, so failures cannot turn into a retry storm
+        if revalidate_panel("main"):
             st.rerun()
+        rerun_at_next_attempt("main")
         return
 
+    render_staleness_badge("main")
+    render_alerts(main_data.get("alerts", []), main_data["now_ist"])
+
     col1, col2, col3 = st.columns(3)
 
     with col1:
@@ -1092,8 +803,8 @@ def main():
         st.markdown(f"""
             <div class="counter-container">
             <div class="counter-title">Sale Revenue</div>
-            <div class="counter-value">{format_indian_currency(main_data['tag_sales'])}</div>
-            <div class="counter-subtitle">Total campaign revenue</div>
+            <div class="counter-value">{format_indian_currency_compact(main_data['tag_sales'])}</div>
+            <div class="counter-subtitle">Total campaign revenue · {format_indian_currency(main_data['tag_sales'])}</div>
             </div>
         """, unsafe_allow_html=True)
 
@@ -1106,6 +817,33 @@ def main():
             </div>
         """, unsafe_allow_html=True)
 
+    # Forecast, from the EWMA run-rate (weighted by past sales' hour-of-day profile when one is stored)
+    forecast = main_data.get("forecast")
+    if forecast:
+        basis_note = "seasonal, from past sales" if forecast["seasonal"] else "at the current run-rate"
+        fc1, fc2 = st.columns(2)
+        
+        with fc1:
+            st.markdown(f"""
+                <div class="counter-container">
+                <div class="counter-title">Run-Rate</div>
+                <div class="counter-value">{format_indian_currency_compact(forecast['run_rate_per_hour'])}/hr</div>
+                <div class="counter-subtitle">Campaign revenue, last ~30 min weighted</div>
+                </div>
+            """, unsafe_allow_html=True)
+        
+        with fc2:
+            st.markdown(f"""
+                <div class="counter-container">
+                <div class="counter-title">Projected Finish</div>
+                <div class="counter-value">{format_indian_currency_compact(forecast['projected_total'])}</div>
+                <div class="counter-subtitle">{forecast['remaining_hours']:.1f}h left · {basis_note}</div>
+                </div>
+            """, unsafe_allow_html=True)
+
+    if len(main_data.get("shops", [])) > 1:
+        render_shop_breakdown(main_data["shops"])
+
     # Additional metrics
     st.markdown("---")
     st.markdown('<div class="section-header">Performance Analytics</div>', unsafe_allow_html=True)
@@ -1151,6 +889,7 @@ def main():
     st.markdown("---")
     st.markdown('<div class="section-header">Customer Analysis</div>', unsafe_allow_html=True)
     
+    render_staleness_badge("customer")
     if customer_data and customer_data.get("success"):
         cust_seg = customer_data["customer_segmentation"]
         
@@ -1193,14 +932,16 @@ def main():
     st.markdown("---")
     st.markdown('<div class="section-header">Product Performance</div>', unsafe_allow_html=True)
 
+    render_staleness_badge("sku")
     if sku_data and sku_data.get("success") and sku_data['top_skus']:
         # Create DataFrame with SKU, Quantity, and Revenue
         sku_df = pd.DataFrame(sku_data['top_skus'], columns=["SKU", "Quantity", "Revenue"])
         
         # Format revenue for display
         sku_df_display = sku_df.copy()
-        sku_df_display["Revenue"] = sku_df_display["Revenue"].apply(format_indian_currency)
+        sku_df_display["Revenue"] = format_indian_currency_series(sku_df_display["Revenue"])
         sku_df_display.index = range(1, len(sku_df_display) + 1)
+        add_shop_revenue_columns(sku_df_display, "SKU", sku_data)
         
         # Display table
         st.markdown("### Top 10 SKUs by Revenue")
@@ -1264,10 +1005,6 @@ def main():
         
     elif sku_data and not sku_data.get("success"):
         st.error(f"SKU Data Error: {sku_data.get('error', 'Unknown error')}")
-        if st.button("Retry SKU Data", key="retry_sku_button"):
-            st.session_state.sku_data = None
-            st.session_state.last_sku_update = None
-            st.rerun()
     else:
         st.warning("SKU data loading...")
 
@@ -1275,34 +1012,27 @@ def main():
     st.markdown("---")
     st.markdown('<div class="section-header">Category Level Sales</div>', unsafe_allow_html=True)
 
+    categories_df = pd.DataFrame()
+    category_rankings = None
+    render_staleness_badge("category")
     if st.session_state.category_data and st.session_state.category_data.get("success"):
         category_info = st.session_state.category_data["category_info"]
+        category_rankings = st.session_state.category_data.get("category_rankings")
         
-        if category_info.get("category_data"):
+        if category_info.get("category_data") and category_rankings:
             # Category Overview Cards
             st.markdown("### Category Performance Overview")
             
-            # Prepare category data for display - FILTER OUT UNCATEGORIZED
-            categories_list = []
-            for category, data in category_info["category_data"].items():
-                # SKIP "Uncategorized" from display but keep in calculations
-                if category.lower() != "uncategorized":
-                    categories_list.append({
-                        "Category": category,
-                        "Quantity": data["quantity"],
-                        "Revenue": data["revenue"],
-                        "Sale Share %": data["share_percentage"]  # This keeps original percentages
-                    })
-            
-            # Sort by revenue descending
-            categories_df = pd.DataFrame(categories_list)
-            categories_df = categories_df.sort_values("Revenue", ascending=False)
+            # Ranked by revenue once per snapshot in the aggregation layer, without Uncategorized
+            categories_df = pd.DataFrame(category_rankings["categories"],
+                                         columns=["Category", "Quantity", "Revenue", "Sale Share %"])
             categories_df.index = range(1, len(categories_df) + 1)
             
             # Format for display
             categories_display = categories_df.copy()
-            categories_display["Revenue"] = categories_display["Revenue"].apply(format_indian_currency)
-            categories_display["Sale Share %"] = categories_display["Sale Share %"].apply(lambda x: f"{x:.1f}%")
+            categories_display["Revenue"] = format_indian_currency_series(categories_display["Revenue"])
+            categories_display["Sale Share %"] = categories_display["Sale Share %"].round(1).astype(str) + "%"
+            add_shop_revenue_columns(categories_display, "Category", st.session_state.category_data)
             
             # Display category table (without Uncategorized)
             st.dataframe(categories_display, use_container_width=True)
@@ -1336,14 +1066,7 @@ def main():
                 import plotly.express as px
                 
                 # Pie chart WITH Uncategorized (for accurate data representation)
-                all_categories_list = []
-                for category, data in category_info["category_data"].items():
-                    all_categories_list.append({
-                        "Category": category,
-                        "Sale Share %": data["share_percentage"]
-                    })
-                
-                all_categories_pie = pd.DataFrame(all_categories_list)
+                all_categories_pie = pd.DataFrame(category_rankings["shares"], columns=["Category", "Sale Share %"])
                 
                 fig = px.pie(
                     all_categories_pie,
@@ -1385,9 +1108,8 @@ def main():
             st.markdown("---")
             st.markdown("### Category Drill-Down Analysis")
             
-            # Category selection dropdown - EXCLUDE UNCATEGORIZED
-            available_categories = [cat for cat in category_info["all_skus_by_category"].keys() 
-                                if cat.lower() != "uncategorized"]
+            # Category selection dropdown - EXCLUDE UNCATEGORIZED (ranked by revenue)
+            available_categories = list(categories_df["Category"])
             
             if available_categories:
                 selected_category = st.selectbox(
@@ -1396,21 +1118,11 @@ def main():
                     index=0
                 )
                 
-                if selected_category and selected_category in category_info["all_skus_by_category"]:
-                    category_skus = category_info["all_skus_by_category"][selected_category]
-                    
-                    # Prepare SKU data for selected category
-                    sku_list = []
-                    for sku, data in category_skus.items():
-                        sku_list.append({
-                            "SKU": sku,
-                            "Quantity": data["quantity"],
-                            "Revenue": data["revenue"]
-                        })
-                    
-                    # Sort by revenue and take top 10
-                    sku_df = pd.DataFrame(sku_list)
-                    sku_df = sku_df.sort_values("Revenue", ascending=False).head(10)
+                sku_index = get_sku_index(st.session_state.category_data)
+                if selected_category and selected_category in category_rankings["top_skus"]:
+                    sku_df = pd.DataFrame([(sku, quantity, revenue) for sku, _, quantity, revenue
+                                           in category_rankings["top_skus"][selected_category]],
+                                          columns=["SKU", "Quantity", "Revenue"])
                     sku_df.index = range(1, len(sku_df) + 1)
                     
                     # Display category-specific table
@@ -1419,7 +1131,7 @@ def main():
                     with col1:
                         st.markdown(f"#### Top 10 SKUs in {selected_category}")
                         sku_display = sku_df.copy()
-                        sku_display["Revenue"] = sku_display["Revenue"].apply(format_indian_currency)
+                        sku_display["Revenue"] = format_indian_currency_series(sku_display["Revenue"])
                         st.dataframe(sku_display, use_container_width=True)
                     
                     with col2:
@@ -1456,6 +1168,8 @@ def main():
                         )
                         
                         st.plotly_chart(fig_sku, use_container_width=True)
+                
+                render_sku_search(sku_index, selected_category)
             else:
                 st.warning("No categorized products found. All products are marked as 'Uncategorized'.")
         
@@ -1464,17 +1178,13 @@ def main():
 
     elif st.session_state.category_data and not st.session_state.category_data.get("success"):
         st.error(f"Category Data Error: {st.session_state.category_data.get('error', 'Unknown error')}")
-        if st.button("Retry Category Data", key="retry_category_button"):
-            st.session_state.category_data = None
-            st.session_state.last_category_update = None
-            st.rerun()
     else:
         st.warning("Category data loading...")
 
     if not categories_df.empty:
-        visible_revenue = categories_df['Revenue'].sum()
-        total_all_revenue = category_info.get('total_revenue', 0)
-        uncategorized_revenue = total_all_revenue - visible_revenue
+        visible_revenue = category_rankings["categorized_revenue"]
+        total_all_revenue = category_rankings["total_revenue"]
+        uncategorized_revenue = category_rankings["uncategorized_revenue"]
         
         st.markdown("---")
         st.markdown("#### Revenue Distribution")
@@ -1489,11 +1199,23 @@ def main():
             st.metric("Categorized %", f"{categorized_percentage:.1f}%")
 
 
+    # Attribution Section
+    st.markdown("---")
+    st.markdown('<div class="section-header">Attribution</div>', unsafe_allow_html=True)
+    
+    render_staleness_badge("attribution")
+    attribution_data = st.session_state.attribution_data
+    if attribution_data and attribution_data.get("success"):
+        render_attribution(attribution_data["attribution"])
+    else:
+        st.warning("Attribution data loading...")
+
     # Geographic Analysis Section
     st.markdown("---")
     st.markdown('<div class="section-header">Geographic Analysis</div>', unsafe_allow_html=True)
     
     # Top 10 States Performance
+    render_staleness_badge("state", "map")
     if state_data and state_data.get("success"):
         state_perf = state_data["state_performance"]
         
@@ -1516,8 +1238,9 @@ def main():
             
             # Format revenue column for display
             states_df_display = states_df.copy()
-            states_df_display["Revenue"] = states_df_display["Revenue"].apply(format_indian_currency)
-            states_df_display["Revenue %"] = states_df_display["Revenue %"].apply(lambda x: f"{x:.1f}%")
+            states_df_display["Revenue"] = format_indian_currency_series(states_df_display["Revenue"])
+            states_df_display["Revenue %"] = states_df_display["Revenue %"].round(1).astype(str) + "%"
+            add_shop_revenue_columns(states_df_display, "State", state_data)
             
             st.markdown("### Top 10 Performing States (Tagged Orders)")
             st.dataframe(states_df_display, use_container_width=True)
@@ -1525,35 +1248,39 @@ def main():
             # India Map Visualization with Real Order Locations
             st.markdown("### Order Distribution Map")
             
-            order_locations = state_perf.get("order_locations", [])
+            map_bins = state_perf.get("map_bins", [])
+            map_summary = state_perf.get("map_summary", {})
             
-            if order_locations:
-                # Create DataFrame for map plotting
-                map_df = pd.DataFrame(order_locations)
+            if map_bins:
+                # Create DataFrame for map plotting - one row per grid bin, not per order
+                map_df = pd.DataFrame(map_bins)
+                
+                # Scale dot radius (metres) by order count so dense bins stand out
+                map_df["size"] = 2000 + 18000 * (map_df["orders"] / map_df["orders"].max()) ** 0.5
                 
-                # Display the map with actual order locations
-                st.map(map_df[["lat", "lon"]], zoom=5, use_container_width=True)
+                # Display the map with binned order locations
+                st.map(map_df, latitude="lat", longitude="lon", size="size",
+                       zoom=map_summary.get("zoom", DEFAULT_MAP_ZOOM), use_container_width=True)
                 
                 # Map statistics
                 col_map1, col_map2, col_map3 = st.columns(3)
                 
                 with col_map1:
-                    unique_cities = len(set(loc["city"] for loc in order_locations))
-                    st.info(f"🏙️ **{unique_cities} cities** with tagged orders")
+                    st.info(f"🏙️ **{map_summary.get('unique_cities', 0)} cities** with tagged orders")
                 
                 with col_map2:
-                    total_orders_on_map = len(order_locations)
-                    st.info(f"📍 **{total_orders_on_map} orders** plotted on map")
+                    geocoded_orders = map_summary.get('geocoded_orders', 0)
+                    geocoded_note = f" ({geocoded_orders} placed by pincode/city)" if geocoded_orders else ""
+                    st.info(f"📍 **{map_summary.get('mapped_orders', 0)} orders** plotted on map{geocoded_note}")
                 
                 with col_map3:
-                    total_map_revenue = sum(loc["revenue"] for loc in order_locations)
-                    st.info(f"💰 **{format_indian_currency(total_map_revenue)}** from mapped orders")               
+                    st.info(f"💰 **{format_indian_currency(map_summary.get('mapped_revenue', 0))}** from mapped orders")               
                 
                 
             else:
                 st.warning("🗺️ No order locations with coordinates found. This could mean:")
                 st.info("""
-                - Orders don't have latitude/longitude data in Shopify
+                - Orders don't have latitude/longitude data in Shopify, and their pincode/city isn't in the offline index
                 - Coordinates are outside India bounds (filtered out)
                 - No tagged orders have shipping addresses with coordinates
                 
@@ -1590,99 +1317,38 @@ def main():
     else:
         st.warning("State performance data loading...")    
 
+    # Export Section (full tables from the panel data already loaded, with no API calls)
+    st.markdown("---")
+    st.markdown('<div class="section-header">Export</div>', unsafe_allow_html=True)
+    render_export()
+
+    # Campaign Comparison Section (archived campaigns load from a few KB each, with no API calls)
+    archived_names = [name for name in ARCHIVE_STORE.names() if name != ACTIVE_CAMPAIGN.name] if ARCHIVE_STORE else []
+    if archived_names:
+        st.markdown("---")
+        st.markdown('<div class="section-header">Campaign Comparison</div>', unsafe_allow_html=True)
+        compare_name = st.selectbox("Compare with", options=archived_names, key="compare_campaign")
+        archived = ARCHIVE_STORE.load(compare_name)
+        if archived:
+            render_campaign_comparison(main_data, sku_data, st.session_state.category_data, state_data, archived)
+
     # Timestamp
     st.markdown(
         f'<div class="last-updated">Last updated: {main_data["now_ist"].strftime("%I:%M:%S %p IST")}</div>',
         unsafe_allow_html=True
     )
     
-    # Background refresh logic
-    if auto_refresh:
-        # Main data refresh (30 seconds)
-        if should_refresh_main_data() and not st.session_state.main_loading:
-            def update_main_data():
-                st.session_state.main_loading = True
-                try:
-                    new_main_data = fetch_main_metrics()
-                    st.session_state.main_data = new_main_data
-                    st.session_state.last_main_update = datetime.datetime.now()
-                except Exception:
-                    pass
-                finally:
-                    st.session_state.main_loading = False
-            update_main_data()
-        
-        # SKU data refresh (10 minutes)
-        if should_refresh_sku_data() and not st.session_state.sku_loading:
-            def update_sku_data():
-                st.session_state.sku_loading = True
-                try:
-                    new_sku_data = fetch_sku_metrics()
-                    st.session_state.sku_data = new_sku_data
-                    st.session_state.last_sku_update = datetime.datetime.now()
-                except Exception:
-                    pass
-                finally:
-                    st.session_state.sku_loading = False
-            update_sku_data()
-        
-        # Map data refresh (30 minutes)
-        if should_refresh_map_data() and not st.session_state.map_loading:
-            def update_map_data():
-                st.session_state.map_loading = True
-                try:
-                    new_map_data = fetch_map_metrics()
-                    st.session_state.map_data = new_map_data
-                    st.session_state.last_map_update = datetime.datetime.now()
-                except Exception:
-                    pass
-                finally:
-                    st.session_state.map_loading = False
-            update_map_data()
-        
-        # Customer data refresh (5 minutes)
-        if should_refresh_customer_data() and not st.session_state.customer_loading:
-            def update_customer_data():
-                st.session_state.customer_loading = True
-                try:
-                    new_customer_data = fetch_customer_metrics()
-                    st.session_state.customer_data = new_customer_data
-                    st.session_state.last_customer_update = datetime.datetime.now()
-                except Exception:
-                    pass
-                finally:
-                    st.session_state.customer_loading = False
-            update_customer_data()
-        
-        # State data refresh (10 minutes)
-        if should_refresh_state_data() and not st.session_state.state_loading:
-            def update_state_data():
-                st.session_state.state_loading = True
-                try:
-                    new_state_data = fetch_state_metrics()
-                    st.session_state.state_data = new_state_data
-                    st.session_state.last_state_update = datetime.datetime.now()
-                except Exception:
-                    pass
-                finally:
-                    st.session_state.state_loading = False
-            update_state_data()
-        
-        if should_refresh_category_data() and not st.session_state.category_loading:
-            def update_category_data():
-                st.session_state.category_loading = True
-                try:
-                    new_category_data = fetch_category_metrics()
-                    st.session_state.category_data = new_category_data
-                    st.session_state.last_category_update = datetime.datetime.now()
-                except Exception:
-                    pass
-                finally:
-                    st.session_state.category_loading = False
-            update_category_data()
+    # Background refresh: each panel is revalidated when due, keeping its last good data if the refresh fails
+    for panel in PANELS:
+        health = st.session_state[f"{panel}_health"]
+        if health.failing or (auto_refresh and should_refresh_panel(panel)):
+            revalidate_panel(panel)
     
-    # Gentle rerun for updates
-    if auto_refresh:
+    # Gentle rerun for updates (sooner while a cold load is still syncing)
+    if cold_load_pending():
+        time.sleep(0.5)
+        st.rerun()
+    elif auto_refresh or retry_pending():
         time.sleep(5)
         st.rerun()
 
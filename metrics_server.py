@@ -0,0 +1,194 @@
+"""Read-only HTTP endpoint serving the latest snapshots as compact JSON
+
+For office screens and other consumers that only need the headline numbers. It reads the snapshot file
+written by the daemon (or a dashboard's warm-start file), so polling it never reaches Shopify or starts a
+Streamlit session:
+
+    python metrics_server.py --secrets .streamlit/secrets.toml --port 8502
+
+    GET /metrics[?campaign=NAME]                       counters, top SKUs and top states
+    GET /export/{skus,categories,states}.{csv,json,parquet}[?campaign=NAME]
+
+Responses carry an ETag derived from when the snapshots behind them were published. A request sending it
+back in If-None-Match gets 304 Not Modified without any payload being read.
+"""
+import argparse
+import hashlib
+import http.server
+import json
+import logging
+import threading
+import urllib.parse
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+from export import EXPORT_TABLES, MIME_TYPES, available_formats, export_chunks
+from snapshot_store import SnapshotStore
+
+logger = logging.getLogger("metrics_server")
+
+METRICS_PANELS = ("main", "sku", "state")
+TOP_STATES = 5
+
+
+def metrics_payload(campaign: str, main: Dict[str, Any], sku: Optional[Dict[str, Any]],
+                    state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Get the compact metrics document from the main, SKU and state snapshots"""
+    state_data = (state or {}).get("state_performance", {}).get("state_data", {})
+    top_states = sorted(state_data.items(), key=lambda item: item[1]["revenue"], reverse=True)[:TOP_STATES]
+    return {
+        "campaign": campaign,
+        "total_orders": main["total_orders"],
+        "total_sales": round(main["total_sales"], 2),
+        "tag_orders": main["tag_orders"],
+        "tag_sales": round(main["tag_sales"], 2),
+        "conversion_rate": round(main["conversion_rate"], 2),
+        "top_skus": [
+            {"sku": sku_name, "quantity": quantity, "revenue": round(revenue, 2)}
+            for sku_name, quantity, revenue in (sku or {}).get("top_skus", [])
+        ],
+        "top_states": [
+            {"state": name, "orders": totals["orders"], "revenue": round(totals["revenue"], 2)}
+            for name, totals in top_states
+        ],
+        "updated_at": main["now_ist"].isoformat()
+    }
+
+
+class MetricsServer(http.server.ThreadingHTTPServer):
+    """Serves one snapshot file, caching the last metrics body per campaign by its ETag"""
+
+    def __init__(self, address: Tuple[str, int], store: SnapshotStore, default_campaign: str):
+        super().__init__(address, MetricsHandler)
+        self.store = store
+        self.default_campaign = default_campaign
+        self._bodies: Dict[str, Tuple[str, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def etag(self, campaign: str, panels: Tuple[str, ...]) -> Optional[str]:
+        """Get the ETag for a campaign's panels, or None if the first of them was never published"""
+        published = self.store.published_at(campaign)
+        if panels[0] not in published:
+            return None
+        versions = ",".join(f"{panel}:{published.get(panel, 0)!r}" for panel in panels)
+        return '"' + hashlib.sha1(f"{campaign}|{versions}".encode()).hexdigest()[:20] + '"'
+
+    def metrics_body(self, campaign: str, etag: str) -> bytes:
+        with self._lock:
+            cached = self._bodies.get(campaign)
+        if cached is not None and cached[0] == etag:
+            return cached[1]
+        main, sku, state = (self.store.read(campaign, panel) for panel in METRICS_PANELS)
+        payload = metrics_payload(campaign, main, sku, state)
+        body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._bodies[campaign] = (etag, body)
+        return body
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1 for chunked exports and keep-alive polling; every other response sets Content-Length
+    protocol_version = "HTTP/1.1"
+    server: MetricsServer
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        campaign = urllib.parse.parse_qs(url.query).get("campaign", [self.server.default_campaign])[0]
+        try:
+            if url.path == "/metrics":
+                self._serve_metrics(campaign)
+            elif url.path.startswith("/export/"):
+                self._serve_export(campaign, url.path[len("/export/"):])
+            else:
+                self._send_error(404, "not found")
+        except Exception as e:
+            logger.exception("Request failed: %s", self.path)
+            self._send_error(500, str(e))
+
+    def _not_modified(self, etag: str) -> bool:
+        if_none_match = self.headers.get("If-None-Match", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return True
+        return False
+
+    def _serve_metrics(self, campaign: str):
+        etag = self.server.etag(campaign, METRICS_PANELS)
+        if etag is None:
+            self._send_error(404, f"no snapshot has been published for {campaign} yet")
+            return
+        if self._not_modified(etag):
+            return
+        body = self.server.metrics_body(campaign, etag)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve_export(self, campaign: str, name: str):
+        table, _, fmt = name.partition(".")
+        if table not in EXPORT_TABLES or fmt not in available_formats():
+            self._send_error(404, f"exports are /export/<{'|'.join(EXPORT_TABLES)}>.<{'|'.join(available_formats())}>")
+            return
+        panel = EXPORT_TABLES[table][0]
+        etag = self.server.etag(campaign, (panel,))
+        if etag is None:
+            self._send_error(404, f"no {panel} snapshot has been published for {campaign} yet")
+            return
+        if self._not_modified(etag):
+            return
+
+        # Sent with chunked encoding as rows are serialized, so large tables are never built whole
+        self.send_response(200)
+        self.send_header("Content-Type", MIME_TYPES[fmt])
+        self.send_header("Content-Disposition", f'attachment; filename="{table}.{fmt}"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("ETag", etag)
+        self.end_headers()
+        for chunk in export_chunks(table, self.server.store.read(campaign, panel), fmt):
+            if chunk:
+                self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_error(self, status: int, message: str):
+        body = json.dumps({"error": message}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args):
+        logger.debug(format, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the latest dashboard snapshots as read-only JSON")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml", help="Path to a secrets.toml file")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8502, help="Port to listen on")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    config = Config.from_toml(args.secrets)
+    if not config.HISTORY_PATH:
+        parser.error("the endpoint reads the snapshot file: set snapshot_path (daemon) or warm_start_path")
+
+    server = MetricsServer((args.host, args.port), SnapshotStore(config.HISTORY_PATH), config.CAMPAIGNS[0]["name"])
+    logger.info("Serving metrics on http://%s:%d/metrics", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Product metadata cache, so order line items only carry a product ID
+
+Product type (the category) and vendor used to be selected on every line item of every order page, which
+re-downloaded the same few hundred products thousands of times per sync. ProductCatalog keeps them by numeric
+product ID. IDs it has not seen, or last fetched longer than its TTL ago, are fetched in batches with one
+`nodes(ids:)` query per PRODUCTS_BATCH_SIZE products.
+"""
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from async_fetch import gather_or_cancel
+from ingest import parse_gid
+
+# Shopify's limit on IDs per nodes query
+PRODUCTS_BATCH_SIZE = 250
+
+PRODUCT_CACHE_TTL = 6 * 3600
+
+PRODUCTS_QUERY = """
+query ($ids: [ID!]!) {
+  nodes(ids: $ids) {
+    ... on Product { id productType vendor }
+  }
+}
+"""
+
+
+class ProductCatalog:
+    """Product type and vendor by numeric product ID for one shop, refreshed after ttl seconds"""
+
+    def __init__(self, ttl: float = PRODUCT_CACHE_TTL):
+        self.ttl = ttl
+        # product ID -> (product type, vendor, when fetched)
+        self._products: Dict[Any, Tuple[Optional[str], Optional[str], float]] = {}
+        # Bumped when a known product's type or vendor changes, so aggregates built from the old ones are rebuilt
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def get(self, product_id: Any) -> Tuple[Optional[str], Optional[str]]:
+        """Get a product's type and vendor, (None, None) if it is unknown"""
+        product = self._products.get(product_id)
+        return (product[0], product[1]) if product is not None else (None, None)
+
+    def add(self, product_id: Any, product_type: Optional[str], vendor: Optional[str],
+            fetched_at: Optional[float] = None):
+        product_type, vendor = product_type or None, vendor or None
+        known = self._products.get(product_id)
+        if known is not None and (known[0], known[1]) != (product_type, vendor):
+            self.version += 1
+        self._products[product_id] = (product_type, vendor, time.time() if fetched_at is None else fetched_at)
+
+    def add_node(self, node: Dict[str, Any], fetched_at: Optional[float] = None):
+        """Add a Product node from a GraphQL response"""
+        self.add(parse_gid(node["id"]), node.get("productType"), node.get("vendor"), fetched_at)
+
+    def stale_ids(self, product_ids: Iterable[Any], now: Optional[float] = None) -> List[Any]:
+        """Get the IDs that are unknown or were fetched more than ttl seconds ago"""
+        now = time.time() if now is None else now
+        products = self._products
+        return [
+            product_id for product_id in product_ids
+            if product_id not in products or now - products[product_id][2] >= self.ttl
+        ]
+
+    async def refresh(self, client, product_ids: Iterable[Any]) -> int:
+        """Fetch the stale products among product_ids through a ShopifyGraphQLClient; returns how many"""
+        stale = self.stale_ids(product_ids)
+        batches = [stale[start:start + PRODUCTS_BATCH_SIZE] for start in range(0, len(stale), PRODUCTS_BATCH_SIZE)]
+        results = await gather_or_cancel(*(
+            client.execute(PRODUCTS_QUERY, {"ids": [f"gid://shopify/Product/{product_id}" for product_id in batch]},
+                           cost_key="products")
+            for batch in batches
+        ))
+        fetched_at = time.time()
+        for batch, data in zip(batches, results):
+            for product_id, node in zip(batch, data.get("nodes") or []):
+                if node:
+                    self.add_node(node, fetched_at)
+                else:
+                    # Deleted since the order was placed; remembered as unknown until the TTL passes
+                    self.add(product_id, None, None, fetched_at)
+        return len(stale)
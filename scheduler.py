@@ -0,0 +1,78 @@
+"""Adaptive refresh intervals from order velocity and the Shopify query-cost budget
+
+Each panel's configured interval is scaled by a tier picked from the shop's recent order velocity: shorter
+in a surge, longer in a lull, much longer once the sale has ended. The result is then stretched, if needed,
+so the scans' expected query cost per second (each scan synced as often as its most frequent panel, at
+the cost its last incremental sync took) stays within the configured budget.
+"""
+import math
+from typing import Dict, NamedTuple, Optional
+
+# Tier -> multiplier applied to the configured intervals
+REFRESH_TIERS = {"surge": 0.5, "normal": 1.0, "lull": 2.0, "ended": 10.0}
+
+MIN_INTERVAL = 10
+MAX_INTERVAL = 3600
+
+
+class RefreshPlan(NamedTuple):
+    tier: str
+    # Orders per minute over the recent window, or None before the first all-orders scan
+    velocity: Optional[float]
+    intervals: Dict[str, int]
+    # Expected query-cost points per second at these intervals
+    cost_rate: float
+    # Whether the cost budget lengthened the intervals beyond the tier's
+    budget_limited: bool
+
+
+class RefreshScheduler:
+    """Picks per-panel refresh intervals from the configured ones, order velocity and a query-cost budget"""
+
+    def __init__(self, base_intervals: Dict[str, int], panel_scans: Dict[str, str], surge_velocity: float,
+                 lull_velocity: float, cost_budget: float, adaptive: bool = True):
+        self.base_intervals = base_intervals
+        self.panel_scans = panel_scans
+        self.surge_velocity = surge_velocity
+        self.lull_velocity = lull_velocity
+        self.cost_budget = cost_budget
+        self.adaptive = adaptive
+
+    def tier(self, velocity: Optional[float], ended: bool) -> str:
+        if ended:
+            return "ended"
+        if velocity is None:
+            return "normal"
+        if velocity >= self.surge_velocity:
+            return "surge"
+        return "lull" if velocity < self.lull_velocity else "normal"
+
+    def cost_rate(self, intervals: Dict[str, int], scan_costs: Dict[str, float]) -> float:
+        """Get the expected query-cost points per second of syncing each scan as often as its panels need"""
+        scan_intervals: Dict[str, int] = {}
+        for panel, interval in intervals.items():
+            scan = self.panel_scans[panel]
+            scan_intervals[scan] = min(interval, scan_intervals.get(scan, interval))
+        return sum(scan_costs.get(scan, 0.0) / interval for scan, interval in scan_intervals.items())
+
+    def plan(self, velocity: Optional[float], ended: bool, scan_costs: Dict[str, float]) -> RefreshPlan:
+        """Get the intervals for the current velocity, sale status and per-sync scan costs"""
+        if not self.adaptive:
+            intervals = dict(self.base_intervals)
+            return RefreshPlan("fixed", velocity, intervals, self.cost_rate(intervals, scan_costs), False)
+
+        tier = self.tier(velocity, ended)
+        factor = REFRESH_TIERS[tier]
+        intervals = {panel: self._clamp(base * factor) for panel, base in self.base_intervals.items()}
+
+        rate = self.cost_rate(intervals, scan_costs)
+        budget_limited = self.cost_budget > 0 and rate > self.cost_budget
+        if budget_limited:
+            stretch = rate / self.cost_budget
+            intervals = {panel: self._clamp(interval * stretch) for panel, interval in intervals.items()}
+            rate = self.cost_rate(intervals, scan_costs)
+        return RefreshPlan(tier, velocity, intervals, rate, budget_limited)
+
+    @staticmethod
+    def _clamp(seconds: float) -> int:
+        return min(max(math.ceil(seconds), MIN_INTERVAL), MAX_INTERVAL)
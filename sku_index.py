@@ -0,0 +1,97 @@
+"""Search index over a campaign's SKUs for the category drill-down
+
+Built once per category panel refresh from category_info()["all_skus_by_category"]. Rows are kept in revenue
+order, so every query returns its matches best-first without sorting. SKU prefix search is a bisect over
+the sorted SKUs; substring search over SKU and title is str.find over one joined lowercase text, which runs
+in C. Filters and pagination then touch only the matching rows.
+"""
+import bisect
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+SEARCH_PAGE_SIZE = 25
+
+
+class SkuRow(NamedTuple):
+    sku: str
+    title: str
+    category: str
+    vendor: Optional[str]
+    quantity: int
+    revenue: float
+
+
+class SkuIndex:
+    """Revenue-ordered SKU rows with prefix, substring, category, vendor and minimum-revenue lookups"""
+
+    def __init__(self, rows: List[SkuRow]):
+        self.rows = sorted(rows, key=lambda row: row.revenue, reverse=True)
+        self.vendors = sorted({row.vendor for row in self.rows if row.vendor})
+
+        # One line per row ("sku\ttitle"), so a match's offset maps back to its row by bisecting line starts
+        lines = [f"{row.sku}\t{row.title}".lower().replace("\n", " ") for row in self.rows]
+        self._text = "\n".join(lines)
+        self._line_starts = []
+        offset = 0
+        for line in lines:
+            self._line_starts.append(offset)
+            offset += len(line) + 1
+
+        self._skus = sorted((row.sku.lower(), position) for position, row in enumerate(self.rows))
+
+    @classmethod
+    def from_category_info(cls, category_info: Dict[str, Any]) -> "SkuIndex":
+        """Build the index from a category panel result"""
+        return cls([
+            SkuRow(sku, totals["title"], category, totals.get("vendor"), totals["quantity"], totals["revenue"])
+            for category, skus in category_info.get("all_skus_by_category", {}).items()
+            for sku, totals in skus.items()
+        ])
+
+    def _prefix_positions(self, prefix: str) -> List[int]:
+        start = bisect.bisect_left(self._skus, (prefix,))
+        positions = []
+        for sku, position in self._skus[start:]:
+            if not sku.startswith(prefix):
+                break
+            positions.append(position)
+        return sorted(positions)
+
+    def _substring_positions(self, needle: str) -> List[int]:
+        positions = []
+        text = self._text
+        found = text.find(needle)
+        while found != -1:
+            position = bisect.bisect_right(self._line_starts, found) - 1
+            positions.append(position)
+            # Continue from the next line, so a row is reported once
+            next_start = self._line_starts[position + 1] if position + 1 < len(self._line_starts) else len(text)
+            found = text.find(needle, next_start)
+        return positions
+
+    def search(self, query: str = "", prefix: bool = False, category: Optional[str] = None,
+               vendor: Optional[str] = None, min_revenue: float = 0.0, page: int = 1,
+               page_size: int = SEARCH_PAGE_SIZE) -> Tuple[List[SkuRow], int]:
+        """Get one page of matching rows, highest revenue first, and the total number of matches
+
+        query matches the start of the SKU when prefix is set, otherwise anywhere in the SKU or title
+        (case-insensitive). An empty query matches every row.
+        """
+        query = query.strip().lower()
+        if not query:
+            positions = range(len(self.rows))
+        elif prefix:
+            positions = self._prefix_positions(query)
+        else:
+            positions = self._substring_positions(query)
+
+        matches = []
+        for position in positions:
+            row = self.rows[position]
+            if row.revenue < min_revenue:
+                # Rows are in revenue order, so nothing after this one qualifies either
+                break
+            if (category is None or row.category == category) and (vendor is None or row.vendor == vendor):
+                matches.append(row)
+
+        start = (max(page, 1) - 1) * page_size
+        return matches[start:start + page_size], len(matches)
@@ -0,0 +1,102 @@
+import datetime
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    campaign TEXT NOT NULL,
+    panel TEXT NOT NULL,
+    published_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (campaign, panel)
+);
+CREATE TABLE IF NOT EXISTS hourly_profiles (
+    campaign TEXT PRIMARY KEY,
+    start_at REAL NOT NULL,
+    end_at REAL NOT NULL,
+    hourly TEXT NOT NULL
+)
+"""
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if "__datetime__" in obj:
+        return datetime.datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class SnapshotStore:
+    """Latest panel results per campaign in a SQLite WAL file, written by the daemon and read by dashboards"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A connection per call keeps readers in separate processes and threads independent
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def publish(self, campaign: str, panel: str, result: Dict[str, Any]):
+        """Replace a panel's snapshot for a campaign"""
+        payload = json.dumps(result, default=_encode, separators=(",", ":"))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (campaign, panel, published_at, payload) VALUES (?, ?, ?, ?)",
+                (campaign, panel, time.time(), payload)
+            )
+
+    def read(self, campaign: str, panel: str) -> Optional[Dict[str, Any]]:
+        """Get a panel's latest snapshot for a campaign, or None if nothing has been published yet"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT published_at, payload FROM snapshots WHERE campaign = ? AND panel = ?",
+                (campaign, panel)
+            ).fetchone()
+        if row is None:
+            return None
+
+        result = json.loads(row[1], object_hook=_decode)
+        result["published_at"] = row[0]
+        return result
+
+    def published_at(self, campaign: str) -> Dict[str, float]:
+        """Get when each of a campaign's panels was last published, without reading the payloads"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT panel, published_at FROM snapshots WHERE campaign = ?", (campaign,)
+            ).fetchall()
+        return dict(rows)
+
+    def save_hourly_profile(self, campaign: str, start_dt: datetime.datetime, end_dt: datetime.datetime,
+                            hourly_revenue: List[float]):
+        """Replace a campaign's revenue by local hour of day, the seasonality input for later campaigns"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO hourly_profiles (campaign, start_at, end_at, hourly) VALUES (?, ?, ?, ?)",
+                (campaign, start_dt.timestamp(), end_dt.timestamp(), json.dumps(hourly_revenue))
+            )
+
+    def read_hourly_profiles(self, ended_before: datetime.datetime) -> List[List[float]]:
+        """Get the hourly revenue profiles of campaigns that ended before a moment"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT hourly FROM hourly_profiles WHERE end_at <= ?", (ended_before.timestamp(),)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
@@ -0,0 +1,275 @@
+"""Golden-dataset harness: replays the recorded fixture pages through every panel and measures each run
+
+The fixtures are recorded from the seeded synthetic orders in benchmarks/synthetic.py (with refunds, order
+edits, cancellations, deleted products and missing addresses mixed in), so they hold no shop data and can be
+regenerated exactly. Recording also stores each panel's result as the expected totals, and its wall time,
+peak traced allocation and pages read as its performance budget:
+
+    python tests/golden.py --record          regenerate fixtures, expected totals and budgets
+    python tests/golden.py --update-budgets  re-measure the budgets only, after an intended slowdown
+    python tests/golden.py                   compare each panel with its budget
+
+Only re-record after checking that a change in the expected totals is intended.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Tuple
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from config import Config
+from engine import PANEL_FETCHERS, DashboardEngine
+from ingest import ORDERS_PAGE_SIZE
+from products import PRODUCTS_BATCH_SIZE
+from replay import FIXTURES_DIR, ReplayShop
+
+ORDERS = 600
+SEED = 18
+
+EXPECTED_PATH = os.path.join(FIXTURES_DIR, "expected.json")
+BUDGETS_PATH = os.path.join(FIXTURES_DIR, "budgets.json")
+
+# How far a panel's wall time (after machine calibration) or peak allocation may exceed its budget before the
+# performance tests fail; pages read may never exceed it
+TIME_THRESHOLD = float(os.environ.get("GOLDEN_TIME_THRESHOLD", 1.0))
+ALLOCATION_THRESHOLD = float(os.environ.get("GOLDEN_ALLOCATION_THRESHOLD", 0.25))
+TIMING_RUNS = 7
+
+PANELS = tuple(PANEL_FETCHERS)
+CAMPAIGN = "Golden Sale"
+
+# The synthetic sale runs 2025-08-15 00:00-18:00 UTC
+SECRETS = {
+    "shopify": {"access_token": "golden", "shop_name": "golden-dataset", "api_version": "2024-10"},
+    "campaign": {"name": CAMPAIGN, "target_tags": ["SALE18"], "sale_start_date": "2025-08-15",
+                 "sale_start_time": "05:30", "sale_end_date": "2025-08-15", "sale_end_time": "23:30",
+                 "timezone": "Asia/Kolkata"},
+    "dashboard": {"main_refresh_interval": 30, "sku_refresh_interval": 600, "map_refresh_interval": 1800,
+                  "customer_refresh_interval": 300, "state_refresh_interval": 600}
+}
+
+# Top-level fields of the order streams' node selections (ingest.py)
+COUNTER_KEYS = ("id", "createdAt", "updatedAt", "cancelledAt", "tags", "currentSubtotalPriceSet",
+                "currentTotalDiscountsSet", "refunds", "customer")
+CAMPAIGN_KEYS = ("id", "createdAt", "updatedAt", "cancelledAt", "tags", "currentSubtotalPriceSet",
+                 "currentTotalDiscountsSet", "refunds", "name", "shippingAddress", "discountCodes",
+                 "customerJourneySummary", "lineItems")
+
+PAGE_COST = {"requestedQueryCost": 252, "actualQueryCost": 252,
+             "throttleStatus": {"maximumAvailable": 2000.0, "currentlyAvailable": 1748, "restoreRate": 100.0}}
+
+
+# ─── Recording ────────────────────────────────────────────────────────────────
+
+def golden_orders() -> Iterator[Dict[str, Any]]:
+    """Yield the synthetic orders with the edge cases the panels must handle"""
+    sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+    import synthetic
+
+    for index, order in enumerate(synthetic.iter_orders(ORDERS, SEED)):
+        if index % 23 == 5:
+            order = synthetic.remove_line(order, 0, refund=True)
+        if index % 29 == 3:
+            # Edited after it was placed: the last line item was taken off the order
+            order = synthetic.remove_line(order, len(order["lineItems"]["edges"]) - 1)
+        if index % 61 == 7:
+            order["cancelledAt"] = order["updatedAt"]
+        if index % 37 == 11:
+            order["lineItems"]["edges"][0]["node"]["product"] = None
+        if index % 53 == 13:
+            order["shippingAddress"] = None
+        if index % 71 == 17:
+            order["customer"] = None
+        yield order
+
+
+def _orders_pages(orders: List[Dict[str, Any]], keys: Tuple[str, ...]) -> List[bytes]:
+    pages = []
+    for start in range(0, len(orders), ORDERS_PAGE_SIZE):
+        chunk = orders[start:start + ORDERS_PAGE_SIZE]
+        # Cursors are page indexes, which is how the replay finds the next page
+        index = start // ORDERS_PAGE_SIZE + 1
+        has_next = start + ORDERS_PAGE_SIZE < len(orders)
+        pages.append(json.dumps({
+            "data": {"orders": {
+                "pageInfo": {"hasNextPage": has_next, "endCursor": str(index) if has_next else None},
+                "edges": [{"node": {key: order[key] for key in keys}} for order in chunk]
+            }},
+            "extensions": {"cost": PAGE_COST}
+        }, separators=(",", ":")).encode())
+    return pages
+
+
+def _products_pages(orders: List[Dict[str, Any]]) -> List[bytes]:
+    import synthetic
+
+    product_ids = sorted({
+        int(edge["node"]["product"]["id"].rsplit("/", 1)[1])
+        for order in orders for edge in order["lineItems"]["edges"] if edge["node"]["product"]
+    })
+    pages = []
+    for start in range(0, len(product_ids), PRODUCTS_BATCH_SIZE):
+        # Every 50th product has since been deleted, so nodes() returns null for it
+        nodes = [synthetic.product_node(product_id) if product_id % 50 != 49 else None
+                 for product_id in product_ids[start:start + PRODUCTS_BATCH_SIZE]]
+        pages.append(json.dumps({
+            "data": {"nodes": nodes},
+            "extensions": {"cost": {"requestedQueryCost": 11, "actualQueryCost": 11,
+                                    "throttleStatus": PAGE_COST["throttleStatus"]}}
+        }, separators=(",", ":")).encode())
+    return pages
+
+
+def record_fixtures(fixtures_dir: str = FIXTURES_DIR):
+    """Write the fixture pages and their manifest"""
+    orders = list(golden_orders())
+    tagged = [order for order in orders if "SALE18" in order["tags"]]
+    streams = {
+        "counters": _orders_pages(orders, COUNTER_KEYS),
+        "orders": _orders_pages(tagged, CAMPAIGN_KEYS),
+        "products": _products_pages(tagged)
+    }
+
+    manifest: Dict[str, Any] = {}
+    for stream, pages in streams.items():
+        manifest[stream] = []
+        for index, body in enumerate(pages, 1):
+            name = f"{stream}-{index:03d}.json"
+            with open(os.path.join(fixtures_dir, name), "wb") as f:
+                f.write(body)
+            manifest[stream].append(name)
+    # 3 of 5 checkouts in the last 30 minutes were abandoned
+    checkouts = [{"completed_at": None}] * 3 + [{"completed_at": "2025-08-15T17:50:00Z"}] * 2
+    with open(os.path.join(fixtures_dir, "checkouts.json"), "w") as f:
+        json.dump({"checkouts": checkouts}, f)
+    manifest["checkouts"] = "checkouts.json"
+    with open(os.path.join(fixtures_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+# ─── Replay ───────────────────────────────────────────────────────────────────
+
+def canonical(value: Any) -> Any:
+    """Convert a panel result to plain JSON values, rounding floats so summation order cannot flip them"""
+    if isinstance(value, float):
+        return round(value, 4)
+    if isinstance(value, dict):
+        return {str(key): canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def new_engine() -> DashboardEngine:
+    return DashboardEngine(Config(SECRETS))
+
+
+def replay_panel(panel: str, shop: ReplayShop) -> Dict[str, Any]:
+    """Fetch one panel on a fresh engine, so it syncs its scan from the first page"""
+    engine = new_engine()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        shop.install(monkeypatch)
+        return engine.fetch_panel(panel, CAMPAIGN, max_age=3600)
+
+
+def calibrate() -> float:
+    """Time a fixed workload, so budgets recorded on one machine scale to another"""
+    shop = ReplayShop()
+    best = float("inf")
+    for _ in range(TIMING_RUNS):
+        started = time.perf_counter()
+        totals: Dict[str, float] = {}
+        for body in shop.pages["orders"]:
+            for edge in json.loads(body)["data"]["orders"]["edges"]:
+                for item in edge["node"]["lineItems"]["edges"]:
+                    sku = item["node"]["sku"]
+                    price = float(item["node"]["originalUnitPriceSet"]["shopMoney"]["amount"])
+                    totals[sku] = totals.get(sku, 0.0) + price * item["node"]["currentQuantity"]
+        sorted(totals.items(), key=lambda item: item[1])
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def measure_panel(panel: str) -> Dict[str, Any]:
+    """Get a panel's best wall time, peak traced allocation and pages read per stream"""
+    # Warm up first, so one-off costs such as loading the geocoding index are not counted
+    replay_panel(panel, ReplayShop())
+    seconds = float("inf")
+    for _ in range(TIMING_RUNS):
+        shop = ReplayShop()
+        engine = new_engine()
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            shop.install(monkeypatch)
+            started = time.perf_counter()
+            engine.fetch_panel(panel, CAMPAIGN, max_age=3600)
+            seconds = min(seconds, time.perf_counter() - started)
+
+    shop = ReplayShop()
+    engine = new_engine()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        shop.install(monkeypatch)
+        tracemalloc.start()
+        try:
+            engine.fetch_panel(panel, CAMPAIGN, max_age=3600)
+            allocated = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {"seconds": seconds, "allocated_bytes": allocated, "pages": dict(shop.served)}
+
+
+def load_json(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def record_expected():
+    expected = {panel: canonical(replay_panel(panel, ReplayShop())) for panel in PANELS}
+    with open(EXPECTED_PATH, "w") as f:
+        json.dump(expected, f, indent=1, ensure_ascii=False, sort_keys=True)
+
+
+def record_budgets():
+    budgets = {
+        "calibration_seconds": calibrate(),
+        "python": sys.version.split()[0],
+        "panels": {panel: measure_panel(panel) for panel in PANELS}
+    }
+    with open(BUDGETS_PATH, "w") as f:
+        json.dump(budgets, f, indent=2, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or check the golden-dataset fixtures and budgets")
+    parser.add_argument("--record", action="store_true", help="Regenerate fixtures, expected totals and budgets")
+    parser.add_argument("--update-budgets", action="store_true", help="Re-measure the performance budgets only")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures()
+        record_expected()
+    if args.record or args.update_budgets:
+        record_budgets()
+        return
+
+    budgets = load_json(BUDGETS_PATH)
+    scale = calibrate() / budgets["calibration_seconds"]
+    print(f"{'panel':<13}{'ms':>9}{'budget':>9}{'KB':>9}{'budget':>9}  pages")
+    for panel in PANELS:
+        measured, budget = measure_panel(panel), budgets["panels"][panel]
+        print(f"{panel:<13}{measured['seconds'] * 1000:>9.1f}{budget['seconds'] * scale * 1000:>9.1f}"
+              f"{measured['allocated_bytes'] / 1024:>9.0f}{budget['allocated_bytes'] / 1024:>9.0f}  {measured['pages']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Replay recorded Shopify responses in place of the network
+
+Fixture pages are raw GraphQL response bodies, listed per stream in fixtures/manifest.json:
+
+    counters    the all-orders stream (COUNTER_ORDER_FIELDS), one body per page in cursor order
+    orders      the tagged-orders stream (CAMPAIGN_ORDER_FIELDS), one body per page in cursor order
+    products    nodes(ids:) responses for the product cache, answered by product ID
+    checkouts   the REST checkouts response behind the abandoned-cart count
+
+ReplayShop patches requests.post and requests.get, so DashboardEngine runs its real client, parser and
+aggregators against them. It counts the pages served per stream and keeps any request it could not answer.
+Incremental syncs (updated_at:> filters) are answered from ReplayShop.updates, which tests fill in.
+"""
+import collections
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import requests
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+STREAMS = ("counters", "orders", "products")
+
+
+def query_stream(query: str) -> str:
+    """Get the stream a GraphQL query belongs to"""
+    if "nodes(ids" in query:
+        return "products"
+    # Only the tagged-orders stream selects line items (CAMPAIGN_ORDER_FIELDS); its re-syncs drop the tag filter
+    return "orders" if "lineItems" in query else "counters"
+
+
+def _response(body: bytes, status: int = 200) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body
+    resp.headers["Content-Type"] = "application/json"
+    return resp
+
+
+class ReplayShop:
+    """Answers the engine's Shopify requests from recorded fixture pages"""
+
+    def __init__(self, fixtures_dir: str = FIXTURES_DIR):
+        with open(os.path.join(fixtures_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+        self.pages: Dict[str, List[bytes]] = {}
+        for stream in STREAMS:
+            self.pages[stream] = []
+            for name in manifest[stream]:
+                with open(os.path.join(fixtures_dir, name), "rb") as f:
+                    self.pages[stream].append(f.read())
+        with open(os.path.join(fixtures_dir, manifest["checkouts"]), "rb") as f:
+            self.checkouts = f.read()
+
+        self.products: Dict[str, Dict[str, Any]] = {}
+        self._products_extensions: Optional[Dict[str, Any]] = None
+        for body in self.pages["products"]:
+            page = json.loads(body)
+            self._products_extensions = page.get("extensions")
+            for node in page["data"]["nodes"]:
+                if node:
+                    self.products[node["id"]] = node
+
+        # Stream -> order nodes changed since the recording, served as one page to its next incremental sync
+        self.updates: Dict[str, List[Dict[str, Any]]] = {}
+        # Pages served per stream, and requests no fixture answers
+        self.served: collections.Counter = collections.Counter()
+        self.unexpected: List[str] = []
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        query, variables = kwargs["json"]["query"], kwargs["json"].get("variables") or {}
+        stream = query_stream(query)
+        if stream == "products":
+            self.served[stream] += 1
+            nodes = [self.products.get(gid) for gid in variables["ids"]]
+            return _response(json.dumps(
+                {"data": {"nodes": nodes}, "extensions": self._products_extensions}
+            ).encode())
+
+        if "updated_at:>" in query and stream in self.updates:
+            self.served[stream] += 1
+            # Like Shopify's search, a tag filter leaves out orders no longer carrying any of its tags
+            tags = set(re.findall(r"\btag:([^\s)]+)", query))
+            edges = [{"node": node} for node in self.updates.pop(stream) if not tags or tags & set(node["tags"])]
+            return _response(json.dumps({
+                "data": {"orders": {"pageInfo": {"hasNextPage": False, "endCursor": None}, "edges": edges}},
+                "extensions": json.loads(self.pages[stream][0]).get("extensions")
+            }).encode())
+
+        # Recorded pages end their cursors at their own index; other incremental filters have no recording
+        page_index = int(variables.get("cursor") or 0)
+        if "updated_at:>" in query or page_index >= len(self.pages[stream]):
+            self.unexpected.append(f"{stream} page {page_index}: {query.strip()[:200]}")
+            return _response(b'{"errors": [{"message": "no recorded page"}]}', 404)
+        self.served[stream] += 1
+        return _response(self.pages[stream][page_index])
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        if url.endswith("/checkouts.json"):
+            self.served["checkouts"] += 1
+            return _response(self.checkouts)
+        self.unexpected.append(f"GET {url}")
+        return _response(b"{}", 404)
+
+    def install(self, monkeypatch):
+        """Route requests through the recordings until monkeypatch (a pytest fixture or context) is undone"""
+        monkeypatch.setattr(requests, "post", self.post)
+        monkeypatch.setattr(requests, "get", self.get)
@@ -0,0 +1,90 @@
+"""Velocity and sync-error detectors over seeded minute rollups"""
+import datetime
+import random
+from typing import List, Tuple
+
+from aggregation import MinuteRollup
+from alerts import STREAK_MINUTES, ErrorRateDetector, SalesAnomalyDetector
+
+START = datetime.datetime(2025, 8, 15, tzinfo=datetime.timezone.utc)
+MINUTE = datetime.timedelta(minutes=1)
+
+
+def steady(minutes: int, rate: int = 10, seed: int = 18) -> List[Tuple[int, int]]:
+    """(tagged, all) orders per minute within a few orders of a steady rate, with most orders tagged"""
+    rng = random.Random(seed)
+    counts = []
+    for _ in range(minutes):
+        tagged = rng.randint(rate - 3, rate + 3)
+        counts.append((tagged, tagged + rng.randint(0, 3)))
+    return counts
+
+
+def detect(counts: List[Tuple[int, int]]) -> List[dict]:
+    """Fill a rollup minute by minute, evaluating after each like the counters scan does"""
+    rng = random.Random(7)
+    minutes = MinuteRollup(START, START + datetime.timedelta(hours=3))
+    detector = SalesAnomalyDetector("Golden Sale")
+    alerts = []
+    for minute, (tagged, all_orders) in enumerate(counts):
+        at = START + minute * MINUTE
+        for order in range(all_orders):
+            minutes.add(at, rng.uniform(800, 1200), tagged=order < tagged)
+        alerts += detector.evaluate(minutes, at + 2 * MINUTE)
+    return alerts
+
+
+def kinds(alerts: List[dict]) -> List[str]:
+    return [alert["kind"] for alert in alerts]
+
+
+def test_steady_sales_raise_nothing():
+    assert detect(steady(90)) == []
+
+
+def test_drop_is_reported_once():
+    counts = steady(40) + [(1, 4)] * 3
+    assert kinds(detect(counts)) == ["velocity_drop"]
+
+
+def test_spike_is_reported():
+    counts = steady(40) + [(45, 48)]
+    assert kinds(detect(counts)) == ["velocity_spike"]
+
+
+def test_checkout_outage_after_a_quiet_streak():
+    counts = steady(40) + [(0, 0)] * (STREAK_MINUTES + 2)
+    alerts = detect(counts)
+    assert "checkout_outage" in kinds(alerts)
+    assert kinds(alerts).count("checkout_outage") == 1
+
+
+def test_stalled_tag_when_only_untagged_orders_arrive():
+    counts = steady(40) + [(0, 9)] * STREAK_MINUTES
+    assert kinds(detect(counts))[-1] == "tag_stalled"
+
+
+def test_no_alerts_while_the_baseline_warms_up():
+    assert detect(steady(5) + [(0, 0)] * (STREAK_MINUTES + 1)) == []
+
+
+def test_consecutive_sync_failures():
+    detector = ErrorRateDetector(failure_streak=3)
+    now = START
+    alerts = []
+    for attempt in range(4):
+        alerts += detector.record("orders", "HTTP 502", now + attempt * MINUTE / 4)
+    assert kinds(alerts) == ["sync_failing"]
+    assert detector.record("orders", None, now + MINUTE) == []
+
+
+def test_error_spike_against_a_quiet_baseline():
+    detector = ErrorRateDetector(failure_streak=100)
+    alerts = []
+    for minute in range(20):
+        alerts += detector.record("counters", None, START + minute * MINUTE)
+    for second in range(6):
+        alerts += detector.record("counters", "timeout", START + 20 * MINUTE + datetime.timedelta(seconds=second))
+    alerts += detector.record("counters", None, START + 21 * MINUTE)
+    assert kinds(alerts) == ["error_spike"]
+    assert alerts[0]["value"] == 6
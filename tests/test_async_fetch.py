@@ -0,0 +1,36 @@
+"""A failing shop must not leave its siblings' syncs running after the scan has failed"""
+import asyncio
+
+import pytest
+
+from async_fetch import gather_or_cancel
+
+
+def test_failure_cancels_and_awaits_siblings():
+    stopped = []
+
+    async def slow_shop():
+        try:
+            await asyncio.sleep(10)
+        finally:
+            stopped.append("slow")
+
+    async def failing_shop():
+        await asyncio.sleep(0)
+        raise ValueError("shop unreachable")
+
+    async def scan():
+        with pytest.raises(ValueError, match="shop unreachable"):
+            await gather_or_cancel(slow_shop(), failing_shop())
+        # Stopped before the error reached the caller, not at some later point on the loop
+        return list(stopped), [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(scan()) == (["slow"], [])
+
+
+def test_results_keep_their_order():
+    async def value(number, delay):
+        await asyncio.sleep(delay)
+        return number
+
+    assert asyncio.run(gather_or_cancel(value(1, 0.01), value(2, 0))) == [1, 2]
@@ -0,0 +1,45 @@
+"""Every panel replayed over the golden dataset must reproduce the recorded totals exactly"""
+import pytest
+
+from golden import EXPECTED_PATH, PANELS, canonical, load_json, replay_panel
+from replay import ReplayShop
+
+EXPECTED = load_json(EXPECTED_PATH)
+
+
+@pytest.fixture(scope="module")
+def results():
+    return {panel: replay_panel(panel, ReplayShop()) for panel in PANELS}
+
+
+@pytest.mark.parametrize("panel", PANELS)
+def test_panel_matches_golden_totals(panel):
+    shop = ReplayShop()
+    result = replay_panel(panel, shop)
+    assert result["success"], result["error"]
+    assert shop.unexpected == []
+    assert canonical(result) == EXPECTED[panel]
+
+
+def test_order_panels_add_up_to_the_counters(results):
+    # Line items carry their share of the order's net, so category and attribution totals equal tagged sales
+    tag_sales = results["main"]["tag_sales"]
+    assert results["category"]["category_info"]["total_revenue"] == pytest.approx(tag_sales)
+    assert results["category"]["category_rankings"]["total_revenue"] == pytest.approx(tag_sales)
+    assert results["attribution"]["attribution"]["revenue"] == pytest.approx(tag_sales)
+    assert results["attribution"]["attribution"]["orders"] == results["main"]["tag_orders"]
+
+
+def test_customer_segments_cover_every_order(results):
+    segments = results["customer"]["customer_segmentation"]
+    assert segments["new_customers"] + segments["returning_customers"] == segments["total_customers"]
+    assert segments["new_customer_orders"] + segments["returning_customer_orders"] <= results["main"]["total_orders"]
+
+
+def test_replay_reads_every_recorded_page_once():
+    shop = ReplayShop()
+    for panel in ("main", "sku"):
+        replay_panel(panel, shop)
+    assert shop.served["counters"] == len(shop.pages["counters"])
+    assert shop.served["orders"] == len(shop.pages["orders"])
+    assert shop.served["products"] == len(shop.pages["products"])
@@ -0,0 +1,212 @@
+"""Counters and aggregates kept current from a ledger's changes must match ones rebuilt from the whole ledger"""
+import datetime
+import os
+import sys
+
+import pytest
+
+from aggregation import CampaignAggregates, CampaignCounters, MinuteRollup
+from campaigns import Campaign
+from engine import ShopResults
+from forecast import RunRateForecaster
+from golden import REPO_ROOT, canonical, golden_orders
+from ledger import OrderLedger
+from products import ProductCatalog
+
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+import synthetic
+
+START = datetime.datetime(2025, 8, 15, tzinfo=datetime.timezone.utc)
+CAMPAIGN = Campaign("Golden Sale", ["SALE18"], START, START + datetime.timedelta(hours=18))
+
+
+def new_counters() -> CampaignCounters:
+    return CampaignCounters(forecaster=RunRateForecaster(CAMPAIGN.start_dt, CAMPAIGN.end_dt),
+                            minutes=MinuteRollup(CAMPAIGN.start_dt, CAMPAIGN.end_dt))
+
+
+def apply_changes(ledger: OrderLedger, counters: CampaignCounters):
+    for previous, entry in ledger.changes():
+        if previous is not None and CAMPAIGN.in_window(previous.created_at):
+            counters.remove_entry(previous, CAMPAIGN.is_tagged(previous.tags))
+        if CAMPAIGN.in_window(entry.created_at):
+            counters.add_entry(entry, CAMPAIGN.is_tagged(entry.tags))
+
+
+def apply_aggregate_changes(ledger: OrderLedger, aggregates: CampaignAggregates):
+    for previous, entry in ledger.changes():
+        if previous is not None and CAMPAIGN.in_window(previous.created_at) and CAMPAIGN.is_tagged(previous.tags):
+            aggregates.remove_entry(previous)
+        if CAMPAIGN.in_window(entry.created_at) and CAMPAIGN.is_tagged(entry.tags):
+            aggregates.add_entry(entry)
+
+
+def edited_orders(orders):
+    """Yield later versions of some orders: refunds, removed items, cancellations, removed tags, and repeated edits"""
+    for index, order in enumerate(orders):
+        if index % 5 == 0:
+            order = synthetic.remove_line(order, 0, refund=True)
+            yield order
+        if index % 7 == 0:
+            yield synthetic.remove_line(order, len(order["lineItems"]["edges"]) - 1)
+        if index % 9 == 0:
+            yield dict(order, cancelledAt=order["createdAt"])
+        if index % 13 == 0:
+            yield dict(order, tags=["web"])
+
+
+def assert_same_counters(incremental: CampaignCounters, rebuilt: CampaignCounters):
+    assert incremental.total_orders == rebuilt.total_orders
+    assert incremental.tag_orders == rebuilt.tag_orders
+    assert incremental.total_sales == pytest.approx(rebuilt.total_sales)
+    assert incremental.tag_sales == pytest.approx(rebuilt.tag_sales)
+    assert incremental.unique_customers == rebuilt.unique_customers
+    assert incremental.customer_segmentation() == rebuilt.customer_segmentation()
+    assert incremental.minutes.orders == rebuilt.minutes.orders
+    assert incremental.minutes.all_orders == rebuilt.minutes.all_orders
+    assert incremental.minutes.revenue == pytest.approx(rebuilt.minutes.revenue, abs=1e-6)
+    assert incremental.forecaster.orders == rebuilt.forecaster.orders
+    assert incremental.forecaster.hourly_revenue == pytest.approx(rebuilt.forecaster.hourly_revenue, abs=1e-6)
+    now = CAMPAIGN.start_dt + datetime.timedelta(hours=17)
+    assert incremental.forecaster.run_rate(now) == pytest.approx(rebuilt.forecaster.run_rate(now))
+
+
+def test_counters_follow_ledger_changes():
+    orders = list(golden_orders())
+    ledger = OrderLedger()
+    incremental = new_counters()
+
+    # A first sync in two batches, then two rounds of edits to orders already counted
+    for batch in (orders[:300], orders[300:], list(edited_orders(orders)), list(edited_orders(orders[::2]))):
+        for order in batch:
+            ledger.apply(order)
+        apply_changes(ledger, incremental)
+
+    rebuilt = new_counters()
+    for entry in ledger.entries():
+        if CAMPAIGN.in_window(entry.created_at):
+            rebuilt.add_entry(entry, CAMPAIGN.is_tagged(entry.tags))
+    assert_same_counters(incremental, rebuilt)
+
+
+def test_changes_are_reported_once():
+    ledger = OrderLedger()
+    orders = list(golden_orders())[:10]
+    for order in orders:
+        ledger.apply(order)
+    assert [previous for previous, _ in ledger.changes()] == [None] * 10
+    assert list(ledger.changes()) == []
+
+    # An order edited twice between calls reports the entry it replaced first, which is the one counted
+    counted = next(ledger.entries())
+    ledger.apply(dict(orders[0], cancelledAt=orders[0]["createdAt"]))
+    ledger.apply(dict(orders[0], tags=["web"]))
+    [(previous, entry)] = ledger.changes()
+    assert previous is counted
+    assert entry.tags == ("web",)
+
+
+def golden_catalog(orders) -> ProductCatalog:
+    products = ProductCatalog()
+    for order in orders:
+        for edge in order["lineItems"]["edges"]:
+            if edge["node"]["product"]:
+                products.add_node(synthetic.product_node(int(edge["node"]["product"]["id"].rsplit("/", 1)[1])))
+    return products
+
+
+def test_aggregates_follow_ledger_changes():
+    orders = list(golden_orders())
+    products = golden_catalog(orders)
+    ledger = OrderLedger()
+    incremental = CampaignAggregates(products=products)
+
+    for batch in (orders[:300], orders[300:], list(edited_orders(orders)), list(edited_orders(orders[::2]))):
+        for order in batch:
+            ledger.apply(order)
+        apply_aggregate_changes(ledger, incremental)
+
+    rebuilt = CampaignAggregates(products=products)
+    for entry in ledger.entries():
+        if CAMPAIGN.in_window(entry.created_at) and CAMPAIGN.is_tagged(entry.tags):
+            rebuilt.add_entry(entry)
+
+    assert incremental.orders == rebuilt.orders
+    assert incremental.revenue == pytest.approx(rebuilt.revenue)
+    assert incremental.line_revenue == pytest.approx(rebuilt.line_revenue)
+    # Equal revenues rank in the order their keys were first seen, so compare every key by name
+    skus = len(rebuilt.skus)
+    assert sorted(canonical(incremental.top_skus(skus))) == sorted(canonical(rebuilt.top_skus(skus)))
+    assert sorted(incremental.categories) == sorted(rebuilt.categories)
+    assert canonical(incremental.category_rankings()) == canonical(rebuilt.category_rankings())
+    # Bins come out in the order they were first occupied, which the map does not depend on
+    geographic = [canonical(aggregates.geographic_data()) for aggregates in (incremental, rebuilt)]
+    for data in geographic:
+        data["map_bins"].sort(key=lambda cell: (cell["lat"], cell["lon"]))
+    assert geographic[0] == geographic[1]
+    attribution = [canonical(aggregates.attribution_data(limit=1000)) for aggregates in (incremental, rebuilt)]
+    for data in attribution:
+        data["discount_codes"].sort()
+        data["sources"].sort()
+    assert attribution[0] == attribution[1]
+
+
+def test_edited_order_shrinks():
+    order = next(order for order in golden_orders() if len(order["lineItems"]["edges"]) > 1)
+    products = golden_catalog([order])
+    ledger = OrderLedger()
+    aggregates = CampaignAggregates(products=products)
+    ledger.apply(order)
+    apply_aggregate_changes(ledger, aggregates)
+    placed = next(ledger.entries())
+    sku, _, quantity = placed.line_items[-1][:3]
+    sku_quantity = aggregates.skus[sku][0]
+
+    # The merchant takes the last line item off the order
+    ledger.apply(synthetic.remove_line(order, len(order["lineItems"]["edges"]) - 1))
+    apply_aggregate_changes(ledger, aggregates)
+    edited = next(ledger.entries())
+    assert len(edited.line_items) == len(placed.line_items) - 1
+    assert edited.net < placed.net
+    assert edited.gross < placed.gross
+    assert edited.refunds == 0
+    assert aggregates.revenue == pytest.approx(edited.net)
+    assert aggregates.skus.get(sku, [0])[0] == sku_quantity - quantity
+
+    # Refunding a line keeps it in gross, but not in net or the SKU totals
+    ledger.apply(synthetic.remove_line(order, 0, refund=True))
+    refunded = next(ledger.entries())
+    assert refunded.refunds > 0
+    assert refunded.net == pytest.approx(placed.net - refunded.refunds, abs=0.01)
+    assert refunded.gross == pytest.approx(refunded.net + refunded.discounts + refunded.refunds)
+    assert len(refunded.line_items) == len(placed.line_items) - 1
+
+
+def test_published_results_stay_put_until_the_next_scan_but_one():
+    orders = list(golden_orders())
+    ledger = OrderLedger()
+    results = ShopResults()
+
+    def apply(counters, previous, entry):
+        if previous is not None and CAMPAIGN.in_window(previous.created_at):
+            counters[CAMPAIGN.name].remove_entry(previous, CAMPAIGN.is_tagged(previous.tags))
+        if CAMPAIGN.in_window(entry.created_at):
+            counters[CAMPAIGN.name].add_entry(entry, CAMPAIGN.is_tagged(entry.tags))
+
+    published = []
+    for batch in (orders[:200], orders[200:400], orders[400:], list(edited_orders(orders)),
+                  list(edited_orders(orders[::2]))):
+        for order in batch:
+            ledger.apply(order)
+        counters = results.update(ledger, lambda: {CAMPAIGN.name: new_counters()}, apply)[CAMPAIGN.name]
+        if published:
+            # The last scan's copy is left alone while this one is updated
+            assert counters is not published[-1][0]
+            assert published[-1][0].total_orders == published[-1][1]
+        published.append((counters, counters.total_orders))
+
+        rebuilt = new_counters()
+        for entry in ledger.entries():
+            if CAMPAIGN.in_window(entry.created_at):
+                rebuilt.add_entry(entry, CAMPAIGN.is_tagged(entry.tags))
+        assert_same_counters(counters, rebuilt)
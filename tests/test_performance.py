@@ -0,0 +1,35 @@
+"""Each panel's wall time, peak allocation and pages read must stay within its recorded budget
+
+Budgets are in fixtures/budgets.json. Wall times are scaled by a calibration workload timed on the recording
+machine and on this one. After an intended slowdown, re-measure with `python tests/golden.py --update-budgets`.
+"""
+import pytest
+
+from golden import (ALLOCATION_THRESHOLD, BUDGETS_PATH, PANELS, TIME_THRESHOLD, calibrate, load_json,
+                    measure_panel)
+
+BUDGETS = load_json(BUDGETS_PATH)
+
+
+@pytest.fixture(scope="module")
+def machine_scale():
+    return calibrate() / BUDGETS["calibration_seconds"]
+
+
+@pytest.mark.parametrize("panel", PANELS)
+def test_panel_within_budget(panel, machine_scale):
+    budget = BUDGETS["panels"][panel]
+    measured = measure_panel(panel)
+
+    for stream, pages in measured["pages"].items():
+        assert pages <= budget["pages"].get(stream, 0), f"{panel} read more {stream} pages than its budget"
+
+    allowed_bytes = budget["allocated_bytes"] * (1 + ALLOCATION_THRESHOLD)
+    assert measured["allocated_bytes"] <= allowed_bytes, (
+        f"{panel} allocated {measured['allocated_bytes']:,} bytes, budget {budget['allocated_bytes']:,}"
+    )
+
+    allowed_seconds = budget["seconds"] * machine_scale * (1 + TIME_THRESHOLD)
+    assert measured["seconds"] <= allowed_seconds, (
+        f"{panel} took {measured['seconds'] * 1000:.1f}ms, budget {budget['seconds'] * machine_scale * 1000:.1f}ms"
+    )
@@ -0,0 +1,29 @@
+"""Incremental re-syncs through the engine must follow orders that left a campaign"""
+import pytest
+
+from golden import CAMPAIGN, CAMPAIGN_KEYS, COUNTER_KEYS, golden_orders, new_engine
+from replay import ReplayShop
+
+
+def test_removed_tag_leaves_every_panel():
+    shop = ReplayShop()
+    engine = new_engine()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        shop.install(monkeypatch)
+        main = engine.fetch_panel("main", CAMPAIGN, max_age=3600)
+        attribution = engine.fetch_panel("attribution", CAMPAIGN, max_age=3600)["attribution"]
+        assert attribution["orders"] == main["tag_orders"]
+
+        # The merchant takes the campaign tag off an order after both streams synced it
+        order = next(order for order in golden_orders() if "SALE18" in order["tags"] and not order["cancelledAt"])
+        untagged = dict(order, tags=["web"], updatedAt="2025-08-15T19:00:00Z")
+        shop.updates = {"counters": [{key: untagged[key] for key in COUNTER_KEYS}],
+                        "orders": [{key: untagged[key] for key in CAMPAIGN_KEYS}]}
+        main_after = engine.fetch_panel("main", CAMPAIGN, max_age=0)
+        attribution_after = engine.fetch_panel("attribution", CAMPAIGN, max_age=0)["attribution"]
+
+    assert shop.unexpected == []
+    assert shop.updates == {}
+    assert main_after["tag_orders"] == main["tag_orders"] - 1
+    assert attribution_after["orders"] == main_after["tag_orders"]
+    assert attribution_after["revenue"] == pytest.approx(main_after["tag_sales"])
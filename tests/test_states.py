@@ -0,0 +1,35 @@
+"""State normalization: Indian aliases resolve to one state, other countries keep their own provinces"""
+import pytest
+
+from aggregation import StateTotals
+from utils import STATE_NAMES, get_state_id
+
+
+@pytest.mark.parametrize("province, code, country, expected", [
+    ("NCT of Delhi", None, "IN", "Delhi"),
+    ("Orissa", "OR", "IN", "Odisha"),
+    ("Tamil Nadu", "IN-TN", None, "Tamil Nadu"),
+    ("Goa", "GA", None, "Goa"),
+])
+def test_indian_addresses_resolve(province, code, country, expected):
+    assert STATE_NAMES[get_state_id(province, code, country)] == expected
+
+
+@pytest.mark.parametrize("province, code", [
+    ("Tennessee", "TN"), ("Oregon", "OR"), ("Georgia", "GA"), ("Connecticut", "CT"), ("Utah", "UT"),
+    ("Punjab", "PB"),
+])
+def test_other_countries_do_not_resolve(province, code):
+    assert get_state_id(province, code, "US") is None
+
+
+def test_other_countries_group_by_province():
+    states = StateTotals()
+    tennessee = states.state_id("Tennessee", "TN", "US")
+    states.add(tennessee, 100.0, 1)
+    states.add(states.state_id("Tamil Nadu", "TN", "IN"), 50.0, 1)
+    assert states.state_id("Tennessee", "TN", "US") == tennessee
+
+    merged = StateTotals()
+    merged.merge(states)
+    assert merged.revenue_by_state() == {"Tennessee": 100.0, "Tamil Nadu": 50.0}
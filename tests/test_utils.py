@@ -0,0 +1,39 @@
+"""Currency formatting: the vectorized column formatter must agree with the scalar one"""
+import random
+
+import pandas as pd
+import pytest
+
+from utils import format_indian_currency, format_indian_currency_compact, format_indian_currency_series
+
+EDGE_AMOUNTS = [0.0, 0.004, 0.005, -0.005, 2.675, -2.675, 1.005, 999.995, 99_999.99, 99_999.995, 1_234_567.895,
+                9_999_999.99, 9_999_999.995, 123_456_789_012.345, -42_00_000.5]
+
+
+def test_series_matches_scalar_formatting():
+    rng = random.Random(18)
+    amounts = EDGE_AMOUNTS + [round(rng.uniform(-1e8, 1e8), rng.choice([2, 3])) for _ in range(2000)]
+    formatted = format_indian_currency_series(pd.Series(amounts))
+    assert list(formatted) == [format_indian_currency(amount) for amount in amounts]
+
+
+@pytest.mark.parametrize("amount, expected", [
+    (2.675, "₹2.68"),
+    (0.005, "₹0.01"),
+    (-0.004, "₹0.00"),
+    (12_34_567.8, "₹12,34,567.80"),
+])
+def test_rounds_half_up_to_paise(amount, expected):
+    assert format_indian_currency(amount) == expected
+
+
+@pytest.mark.parametrize("amount, expected", [
+    (9_999_999.99, "₹1.0 Cr"),
+    (9_949_999.0, "₹99.5 L"),
+    (99_999.995, "₹1.0 L"),
+    (99_999.99, "₹99,999.99"),
+    (-9_999_999.99, "₹-1.0 Cr"),
+    (1.5e8, "₹15.0 Cr"),
+])
+def test_compact_picks_unit_after_rounding(amount, expected):
+    assert format_indian_currency_compact(amount) == expected
@@ -1,25 +1,62 @@
+from typing import Optional
+
+import pandas as pd
+
+CRORE = 10_000_000
+LAKH = 100_000
+
+
+def _paise(amount):
+    # Half-up rounding to paise shared by the scalar and series formatters (a float or a Series), so a table and
+    # a metric card always show the same amount
+    return (amount * 100 + 0.5) // 1
+
+
 def format_indian_currency(amount: float) -> str:
     """Format currency in Indian numbering system (Lakhs/Crores)"""
     if amount == 0:
         return "₹0"
     
-    # Convert to string and split at decimal
-    amount_str = f"{amount:.2f}"
-    integer_part, decimal_part = amount_str.split('.')
+    rupees, paise = divmod(int(_paise(abs(amount))), 100)
+    sign = "-" if amount < 0 and (rupees or paise) else ""
+    integer_part = str(rupees)
+    
+    # Last 3 digits form the first group, then every 2 digits
+    head, tail = integer_part[:-3], integer_part[-3:]
+    groups = [head[max(i - 2, 0):i] for i in range(len(head), 0, -2)]
+    formatted = ",".join(groups[::-1] + [tail])
     
-    # Reverse the integer part for easier processing
-    reversed_int = integer_part[::-1]
+    return f"₹{sign}{formatted}.{paise:02d}"
+
+def format_indian_currency_series(amounts: pd.Series) -> pd.Series:
+    """Format a whole column in Indian numbering system, one vectorized pass per digit group"""
+    amounts = amounts.astype(float).fillna(0.0)
+    paise = _paise(amounts.abs()).astype("int64")
+    rupees = paise // 100
+    decimals = (paise % 100).astype(str).str.zfill(2)
     
-    # Add commas - first comma after 3 digits, then every 2 digits
-    formatted = ""
-    for i, digit in enumerate(reversed_int):
-        if i == 3:  # First comma after 3 digits
-            formatted = "," + formatted
-        elif i > 3 and (i - 3) % 2 == 0:  # Then every 2 digits
-            formatted = "," + formatted
-        formatted = digit + formatted
+    # Last 3 digits form the first group, then prepend 2-digit groups while any row has digits left
+    formatted = (rupees % 1000).astype(str)
+    rest = rupees // 1000
+    formatted = formatted.where(rest == 0, formatted.str.zfill(3))
+    while (rest > 0).any():
+        next_rest = rest // 100
+        group = (rest % 100).astype(str)
+        group = group.where(next_rest == 0, group.str.zfill(2))
+        formatted = (group + "," + formatted).where(rest > 0, formatted)
+        rest = next_rest
     
-    return f"₹{formatted}.{decimal_part}"
+    sign = pd.Series("", index=amounts.index).where((amounts >= 0) | (paise == 0), "-")
+    return ("₹" + sign + formatted + "." + decimals).where(amounts != 0, "₹0")
+
+def format_indian_currency_compact(amount: float) -> str:
+    """Format currency as ₹1.2 Cr / ₹45.3 L for counters, falling back to the full format below a lakh"""
+    # Pick the unit from the rounded value, so 99.99 L shows as ₹1.0 Cr rather than ₹100.0 L
+    if abs(round(amount / LAKH, 1)) >= CRORE // LAKH:
+        return f"₹{amount / CRORE:.1f} Cr"
+    if _paise(abs(amount)) >= LAKH * 100:
+        return f"₹{amount / LAKH:.1f} L"
+    return format_indian_currency(amount)
 
 def get_state_coordinates():
     """Get approximate center coordinates for Indian states"""
@@ -60,4 +97,64 @@ def get_state_coordinates():
         "Ladakh": {"lat": 34.1526, "lon": 77.5770},
         "Lakshadweep": {"lat": 10.5667, "lon": 72.6417},
         "Puducherry": {"lat": 11.9416, "lon": 79.8083}
-    }
\ No newline at end of file
+    }
+
+# Canonical state names; position in this tuple is the compact state ID used for aggregation
+STATE_NAMES = tuple(get_state_coordinates())
+
+# Shopify provinceCode values (and older ISO 3166-2:IN codes still seen on addresses)
+PROVINCE_CODE_ALIASES = {
+    "AP": "Andhra Pradesh", "AR": "Arunachal Pradesh", "AS": "Assam", "BR": "Bihar",
+    "CT": "Chhattisgarh", "CG": "Chhattisgarh", "DL": "Delhi", "GA": "Goa", "GJ": "Gujarat",
+    "HR": "Haryana", "HP": "Himachal Pradesh", "JH": "Jharkhand", "KA": "Karnataka",
+    "KL": "Kerala", "MP": "Madhya Pradesh", "MH": "Maharashtra", "MN": "Manipur",
+    "ML": "Meghalaya", "MZ": "Mizoram", "NL": "Nagaland", "OR": "Odisha", "OD": "Odisha",
+    "PB": "Punjab", "RJ": "Rajasthan", "SK": "Sikkim", "TN": "Tamil Nadu", "TS": "Telangana",
+    "TG": "Telangana", "TR": "Tripura", "UP": "Uttar Pradesh", "UK": "Uttarakhand",
+    "UT": "Uttarakhand", "WB": "West Bengal", "AN": "Andaman and Nicobar Islands",
+    "CH": "Chandigarh", "DH": "Dadra and Nagar Haveli and Daman and Diu",
+    "DN": "Dadra and Nagar Haveli and Daman and Diu", "DD": "Dadra and Nagar Haveli and Daman and Diu",
+    "JK": "Jammu and Kashmir", "LA": "Ladakh", "LD": "Lakshadweep", "PY": "Puducherry"
+}
+
+# Free-text province spellings seen on shipping addresses
+PROVINCE_NAME_ALIASES = {
+    "new delhi": "Delhi", "nct of delhi": "Delhi", "nct delhi": "Delhi",
+    "national capital territory of delhi": "Delhi", "delhi ncr": "Delhi",
+    "orissa": "Odisha", "pondicherry": "Puducherry", "uttaranchal": "Uttarakhand",
+    "chattisgarh": "Chhattisgarh", "chhatisgarh": "Chhattisgarh", "telengana": "Telangana",
+    "tamilnadu": "Tamil Nadu", "andaman and nicobar": "Andaman and Nicobar Islands",
+    "dadra and nagar haveli": "Dadra and Nagar Haveli and Daman and Diu",
+    "daman and diu": "Dadra and Nagar Haveli and Daman and Diu",
+    "jammu kashmir": "Jammu and Kashmir"
+}
+
+
+def _province_key(name: str) -> str:
+    return " ".join(name.lower().replace("&", " and ").split())
+
+
+_STATE_IDS = {name: state_id for state_id, name in enumerate(STATE_NAMES)}
+_STATE_CODE_INDEX = {code: _STATE_IDS[name] for code, name in PROVINCE_CODE_ALIASES.items()}
+_STATE_NAME_INDEX = {_province_key(name): state_id for name, state_id in _STATE_IDS.items()}
+_STATE_NAME_INDEX.update({_province_key(alias): _STATE_IDS[name] for alias, name in PROVINCE_NAME_ALIASES.items()})
+
+
+def get_state_id(province: Optional[str], province_code: Optional[str] = None,
+                 country_code: Optional[str] = None) -> Optional[int]:
+    """Resolve a shipping address province/provinceCode to a canonical state ID, or None if unknown
+
+    Only Indian addresses resolve (a missing country counts as India): other countries reuse the same codes,
+    such as TN for Tennessee or GA for Georgia.
+    """
+    if country_code and country_code.upper() != "IN":
+        return None
+    if province_code:
+        code = province_code.upper()
+        if code.startswith("IN-"):
+            code = code[3:]
+        if code in _STATE_CODE_INDEX:
+            return _STATE_CODE_INDEX[code]
+    if province:
+        return _STATE_NAME_INDEX.get(_province_key(province))
+    return None